@@ -0,0 +1,321 @@
+"""Columnar export of the ledger's tickets and documents for reporting.
+
+NFT records of many accounts are flattened into rows (document metadata,
+owner and, for boarding passes, the ticket fields from the description)
+with the inline images dropped, and appended to a directory of Parquet
+part files. Exports are incremental and append-only: which (NFT, owner)
+pairs were already written is kept in a small SQLite table, so a re-run
+only fetches and appends what is new, including NFTs that were
+transferred to another exported account.
+
+Reports are vectorized pandas queries over the columns they need:
+
+    python analytics.py export --account $(cat company_id.txt) --accounts-file passengers.txt
+    python analytics.py report --since 2025-06-01
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import perf
+from backend_client import BackendError, get_client
+from tickets import TICKET_DOCUMENT_TYPE
+
+DEFAULT_DATASET_DIR = os.getenv('ANALYTICS_DIR', 'analytics')
+# Files starting with '_' are skipped when the directory is read as a dataset
+STATE_FILE = '_export.db'
+PART_ROWS = 250_000
+FETCH_WORKERS = 16
+# New NFTs are fetched FETCH_WORKERS at a time, while a full listing also
+# re-sends every exported NFT with its image; only switch to the listing
+# once the per-id fetches would take several rounds
+FULL_FETCH_THRESHOLD = 4 * FETCH_WORKERS
+
+# description field -> column
+TICKET_FIELDS = {
+    'booking_ref': 'booking_ref',
+    'user_id': 'user_id',
+    'flight': 'flight',
+    'route': 'route',
+    'from': 'origin',
+    'to': 'destination',
+    'seat': 'seat',
+    'class': 'seat_class',
+    'departure': 'departure',
+    'arrival': 'arrival',
+}
+COLUMNS = ['nft_id', 'owner', 'document_id', 'document_type', 'profile_type', 'date_added', 'created_at',
+           *TICKET_FIELDS.values(), 'exported_at']
+CATEGORICAL = ('owner', 'profile_type', 'flight', 'route', 'origin', 'destination', 'seat_class')
+DATETIMES = ('date_added', 'departure', 'arrival')
+
+
+def flatten(nft, owner, exported_at):
+    """One dataset row for an NFT held by owner"""
+    metadata = nft.get('metadata') or {}
+    row = {
+        'nft_id': nft['id'],
+        'owner': owner,
+        'document_id': metadata.get('id'),
+        'document_type': metadata.get('document_type'),
+        'profile_type': metadata.get('profile_type'),
+        'date_added': metadata.get('date_added'),
+        'created_at': nft.get('created_at'),
+        'exported_at': exported_at,
+    }
+    if metadata.get('document_type') == TICKET_DOCUMENT_TYPE:
+        try:
+            ticket = json.loads(nft.get('description') or '')
+        except ValueError:
+            ticket = None
+        if isinstance(ticket, dict):
+            for field, column in TICKET_FIELDS.items():
+                value = ticket.get(field)
+                row[column] = None if value is None else str(value)
+    return row
+
+
+def schema():
+    """The Arrow schema every part file is written and read with.
+
+    Inferring it per part would type a part without tickets' ticket
+    columns as null doubles, and pick a different dictionary index width
+    per part, so parts could not be read together. Categorical columns are
+    stored as plain strings (Parquet dictionary-encodes them on disk) and
+    become categoricals again in load().
+    """
+    import pyarrow as pa
+
+    types = dict.fromkeys(COLUMNS, pa.string())
+    types.update(dict.fromkeys((*DATETIMES, 'created_at', 'exported_at'), pa.timestamp('ns')))
+    types['document_type'] = pa.int8()
+    return pa.schema([(column, types[column]) for column in COLUMNS])
+
+
+def to_frame(rows):
+    """Rows as a DataFrame with the dataset's column types"""
+    import pandas as pd
+
+    frame = pd.DataFrame.from_records(rows, columns=COLUMNS)
+    frame['document_type'] = pd.to_numeric(frame['document_type'], errors='coerce').astype('Int8')
+    for column in DATETIMES:
+        frame[column] = pd.to_datetime(frame[column], errors='coerce', format='ISO8601')
+    frame['created_at'] = pd.to_datetime(pd.to_numeric(frame['created_at'], errors='coerce'), unit='s')
+    frame['exported_at'] = pd.to_datetime(frame['exported_at'], unit='s')
+    for column in CATEGORICAL:
+        frame[column] = frame[column].astype('category')
+    return frame
+
+
+class AnalyticsExport:
+    """Append-only Parquet dataset of NFT rows, with the exported (NFT, owner) pairs in SQLite"""
+
+    def __init__(self, directory=DEFAULT_DATASET_DIR, part_rows=PART_ROWS):
+        self.directory = directory
+        self.part_rows = part_rows
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._rows = []
+        self._keys = []
+        self._conn = sqlite3.connect(os.path.join(directory, STATE_FILE), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS exported (
+                owner TEXT NOT NULL,
+                nft_id TEXT NOT NULL,
+                PRIMARY KEY (owner, nft_id)
+            ) WITHOUT ROWID
+        ''')
+        self._conn.commit()
+
+    def exported_ids(self, owner):
+        with self._lock:
+            rows = self._conn.execute('SELECT nft_id FROM exported WHERE owner = ?', (owner,)).fetchall()
+        return {nft_id for nft_id, in rows}
+
+    def append(self, owner, nfts):
+        """Buffer rows for NFTs of owner; a part file is written every part_rows rows"""
+        exported_at = time.time()
+        for nft in nfts:
+            self._rows.append(flatten(nft, owner, exported_at))
+            self._keys.append((owner, nft['id']))
+            if len(self._rows) >= self.part_rows:
+                self.flush()
+
+    def flush(self):
+        """Write buffered rows as a new part file, then record them as exported"""
+        if not self._rows:
+            return None
+        path = os.path.join(self.directory, f"part-{time.time_ns()}.parquet")
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with perf.timed('analytics_write_part'):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            pq.write_table(pa.Table.from_pandas(to_frame(self._rows), schema=schema(), preserve_index=False), tmp)
+        os.replace(tmp, path)
+        # A crash between the rename and this commit re-appends the same rows
+        # next time; reports count each NFT once, so that is harmless
+        with self._lock:
+            self._conn.executemany('INSERT OR IGNORE INTO exported (owner, nft_id) VALUES (?, ?)', self._keys)
+            self._conn.commit()
+        perf.count('analytics_rows_total', len(self._rows))
+        self._rows, self._keys = [], []
+        return path
+
+    def export_account(self, account, client):
+        """Append the account's NFTs not exported for it yet; returns how many"""
+        ids = client.get_account_nft_ids(account)
+        exported = self.exported_ids(account)
+        new = [nft_id for nft_id in ids if nft_id not in exported]
+        if not new:
+            return 0
+        if len(new) > FULL_FETCH_THRESHOLD:
+            wanted = set(new)
+            nfts = [nft for nft in client.get_account_nfts(account) if nft['id'] in wanted]
+        else:
+            with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+                nfts = list(pool.map(client.get_nft, new))
+        self.append(account, nfts)
+        return len(nfts)
+
+    def export(self, accounts, client=None, progress=None):
+        """Export many accounts; returns {'accounts', 'appended', 'failed', 'seconds'}"""
+        client = client or get_client()
+        appended = 0
+        failed = {}
+        start = time.perf_counter()
+        with perf.timed('analytics_export'):
+            for done, account in enumerate(accounts, 1):
+                try:
+                    appended += self.export_account(account, client)
+                except BackendError as e:
+                    failed[account] = str(e)
+                if progress:
+                    progress(done, len(accounts), appended)
+            self.flush()
+        return {'accounts': len(accounts), 'appended': appended, 'failed': failed,
+                'seconds': time.perf_counter() - start}
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+
+def load(directory=DEFAULT_DATASET_DIR, columns=None, since=None):
+    """The dataset (or some of its columns) as a DataFrame, optionally only rows added since a date"""
+    import pandas as pd
+
+    filters = [('date_added', '>=', pd.Timestamp(since))] if since else None
+    if not os.path.isdir(directory) or not any(name.endswith('.parquet') for name in os.listdir(directory)):
+        return to_frame([])[columns or COLUMNS]
+    # The explicit schema also reads parts written before it was fixed
+    frame = pd.read_parquet(directory, columns=columns, filters=filters, schema=schema())
+    for column in CATEGORICAL:
+        if column in frame:
+            frame[column] = frame[column].astype('category')
+    return frame
+
+
+def issued(frame):
+    """One row per NFT: the first time it was exported, under the account that held it then"""
+    return frame.drop_duplicates('nft_id')
+
+
+def _tickets(frame):
+    return issued(frame[frame['document_type'].fillna(0) == TICKET_DOCUMENT_TYPE])
+
+
+def issuance_per_day(frame):
+    """Tickets and documents issued per day, one column per document type"""
+    from documents import DOCUMENT_TYPE_LABELS
+
+    frame = issued(frame)
+    labels = {int(kind): label for kind, label in DOCUMENT_TYPE_LABELS.items()}
+    kind = frame['document_type'].map(labels).fillna('Unknown').rename('type')
+    return frame.groupby([frame['date_added'].dt.floor('D').rename('day'), kind]).size().unstack(fill_value=0)
+
+
+def tickets_per_route(frame):
+    """Tickets issued per route, busiest first"""
+    return _tickets(frame).groupby('route', observed=True).size().sort_values(ascending=False).rename('tickets')
+
+
+def tickets_per_class(frame):
+    """Tickets issued per travel class"""
+    return _tickets(frame).groupby('seat_class', observed=True).size().rename('tickets')
+
+
+def tickets_per_route_and_class(frame):
+    return _tickets(frame).groupby(['route', 'seat_class'], observed=True).size().unstack(fill_value=0)
+
+
+REPORT_COLUMNS = ['nft_id', 'document_type', 'date_added', 'route', 'seat_class']
+
+
+def report(directory=DEFAULT_DATASET_DIR, since=None):
+    """The standard reports, reading only the columns they use"""
+    frame = load(directory, REPORT_COLUMNS, since)
+    return {
+        'per_day': issuance_per_day(frame),
+        'per_route': tickets_per_route(frame),
+        'per_class': tickets_per_class(frame),
+        'per_route_and_class': tickets_per_route_and_class(frame),
+    }
+
+
+def _read_accounts(path):
+    with open(path, 'r') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def main():
+    from bootstrap import COMPANY_ID_FILE, USER_ID_FILE
+
+    parser = argparse.ArgumentParser(description="Export ledger NFTs to Parquet and report on them")
+    parser.add_argument('--dir', default=DEFAULT_DATASET_DIR, help="dataset directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    export_parser = commands.add_parser('export', help="append new NFTs of the given accounts")
+    export_parser.add_argument('--account', action='append', default=[])
+    export_parser.add_argument('--accounts-file', help="file with one account id per line")
+    report_parser = commands.add_parser('report', help="issuance per day, route and class")
+    report_parser.add_argument('--since', help="only documents added on or after this date")
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        accounts = list(args.account)
+        if args.accounts_file:
+            accounts += _read_accounts(args.accounts_file)
+        if not accounts:
+            # The dashboard's and the ticket issuer's own accounts
+            accounts = [_read_accounts(path)[0] for path in (USER_ID_FILE, COMPANY_ID_FILE) if os.path.exists(path)]
+
+        def progress(done, total, appended):
+            print(f"\r{done}/{total} accounts, {appended} new rows", end='', flush=True)
+
+        export = AnalyticsExport(args.dir)
+        result = export.export(list(dict.fromkeys(accounts)), progress=progress)
+        export.close()
+        print()
+        print(f"Appended {result['appended']} rows from {result['accounts']} accounts in {result['seconds']:.1f}s")
+        for account, error in result['failed'].items():
+            print(f"  {account}: {error}")
+        return
+
+    import pandas as pd
+
+    start = time.perf_counter()
+    reports = report(args.dir, args.since)
+    with pd.option_context('display.max_rows', 60, 'display.width', 120):
+        for name, table in reports.items():
+            print(f"\n== {name.replace('_', ' ')} ==")
+            print(table.to_string() if len(table) else "(none)")
+    print(f"\nReports computed in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,64 +1,59 @@
 import streamlit as st
-import qrcode
-from PIL import Image
-import io
-import base64
 import json
-from datetime import datetime
-import uuid
-import requests
 import os
-import dotenv
-from enum import Enum
 
-dotenv.load_dotenv()
-
-def fetch_documents(api_url):
-    response = requests.get(api_url)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        st.error("Failed to fetch documents from the API")
-        return []
-
-# Create a file with a user id if there is no file
-if not os.path.exists('user_id.txt'):
-    with open('user_id.txt', 'w') as f:
-        user_id = str(uuid.uuid4())
-        f.write(user_id)
-    response = requests.post(
-        "http://localhost:8080/accounts",
-        json={"id": user_id},
-        headers={'Content-Type': 'application/json'}
-    )
-# Read the user id from the file
-with open('user_id.txt', 'r') as f:
-    user_id = f.read()
-    if 'documents' not in st.session_state:
-        api_url = f"http://localhost:8080/accounts/{user_id}/nfts"  # Replace with your API URL
-        jsons = fetch_documents(api_url)
-        files = [metadata for json_ in jsons for metadata in json_['metadata']]
-        st.session_state.documents = jsons
-    else:
-        st.session_state.documents = []
+import perf
+from backend_client import BackendError
+from bootstrap import get_user_id, load_environment
+from qr_payload import encode_document
+from qr_render import render_qr
+from blob_store import get_store
+from image_cache import get_shared_images, preview_image
+from documents import (DOCUMENT_TYPES, DocumentStore, DocumentType, document_type_label, load_documents,
+                       load_full_image, page_count, retry_document, store_document, unsent_documents,
+                       verify_documents)
 
+load_environment()
+perf.serve_metrics()
+# A rerun ended by st.rerun()/st.stop() left its profile unfinished; drop it before starting this one's
+if 'rerun_profile' in st.session_state:
+    st.session_state.rerun_profile.abandon()
+rerun_profile = st.session_state.rerun_profile = perf.RerunProfile()
 
 # Get backend link from environment variables
 BACKEND_LINK = os.getenv('BACKEND_LINK')
 if not BACKEND_LINK:
     raise ValueError("BACKEND_LINK not found in environment variables")
 
+def fetch_documents(user_id):
+    """The session's document store, refreshed from the local cache and ledger"""
+    if 'document_store' not in st.session_state:
+        st.session_state.document_store = DocumentStore()
+    try:
+        return load_documents(user_id, st.session_state.document_store)
+    except BackendError:
+        st.error("Failed to fetch documents from the API")
+        return st.session_state.document_store
+
+# The user id is created and registered once per process, not per session
+try:
+    user_id = get_user_id()
+except BackendError as e:
+    st.error(f"Failed to register user ID: {e}")
+    st.stop()
+document_store = fetch_documents(user_id)
+
 def create_document_payload(doc):
     """Create a JSON payload with document information"""
     # ... existing imports and code ...
 
     payload = {
         'document': {
-            'id': doc['id'],
-            'type': doc['document_type'],
-            'date_added': doc['date_added'],
-            'profile_type': doc['profile_type'],
-            'profile_info': st.session_state.profile_data[doc['profile_type']]
+            'id': doc.id,
+            'type': doc.document_type.key,
+            'date_added': doc.date_added,
+            'profile_type': doc.profile_type,
+            'profile_info': st.session_state.profile_data[doc.profile_type]
         }
     }
     return json.dumps(payload)
@@ -89,91 +84,35 @@ if 'profile_data' not in st.session_state:
         }
     }
 
-DOCUMENT_TYPES = {
-    'passport': 'International travel document',
-    'id_card': 'National identification card',
-    'pass': 'Access or membership pass'
-}
-
-class DocumentType(Enum):
-    Passport = 1,
-    IdCard = 2,
-    Pass = 3
-    
-    @staticmethod
-    def get_mapping(document_):
-        if document_ == 'passport':
-            return 1
-        elif document_ == 'id_card':
-            return 2
-        elif document_ == 'pass':
-            return 3
+PAGE_SIZES = [10, 20, 50]
 
 def generate_qr_code(data):
     """Generate QR code from document data"""
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(data)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    buf = io.BytesIO()
-    img.save(buf, format='PNG')
-    return buf.getvalue()
+    return render_qr(data)
 
 def save_document(document_type, uploaded_file):
-    """Save document to session state with UUID"""
+    """Queue document for minting; returns its UUID"""
     if uploaded_file is not None:
-        bytes_data = uploaded_file.getvalue()
-        b64 = base64.b64encode(bytes_data).decode()
-        
-        document = {
-            'id': str(uuid.uuid4()),  # Generate UUID for document
-            'document_type': document_type,
-            'image': b64,
-            'date_added': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'profile_type': st.session_state.profile_type
-        }
-        
-        payload = {
-            "name": "Transferable NFT",
-            "description": "This NFT will be transferred",
-            "owner": user_id,
-            "metadata":{
-                'id': str(uuid.uuid4()),  # Generate UUID for document
-                'document_type': DocumentType.get_mapping(document_type),
-                'date_added': str(datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
-                'image': b64,
-                'profile_type': str(st.session_state.profile_type)   
-            }
-        }
-        
-        # print(payload)
-        try:
-            response = requests.post(
-                "http://localhost:8080/nfts",
-                json=payload,
-                headers={'Content-Type': 'application/json'}
-            )
-            
-            print(response)
-            
-            if not response.ok:
-                st.error("Failed to store document on blockchain")
-                return False
-                
-        except Exception as e:
-            st.error(f"Error connecting to blockchain backend: {str(e)}")
-            return False
-        st.session_state.documents.append(document)
-        return True
-    return False
+        # The mint is written to the outbox and sent in the background, so
+        # a slow ledger never blocks the form. The upload is read in place
+        # rather than copied out with getvalue()
+        uploaded_file.seek(0)
+        return store_document(
+            user_id,
+            DocumentType.parse(document_type),
+            st.session_state.profile_type,
+            uploaded_file,
+        )
+    return None
 
 def update_profile(profile_type, data, profile_pic=None):
     """Update profile information"""
     if profile_pic:
+        # The session keeps only the content hash; the bytes are held once per
+        # process in the shared image cache, with the blob store as the durable copy
         bytes_data = profile_pic.getvalue()
-        b64 = base64.b64encode(bytes_data).decode()
-        data['profile_pic' if profile_type == 'Individual' else 'logo'] = b64
+        get_store().put(bytes_data)
+        data['profile_pic' if profile_type == 'Individual' else 'logo'] = get_shared_images().put(bytes_data)
     
     st.session_state.profile_data[profile_type].update(data)
     return True
@@ -221,9 +160,9 @@ with st.sidebar:
         submitted = st.form_submit_button("Add Document")
         if submitted:
             if doc_file:
-                if save_document(doc_type, doc_file):
-                    
-                    st.success(f"Document added successfully! (ID: {st.session_state.documents[-1]['id']})")
+                document_id = save_document(doc_type, doc_file)
+                if document_id:
+                    st.success(f"Document queued for the blockchain! (ID: {document_id})")
             else:
                 st.error("Please provide an image")
 
@@ -235,12 +174,6 @@ tab2, tab3,tab1, = st.tabs(["Documents List", "Document Details","Profile"])
 # Documents List Tab
 with tab2:
     
-    # Filter documents based on profile type
-    filtered_documents = [doc for doc in st.session_state.documents]
-    filtered_documents = [doc['metadata'] for doc in filtered_documents]
-    print('*'*50)
-    print(filtered_documents)
-    print('*'*50)
     st.header(f"{'Personal' if profile_type == 'Individual' else 'Business'} Documents")
     
     # Add sorting options
@@ -251,78 +184,96 @@ with tab2:
             options=["Date (Newest First)", "Date (Oldest First)"],
             key="sort_documents"
         )
+    with sort_col2:
+        verify_pressed = st.button("Verify integrity", help="Check each document against the digest recorded when it was minted")
+    
+    if verify_pressed:
+        progress_bar = st.progress(0.0)
+        try:
+            report = verify_documents(user_id, progress=lambda done, total: progress_bar.progress(done / total))
+        except BackendError:
+            st.error("Failed to fetch documents from the API")
+        else:
+            tampered = [p for p in report['problems'] if p['status'] in ('mismatch', 'image_mismatch')]
+            if tampered:
+                st.error(f"{len(tampered)} of {report['checked']} documents do not match what was minted")
+                st.dataframe(tampered)
+            else:
+                st.success(f"All {report['checked']} documents match what was minted")
+            unrecorded = report['counts'].get('unrecorded', 0) + report['counts'].get('error', 0)
+            if unrecorded:
+                st.caption(f"{unrecorded} could not be checked (minted elsewhere or not fetched)")
     
-    # Sort documents based on selection
-    if sort_by == "Date (Newest First)":
-        filtered_documents.sort(key=lambda x: x['date_added'], reverse=True)
-    elif sort_by == "Date (Oldest First)":
-        filtered_documents.sort(key=lambda x: x['date_added'])
+    # The store keeps documents sorted, so this is a memoized view
+    newest_first = sort_by == "Date (Newest First)"
     
+    # Documents still in the outbox
+    for entry in unsent_documents(user_id):
+        doc = entry['metadata']
+        label = f"{document_type_label(doc['document_type'])} added {doc['date_added']}"
+        if entry['status'] == 'failed':
+            st.error(f"{label}: failed to store on blockchain ({entry['last_error']})")
+            if st.button("Retry", key=f"retry_{entry['key']}"):
+                retry_document(entry['key'])
+                st.rerun()
+        else:
+            retrying = f", retrying after {entry['attempts']} attempts" if entry['attempts'] else ""
+            st.info(f"{label}: pending{retrying}")
+
     # Display document count
-    st.write(f"Total documents: {len(filtered_documents)}")
+    st.write(f"Total documents: {len(document_store)}")
     
-    if not filtered_documents:
+    if not len(document_store):
         st.info(f"No {'personal' if profile_type == 'Individual' else 'business'} documents added yet. Use the sidebar to add new documents.")
     else:
+        # Only the visible page is decoded; previews are cached by document id
+        page_col1, page_col2 = st.columns([1, 1])
+        with page_col1:
+            page_size = st.selectbox("Per page", options=PAGE_SIZES, key="documents_page_size")
+        pages = page_count(len(document_store), page_size)
+        # The widget takes its value from session state only, so a page
+        # past the end after a delete or a larger page size is clamped there
+        if 'documents_page' not in st.session_state:
+            st.session_state.documents_page = 1
+        elif st.session_state.documents_page > pages:
+            st.session_state.documents_page = pages
+        with page_col2:
+            page = st.number_input("Page", min_value=1, max_value=pages, key="documents_page")
+        start = (page - 1) * page_size
+        page_documents = document_store.page(page, page_size, newest_first)
+        st.caption(f"Showing {start + 1}-{start + len(page_documents)} of {len(document_store)}")
+        
         # Display documents in a grid layout
-        for i in range(0, len(filtered_documents), 2):
-            col1, col2 = st.columns(2)
-            
-            if i < len(filtered_documents):
-                doc = filtered_documents[i]
-                with col1:
-                    st.image(base64.b64decode(doc['image']), use_container_width=True)
-                    if doc['document_type'] == 1:
-                        doc_type = 'Passport'
-                    elif doc['document_type'] == 2:
-                        doc_type = 'ID Card'
+        for i in range(0, len(page_documents), 2):
+            for col, doc in zip(st.columns(2), page_documents[i:i + 2]):
+                with col:
+                    preview = preview_image(doc.image_ref, doc.image_data)
+                    if preview:
+                        st.image(preview, use_container_width=True)
                     else:
-                        doc_type = 'Pass'
-                    st.write(f"**Type:** {doc_type}")
-                    st.write(f"**Added On:** {doc['date_added']}")
-            
-            if i + 1 < len(filtered_documents):
-                doc = filtered_documents[i + 1]
-                with col2:
-                    st.image(base64.b64decode(doc['image']), use_container_width=True)
-                    st.write(f"**Type:** {doc['document_type'].replace('_', ' ').title()}")
-                    st.write(f"**Added On:** {doc['date_added']}")
+                        st.caption("Image unavailable")
+                    st.write(f"**Type:** {doc.label}")
+                    st.write(f"**Added On:** {doc.date_added}")
 
 # Document Details Tab
 with tab3:
     
     # Document selection dropdown
-    st.session_state.documents = [doc['metadata'] for doc in st.session_state.documents]
-    for doc in st.session_state.documents:
-        print(doc)
-        doc_type = doc['document_type']
-        if doc_type == 1:
-            doc['document_type'] = 'Passport'
-        elif doc_type == 2:
-            doc['document_type'] = 'ID Card'
-        else:
-            doc['document_type'] = 'Pass'
-    doc_options = {doc['id']: f"{doc['document_type']} (Added on {doc['date_added']})" for doc in st.session_state.documents}
-    
     selected_doc_id = st.selectbox(
         "Select a document to view details",
-        options=doc_options.keys(),
-        format_func=lambda x: doc_options[x]
+        options=[doc.id for doc in document_store.ordered()],
+        format_func=lambda x: f"{document_store.get(x).label} (Added on {document_store.get(x).date_added})"
     )
     
     if selected_doc_id:
-        selected_doc = next((doc for doc in st.session_state.documents if doc['id'] == selected_doc_id), None)
+        selected_doc = document_store.get(selected_doc_id)
         if selected_doc:
-            st.image(base64.b64decode(selected_doc['image']), use_container_width=True)
-            st.write(f"**Document Type:** {selected_doc['document_type'].replace('_', ' ').title()}")
-            st.write(f"**Date Added:** {selected_doc['date_added']}")
+            st.image(load_full_image(selected_doc), use_container_width=True)
+            st.write(f"**Document Type:** {selected_doc.label}")
+            st.write(f"**Date Added:** {selected_doc.date_added}")
             
-            qr_code_data = json.dumps({
-                'document_id': selected_doc['id'],
-                'document_type': selected_doc['document_type'],
-                'date_added': selected_doc['date_added']
-            })
-            qr_code_img = generate_qr_code(qr_code_data)
+            # Signed compact payload: a smaller QR than JSON, checkable offline
+            qr_code_img = generate_qr_code(encode_document(selected_doc))
             st.image(qr_code_img, caption="QR Code", use_container_width=True)
 
 
@@ -335,9 +286,10 @@ with tab1:
         pic_key = 'profile_pic' if profile_type == 'Individual' else 'logo'
         current_pic = st.session_state.profile_data[profile_type].get(pic_key)
         
+        current_pic = get_shared_images().get(current_pic, lambda: get_store().get(current_pic)) if current_pic else None
         if current_pic:
             # When picture exists, show it with delete button
-            st.image(base64.b64decode(current_pic), width=200)
+            st.image(current_pic, width=200)
             if st.button("Delete Profile Picture" if profile_type == 'Individual' else "Delete Logo"):
                 delete_profile_picture(profile_type)
                 st.rerun()
@@ -407,4 +359,34 @@ with tab1:
                         'description': description
                     }
                     if update_profile('Company', profile_data):
-                        st.success("Company profile updated successfully!")
\ No newline at end of file
+                        st.success("Company profile updated successfully!")
+
+def render_perf_panel(profile_path):
+    """Sidebar panel with hot-path timings, counters and the Prometheus export"""
+    with st.sidebar:
+        st.divider()
+        if not st.checkbox("Show performance panel", value=os.getenv('PERF_PANEL') == '1'):
+            return
+        snapshot = perf.snapshot()
+        st.subheader("Performance")
+        st.dataframe([
+            {
+                'stage': timer['name'] + ''.join(f" {v}" for v in timer['labels'].values()),
+                'calls': timer['count'],
+                'mean ms': round(timer['mean_ms'], 2),
+                'max ms': round(timer['max_ms'], 2),
+            }
+            for timer in snapshot['timers']
+        ], use_container_width=True)
+        for counter in snapshot['counters'] + snapshot['gauges']:
+            labels = ', '.join(f"{k}={v}" for k, v in counter['labels'].items())
+            st.write(f"`{counter['name']}` {labels}: {counter['value']}")
+        images = get_shared_images().info()
+        st.caption(f"Shared images: {images['entries']} held, {images['resident_bytes'] / 2**20:.1f} of "
+                   f"{images['budget_bytes'] / 2**20:.0f} MiB, {images['hit_rate']:.0%} hit rate")
+        st.download_button("Prometheus metrics", perf.prometheus_text(), file_name="metrics.txt", mime="text/plain")
+        if profile_path:
+            st.caption(f"Profile saved to {profile_path}")
+            st.code(rerun_profile.top(), language=None)
+
+render_perf_panel(rerun_profile.finish())
@@ -0,0 +1,161 @@
+import json
+import os
+import threading
+
+import perf
+
+DEFAULT_BACKEND_LINK = 'localhost:8080'
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 15)
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class BackendError(Exception):
+    """Raised when the ledger backend rejects a request or cannot be reached"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def backend_url(link=None):
+    """Turn BACKEND_LINK (e.g. 'localhost:8080') into a base URL"""
+    link = link or os.getenv('BACKEND_LINK') or DEFAULT_BACKEND_LINK
+    if '://' not in link:
+        link = f"http://{link}"
+    return link.rstrip('/')
+
+
+def json_chunks(payload, chunk_size=STREAM_CHUNK_SIZE):
+    """Encode payload as JSON in chunks of about chunk_size bytes, for a chunked request body.
+
+    Unlike json.dumps, the whole document is never built as one string;
+    its largest piece is the longest single value (e.g. an image's base64).
+    """
+    pending = []
+    size = 0
+    for piece in json.JSONEncoder(allow_nan=False).iterencode(payload):
+        pending.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield ''.join(pending).encode()
+            pending = []
+            size = 0
+    if pending:
+        yield ''.join(pending).encode()
+
+
+class BackendClient:
+    """Connection-pooled client for the ledger REST API"""
+
+    def __init__(self, base_url=None, timeout=DEFAULT_TIMEOUT, retries=3,
+                 backoff_factor=0.2, pool_size=10):
+        # requests is imported here so importing this module stays cheap
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.base_url = backend_url(base_url)
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json'})
+
+        # Connection errors are retried for every method since the request
+        # never reached the server. Read errors and 5xx responses are only
+        # retried for GET so a mint or transfer is never applied twice.
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _request(self, method, path, endpoint=None, **kwargs):
+        import requests
+
+        endpoint = endpoint or path
+        kwargs.setdefault('timeout', self.timeout)
+        try:
+            with perf.timed('backend_request', method=method, endpoint=endpoint):
+                response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except requests.exceptions.RequestException as e:
+            perf.count('backend_errors_total', method=method, endpoint=endpoint)
+            raise BackendError(f"Error connecting to blockchain backend: {e}") from e
+        if not response.ok:
+            perf.count('backend_errors_total', method=method, endpoint=endpoint)
+            raise BackendError(
+                f"{method} {path} failed with {response.status_code}: {response.text}",
+                status_code=response.status_code,
+            )
+        return response.json()
+
+    def create_account(self, account_id):
+        """POST /accounts"""
+        return self._request('POST', '/accounts', json={"id": account_id})
+
+    def mint_nft(self, payload):
+        """POST /nfts with a full NFT payload (name, description, owner, metadata).
+
+        A dict is streamed as a chunked JSON body; a str or bytes payload is
+        taken to be JSON already encoded (e.g. by the outbox) and sent as is.
+        """
+        if isinstance(payload, str):
+            body = payload.encode()
+        elif isinstance(payload, bytes):
+            body = payload
+        else:
+            body = json_chunks(payload)
+        return self._request('POST', '/nfts', data=body)
+
+    def get_account_nfts(self, account_id):
+        """GET /accounts/{id}/nfts"""
+        return self._request('GET', f"/accounts/{account_id}/nfts", '/accounts/{id}/nfts')
+
+    def get_account_nft_ids(self, account_id):
+        """GET /accounts/{id}/nft_ids"""
+        return self._request('GET', f"/accounts/{account_id}/nft_ids", '/accounts/{id}/nft_ids')
+
+    def get_nft(self, nft_id):
+        """GET /nfts/{id}"""
+        return self._request('GET', f"/nfts/{nft_id}", '/nfts/{id}')
+
+    def transfer_nft(self, from_id, to_id, nft_id):
+        """POST /nfts/transfer"""
+        return self._request('POST', '/nfts/transfer', json={
+            'from': from_id,
+            'to': to_id,
+            'nft_id': nft_id,
+        })
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide client shared by every app and session.
+
+    BACKEND_LINK=inprocess serves every call from a local_ledger.Ledger.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if os.getenv('BACKEND_LINK') == 'inprocess':
+                    from local_ledger import in_process_client
+                    _client = in_process_client()
+                else:
+                    _client = BackendClient()
+    return _client
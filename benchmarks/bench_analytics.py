@@ -0,0 +1,122 @@
+"""Analytics export throughput and report latency over millions of NFT records.
+
+Synthetic ticket and document NFTs are appended to a Parquet dataset in a
+temporary directory (as an export of many accounts would), then the
+standard per-day, per-route and per-class reports are timed over it.
+First, a documents-only part and a tickets-only part are written side by
+side and reported on, which fails if parts disagree on their schema.
+
+    python benchmarks/bench_analytics.py --records 2000000
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics
+from tickets import TICKET_DOCUMENT_TYPE
+
+ROUTES = ['LHR-JFK', 'JFK-LHR', 'CDG-DXB', 'DXB-SIN', 'SIN-SYD', 'FRA-ORD', 'AMS-NRT', 'MAD-GRU']
+CLASSES = ['Economy', 'Economy', 'Economy', 'Business', 'First Class']
+BATCH = 100_000
+
+
+def synthetic_nfts(count, accounts, seed=0):
+    """(owner, nft) pairs, about three quarters of them tickets"""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    for i in range(count):
+        added = start + timedelta(minutes=rng.randrange(365 * 24 * 60))
+        metadata = {
+            'id': f"doc-{i}", 'date_added': added.strftime("%Y-%m-%d %H:%M:%S"),
+            'image': '', 'profile_type': rng.choice(('Individual', 'Company')),
+        }
+        description = ''
+        if rng.random() < 0.75:
+            metadata['document_type'] = TICKET_DOCUMENT_TYPE
+            route = rng.choice(ROUTES)
+            origin, _, destination = route.partition('-')
+            departure = added + timedelta(days=rng.randrange(1, 60))
+            description = json.dumps({
+                'booking_ref': f"{i:06X}"[-6:], 'user_id': f"passenger{i % 50000}", 'flight': f"AN{100 + ROUTES.index(route)}",
+                'route': route, 'from': origin, 'to': destination, 'seat': f"{rng.randrange(1, 41)}A",
+                'class': rng.choice(CLASSES), 'departure': departure.strftime("%Y-%m-%d %H:%M"),
+            })
+        else:
+            metadata['document_type'] = rng.choice((1, 2))
+        nft = {'id': f"nft-{i}", 'name': 'NFT', 'description': description, 'owner': '',
+               'metadata': metadata, 'created_at': int(added.timestamp())}
+        yield f"account{i % accounts}", nft
+
+
+def check_mixed_parts(directory):
+    """A part without tickets next to one with only tickets must still load and report"""
+    nfts = list(synthetic_nfts(400, 10, seed=1))
+    documents = [(owner, nft) for owner, nft in nfts if nft['metadata']['document_type'] != TICKET_DOCUMENT_TYPE]
+    tickets = [(owner, nft) for owner, nft in nfts if nft['metadata']['document_type'] == TICKET_DOCUMENT_TYPE]
+    export = analytics.AnalyticsExport(directory)
+    for part in (documents, tickets):
+        for owner, nft in part:
+            export.append(owner, [nft])
+        export.flush()
+    export.close()
+    reports = analytics.report(directory)
+    assert reports['per_route'].sum() == len(tickets), "tickets lost across parts"
+    assert reports['per_day'].to_numpy().sum() == len(nfts), "documents lost across parts"
+    print(f"{'mixed parts check':<34}{'ok':>8}")
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<34}{time.perf_counter() - start:>8.2f} s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=1_000_000)
+    parser.add_argument('--accounts', type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        check_mixed_parts(os.path.join(tmp, 'mixed'))
+    with tempfile.TemporaryDirectory() as tmp:
+        export = analytics.AnalyticsExport(tmp)
+
+        # Generated in batches outside the timed section, so only the export itself is measured
+        records = synthetic_nfts(args.records, args.accounts)
+        elapsed = 0.0
+        while True:
+            batch = list(itertools.islice(records, BATCH))
+            if not batch:
+                break
+            start = time.perf_counter()
+            for owner, nft in batch:
+                export.append(owner, [nft])
+            elapsed += time.perf_counter() - start
+        start = time.perf_counter()
+        export.flush()
+        elapsed += time.perf_counter() - start
+        print(f"{f'export {args.records} records':<34}{elapsed:>8.2f} s ({args.records / elapsed:,.0f} records/s)")
+        export.close()
+        size = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp) if name.endswith('.parquet'))
+        print(f"{'dataset size':<34}{size / 2**20:>8.1f} MiB ({size / args.records:.0f} bytes/record)")
+
+        frame = timed("load report columns", lambda: analytics.load(tmp, analytics.REPORT_COLUMNS))
+        timed("issuance per day", lambda: analytics.issuance_per_day(frame))
+        timed("tickets per route", lambda: analytics.tickets_per_route(frame))
+        timed("tickets per class", lambda: analytics.tickets_per_class(frame))
+        timed("all reports (load included)", lambda: analytics.report(tmp))
+        timed("all reports since July", lambda: analytics.report(tmp, since='2025-07-01'))
+
+
+if __name__ == '__main__':
+    main()
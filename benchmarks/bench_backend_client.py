@@ -0,0 +1,74 @@
+"""Requests/sec of bare requests calls vs the pooled BackendClient.
+
+Runs against the local_ledger stand-in so no Rust backend is needed:
+
+    python benchmarks/bench_backend_client.py --requests 2000
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from backend_client import BackendClient
+from local_ledger import Ledger, in_process_client, serve_in_background
+
+METADATA = {
+    'id': 'bench-doc',
+    'document_type': 1,
+    'image': '',
+    'date_added': '2025-01-01 00:00:00',
+    'profile_type': 'Individual',
+}
+
+
+def mint_payload(owner):
+    # A fresh document id per call, since the ledger deduplicates mints by metadata.id
+    metadata = dict(METADATA, id=str(uuid.uuid4()))
+    return {"name": "Transferable NFT", "description": "bench", "owner": owner, "metadata": metadata}
+
+
+def run(label, call, n, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: call(), range(n)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {n / elapsed:10.1f} req/s  ({elapsed:.2f}s for {n})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.0, help="injected server latency in seconds")
+    args = parser.parse_args()
+
+    ledger = Ledger(latency=args.latency)
+    ledger.create_account('bench')
+    server, base = serve_in_background(ledger)
+    client = BackendClient(base, pool_size=args.concurrency)
+
+    run('requests.get (no pool)', lambda: requests.get(f"{base}/accounts/bench/nft_ids").json(),
+        args.requests, args.concurrency)
+    run('BackendClient.get', lambda: client.get_account_nft_ids('bench'),
+        args.requests, args.concurrency)
+    run('requests.post (no pool)', lambda: requests.post(f"{base}/nfts", json=mint_payload('bench')).json(),
+        args.requests, args.concurrency)
+    run('BackendClient.post', lambda: client.mint_nft(mint_payload('bench')),
+        args.requests, args.concurrency)
+
+    local = in_process_client(ledger)
+    run('in-process transport', lambda: local.mint_nft(mint_payload('bench')),
+        args.requests, args.concurrency)
+
+    client.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
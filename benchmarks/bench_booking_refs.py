@@ -0,0 +1,57 @@
+"""Booking reference issuance throughput and memory per million references.
+
+    python benchmarks/bench_booking_refs.py --count 1000000 --batch 1000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from booking_refs import DEFAULT_ERROR_RATE, BookingReferences
+
+
+def set_bytes(refs):
+    """What the same references would cost as a Python set of strings"""
+    issued = set(refs)
+    return sys.getsizeof(issued) + sum(sys.getsizeof(ref) for ref in issued)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--error-rate', type=float, default=DEFAULT_ERROR_RATE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'refs.db')
+        service = BookingReferences(path, capacity=args.count, error_rate=args.error_rate)
+        refs = []
+        start = time.perf_counter()
+        while len(refs) < args.count:
+            refs.extend(service.issue(min(args.batch, args.count - len(refs))))
+        elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        reopened = BookingReferences(path, capacity=args.count, error_rate=args.error_rate)
+        reload_elapsed = time.perf_counter() - start
+
+        stats = service.stats()
+        disk = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp))
+        per_million = 1_000_000 / len(refs)
+        print(f"issued {len(refs)} unique references in batches of {args.batch}")
+        print(f"{'throughput':<28} {len(refs) / elapsed:12.0f} refs/s")
+        print(f"{'reload after restart':<28} {reload_elapsed:12.2f} s ({len(reopened)} refs)")
+        print(f"{'bloom filter':<28} {stats['filter_bytes'] * per_million / 2 ** 20:12.2f} MiB per million "
+              f"(k={stats['filter_hashes']})")
+        print(f"{'sqlite store (disk)':<28} {disk * per_million / 2 ** 20:12.2f} MiB per million")
+        print(f"{'python set of str':<28} {set_bytes(refs) * per_million / 2 ** 20:12.2f} MiB per million")
+        service.close()
+        reopened.close()
+
+
+if __name__ == '__main__':
+    main()
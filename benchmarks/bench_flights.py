@@ -0,0 +1,59 @@
+"""Flight catalog load time and lookup latency over a full-season schedule.
+
+    python benchmarks/bench_flights.py --days 180 --per-day 3
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flights import FlightCatalog, generate_schedule
+
+
+def per_call(label, fn, args, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for arg in args:
+            fn(*arg)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / (repeat * len(args)) * 1e6:10.2f} us/call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=180)
+    parser.add_argument('--per-day', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    schedule = generate_schedule(date(2025, 6, 1), args.days, args.per_day)
+    with tempfile.TemporaryDirectory() as tmp:
+        formats = [('csv', schedule.to_csv)]
+        try:
+            import pyarrow  # noqa: F401
+            formats.append(('parquet', schedule.to_parquet))
+        except ImportError:
+            pass
+        for ext, write in formats:
+            path = os.path.join(tmp, f"schedule.{ext}")
+            write(path, index=False)
+            start = time.perf_counter()
+            catalog = FlightCatalog(path)
+            print(f"{'load ' + ext:<28} {time.perf_counter() - start:10.3f} s  ({len(catalog)} departures)")
+
+    rng = random.Random(0)
+    sample = [catalog.get(rng.randrange(len(catalog))) for _ in range(500)]
+    per_call('find(flight, day)', catalog.find, [(f.flight, f.departure) for f in sample], args.repeat)
+    per_call('at(route, departure)', catalog.at, [(f.route, f.departure) for f in sample], args.repeat)
+    per_call('on_route(origin, dest, day)', catalog.on_route,
+             [(f.origin, f.destination, f.departure) for f in sample], args.repeat)
+    per_call('complete(prefix)', catalog.complete, [(f.flight[:3],) for f in sample], args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Gate service scan throughput and latency with several gates scanning at once.
+
+A flight's passes are loaded into a GateServer on localhost; every gate
+opens a TCP connection and scans its share of the passengers (plus a
+fraction of repeat scans, which must come back as duplicates).
+
+    python benchmarks/bench_gate.py --passes 5000 --gates 1,8,32
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gate
+from qr_payload import encode_ticket
+from tickets import build_ticket_payload
+
+FLIGHT = 'AN214'
+DEPARTURE = '2025-06-01 14:30'
+
+
+def synthetic_passes(count):
+    rng = random.Random(0)
+    nfts, scans = [], []
+    for i in range(count):
+        booking_uuid = str(uuid.uuid4())
+        ticket = {
+            'booking_ref': ''.join(rng.choices('ABCDEFGHJKLMNPQRSTUVWXYZ23456789', k=6)),
+            'user_id': f"passenger{i}", 'flight': FLIGHT, 'from': 'LHR', 'to': 'JFK',
+            'seat': f"{i // 6 + 1}{'ABCDEF'[i % 6]}", 'class': 'Economy', 'departure': DEPARTURE,
+        }
+        nft = build_ticket_payload('bench', booking_uuid, '', ticket)
+        nft['id'] = f"nft_{i}"
+        nfts.append(nft)
+        scans.append(encode_ticket(ticket, booking_uuid))
+    return nfts, scans
+
+
+async def run_gates(port, scans, gates, repeat_rate):
+    latencies = []
+    statuses = {}
+    shares = [scans[i::gates] for i in range(gates)]
+
+    async def one_gate(number, share):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        queue = share + random.Random(number).sample(share, int(len(share) * repeat_rate))
+        for scan in queue:
+            start = time.perf_counter()
+            writer.write(f"G{number} {scan}\n".encode())
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - start)
+            statuses[response['status']] = statuses.get(response['status'], 0) + 1
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_gate(n, share) for n, share in enumerate(shares)))
+    return time.perf_counter() - start, latencies, statuses
+
+
+async def stage(nfts, scans, gates, repeat_rate):
+    with tempfile.TemporaryDirectory() as tmp:
+        index = gate.PassIndex(FLIGHT, DEPARTURE[:10], os.path.join(tmp, 'boarding.jsonl'))
+        for nft in nfts:
+            index.add_nft(nft)
+        server = gate.GateServer(index)
+        listener = await asyncio.start_server(server._handle, '127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            elapsed, latencies, statuses = await run_gates(port, scans, gates, repeat_rate)
+        index.close()
+    cuts = statistics.quantiles(latencies, n=100)
+    print(f"{gates:>6}{len(latencies):>9}{len(latencies) / elapsed * 60:>14.0f}"
+          f"{cuts[49] * 1000:>9.2f}{cuts[98] * 1000:>9.2f}   {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--passes', type=int, default=5000)
+    parser.add_argument('--gates', default='1,8,32')
+    parser.add_argument('--repeat-rate', type=float, default=0.05, help="fraction of passes scanned twice")
+    args = parser.parse_args()
+
+    os.environ.setdefault('QR_SIGNING_KEY', 'bench')
+    nfts, scans = synthetic_passes(args.passes)
+    index = gate.PassIndex(FLIGHT)
+    for nft in nfts:
+        index.add_nft(nft)
+    start = time.perf_counter()
+    for scan in scans:
+        index.scan(scan, 'local')
+    print(f"in-process scan: {(time.perf_counter() - start) / len(scans) * 1e6:.1f} us\n")
+
+    print(f"{'gates':>6}{'scans':>9}{'scans/min':>14}{'p50 ms':>9}{'p99 ms':>9}   statuses")
+    for gates in (int(v) for v in args.gates.split(',')):
+        asyncio.run(stage(nfts, scans, gates, args.repeat_rate))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Memory per session with the shared image cache, and its hit rate under a tight budget.
+
+Every simulated session builds its own DocumentStore from a fresh copy
+of the same account's NFTs, as each Streamlit session does, and shows
+the first page of the Documents List; images are only decoded when shown.
+Per-session memory is measured with tracemalloc and compared with the
+inline base64 each session used to keep. A skewed access pattern is then replayed
+against a budget smaller than the working set, with and without a spill
+directory.
+
+    python benchmarks/bench_image_cache.py --documents 200 --sessions 100
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+import doc_cache
+import image_cache
+from doc_cache import DocumentCache
+from documents import DocumentStore
+from image_cache import SharedImageCache
+
+
+def synthetic_thumbnail(seed):
+    img = Image.effect_noise((256, 192), 32 + seed % 32).convert('RGB')
+    buf = io.BytesIO()
+    img.save(buf, format='JPEG', quality=85)
+    return buf.getvalue()
+
+
+def synthetic_nfts(count):
+    return [{
+        'id': f"nft_{i}", 'name': 'Transferable NFT', 'description': '', 'owner': 'bench',
+        'metadata': {
+            'id': str(uuid.uuid4()), 'document_type': 1 + i % 3, 'date_added': f"2025-01-{1 + i % 28:02d} 09:00:00",
+            'image': base64.b64encode(synthetic_thumbnail(i)).decode(), 'profile_type': 'Individual',
+        },
+    } for i in range(count)]
+
+
+PAGE_SIZE = 10
+
+
+def sessions_stage(nfts, sessions, tmp):
+    listing = json.dumps(nfts)
+    inline = sum(len(nft['metadata']['image']) for nft in nfts)
+    image_cache._shared = SharedImageCache(budget=1 << 40)
+    # Shown images are read from the NFT cache, as they are in the app
+    doc_cache._cache = DocumentCache(os.path.join(tmp, 'documents.db'))
+    for nft in nfts:
+        doc_cache._cache.upsert('bench', nft)
+    stores = []
+    tracemalloc.start()
+    for _ in range(sessions):
+        store = DocumentStore()
+        # doc_cache.documents() hands every session freshly decoded NFTs
+        store.sync(json.loads(listing))
+        for doc in store.page(1, PAGE_SIZE):
+            doc.image_data()
+        stores.append(store)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    shared = image_cache.get_shared_images().info()['resident_bytes']
+    print(f"{sessions} sessions x {len(nfts)} documents, {PAGE_SIZE} shown")
+    print(f"  inline base64 per session (before):  {inline / 2**20:8.2f} MiB")
+    print(f"  measured per session (now):          {(current - shared) / sessions / 2**20:8.2f} MiB")
+    print(f"  shared image bytes, once per process: {shared / 2**20:7.2f} MiB")
+    print(f"  total now vs before:                 {current / 2**20:8.1f} vs {inline * sessions / 2**20:.1f} MiB")
+
+
+def budget_stage(nfts, requests, budget_fraction, spill_dir):
+    images = [base64.b64decode(nft['metadata']['image']) for nft in nfts]
+    working_set = sum(len(data) for data in images)
+    cache = SharedImageCache(budget=int(working_set * budget_fraction), spill_dir=spill_dir)
+    keys = [cache.put(data) for data in images]
+    rng = random.Random(0)
+    by_key = dict(zip(keys, images))
+    for _ in range(requests):
+        # Recent documents are viewed far more often than old ones
+        key = keys[min(int(rng.paretovariate(1.2)) - 1, len(keys) - 1)]
+        cache.get(key, lambda: by_key[key])
+    info = cache.info()
+    label = 'spill' if spill_dir else 'reload'
+    print(f"  {label:<8}{budget_fraction:>7.0%}{info['hit_rate']:>10.1%}{info['spill_hits']:>8}{info['misses']:>8}"
+          f"{info['evictions']:>11}{info['resident_bytes'] / 2**20:>14.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--documents', type=int, default=200)
+    parser.add_argument('--sessions', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args()
+
+    nfts = synthetic_nfts(args.documents)
+    with tempfile.TemporaryDirectory() as tmp:
+        sessions_stage(nfts, args.sessions, tmp)
+        print()
+        print(f"  {'on miss':<8}{'budget':>7}{'hit rate':>10}{'spill':>8}{'miss':>8}{'evictions':>11}{'resident MiB':>14}")
+        for fraction in (0.1, 0.5):
+            budget_stage(nfts, args.requests, fraction, None)
+            budget_stage(nfts, args.requests, fraction, os.path.join(tmp, str(fraction)))
+
+
+if __name__ == '__main__':
+    main()
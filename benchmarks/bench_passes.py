@@ -0,0 +1,52 @@
+"""Boarding-pass rendering throughput: passes per second by format and worker count.
+
+Renders a synthetic flight into a temporary directory as per-passenger
+PNGs, per-passenger PDFs and one combined PDF, and reports the parent
+process's peak RSS, which should not grow with the flight size.
+
+    python benchmarks/bench_passes.py --passes 2000 --workers 1,4
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import passes
+
+STAGES = (('png', False), ('pdf', False), ('pdf', True))
+
+
+def synthetic_tickets(count):
+    return [{
+        'booking_ref': f"B{i:05d}"[-6:], 'user_id': f"passenger{i}", 'flight': 'AN214',
+        'route': 'LHR-JFK', 'from': 'LHR', 'to': 'JFK', 'seat': f"{i // 6 + 1}{'ABCDEF'[i % 6]}",
+        'class': 'Economy', 'departure': '2025-06-01 14:30', 'arrival': '2025-06-01 21:55',
+        'booking_uuid': str(uuid.uuid4()),
+    } for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--passes', type=int, default=2000)
+    parser.add_argument('--workers', default=f"1,{os.cpu_count() or 1}")
+    args = parser.parse_args()
+
+    os.environ.setdefault('QR_SIGNING_KEY', 'bench')
+    tickets = synthetic_tickets(args.passes)
+    print(f"{'format':<14}{'workers':>8}{'passes/s':>10}{'KB/pass':>9}{'files':>7}{'peak RSS MB':>13}")
+    for workers in sorted({int(v) for v in args.workers.split(',')}):
+        for fmt, combined in STAGES:
+            with tempfile.TemporaryDirectory() as tmp:
+                result = passes.render_passes(tickets, tmp, fmt, combined, workers)
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            label = f"{fmt}{' combined' if combined else ''}"
+            print(f"{label:<14}{workers:>8}{result['rate']:>10.1f}{result['bytes'] / result['passes'] / 1024:>9.1f}"
+                  f"{len(result['files']):>7}{rss:>13.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Cold vs warm vs batched QR rendering throughput.
+
+    python benchmarks/bench_qr.py --count 500 --workers 4
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import qr_render
+
+
+def timed(label, fn, n):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {n / elapsed:10.1f} codes/s  ({elapsed * 1000 / n:.3f} ms each)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    payloads = [str(uuid.uuid4()) for _ in range(args.count)]
+    qr_render.configure(cache_size=args.count * 2, cache_dir='')
+
+    timed('cold render_qr', lambda: [qr_render.render_qr(p) for p in payloads], args.count)
+    timed('warm render_qr', lambda: [qr_render.render_qr(p) for p in payloads], args.count)
+
+    qr_render.clear_cache()
+    timed(f'batched render_many (x{args.workers})',
+          lambda: qr_render.render_many(payloads, workers=args.workers), args.count)
+    print(qr_render.cache_info())
+
+
+if __name__ == '__main__':
+    main()
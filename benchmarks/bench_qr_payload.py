@@ -0,0 +1,87 @@
+"""Compact signed QR payloads vs the JSON they replace: size and time.
+
+    python benchmarks/bench_qr_payload.py --count 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import qrcode
+
+import qr_render
+from documents import Document
+from qr_payload import decode, encode_document, encode_ticket
+
+KEY = b'bench'
+
+
+def sample_ticket():
+    return {
+        'booking_ref': 'K7Q2ZD', 'user_id': str(uuid.uuid4()), 'flight': 'AN214',
+        'route': 'LHR-JFK', 'from': 'LHR', 'to': 'JFK', 'seat': '23C', 'class': 'Economy',
+        'departure': '2025-06-01 14:30', 'arrival': '2025-06-01 21:55',
+    }
+
+
+def sample_document():
+    return Document.from_nft({'id': 'nft', 'owner': 'bench', 'metadata': {
+        'id': str(uuid.uuid4()), 'document_type': 1, 'date_added': '2025-01-15 09:12:44',
+        'image': '', 'profile_type': 'Individual',
+    }})
+
+
+def qr_version(data):
+    qr = qrcode.QRCode()
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.version
+
+
+def mean_us(fn, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def report(label, data, count):
+    qr_render.clear_cache()
+    start = time.perf_counter()
+    for _ in range(count):
+        png = qr_render._render(data)
+    render_ms = (time.perf_counter() - start) / count * 1000
+    print(f"{label:<22}{len(data):>7}{qr_version(data):>9}{len(png):>11}{render_ms:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=200)
+    args = parser.parse_args()
+
+    ticket, booking_uuid = sample_ticket(), str(uuid.uuid4())
+    doc = sample_document()
+    ticket_json = json.dumps({**ticket, 'booking_uuid': booking_uuid})
+    document_json = json.dumps({'document_id': doc.id, 'document_type': doc.label, 'date_added': doc.date_added})
+    ticket_compact = encode_ticket(ticket, booking_uuid, KEY)
+    document_compact = encode_document(doc, KEY)
+
+    print(f"{'payload':<22}{'chars':>7}{'version':>9}{'png bytes':>11}{'render ms':>12}")
+    report('ticket json', ticket_json, args.count)
+    report('ticket compact', ticket_compact, args.count)
+    report('document json', document_json, args.count)
+    report('document compact', document_compact, args.count)
+
+    n = args.count * 50
+    print()
+    print(f"{'encode_ticket':<22}{mean_us(lambda: encode_ticket(ticket, booking_uuid, KEY), n):10.1f} us")
+    print(f"{'decode ticket':<22}{mean_us(lambda: decode(ticket_compact, KEY), n):10.1f} us")
+    print(f"{'json.loads ticket':<22}{mean_us(lambda: json.loads(ticket_json), n):10.1f} us  (unsigned)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Seat allocation throughput under thread and process contention.
+
+Every worker keeps asking for next-available seats on the same flights, so
+all of them fight over the same rows of one seat database; once a class is
+full the request is refused, which is counted as an operation too. Run
+against one flight (worst case) and spread over many, with workers as
+threads of one process or as separate processes sharing the database, and
+check that no seat was handed out twice.
+
+    python benchmarks/bench_seats.py --threads 1,4,16 --processes 4 --flights 1,50
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from seats import CLASSES, SeatInventory, SeatUnavailable
+
+
+def flight_keys(flights):
+    return [f"LHR-JFK 2025-06-{i:04d}" for i in range(flights)]
+
+
+def allocate(inventory, flights, rounds):
+    """(assigned (flight, seat) pairs, refused count) for one worker"""
+    assigned, refused = [], 0
+    for _ in range(rounds):
+        for flight in flight_keys(flights):
+            for seat_class in CLASSES:
+                try:
+                    assigned.append((flight, inventory.assign(flight, seat_class)))
+                except SeatUnavailable:
+                    refused += 1
+    return assigned, refused
+
+
+def process_worker(path, flights, rounds, start, queue):
+    inventory = SeatInventory(path)
+    start.wait()
+    queue.put(allocate(inventory, flights, rounds))
+
+
+def run_threads(path, threads, flights, rounds):
+    inventory = SeatInventory(path)
+    results = [None] * threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(n):
+        barrier.wait()
+        results[n] = allocate(inventory, flights, rounds)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def run_processes(path, processes, flights, rounds):
+    SeatInventory(path).close()
+    start, queue = multiprocessing.Event(), multiprocessing.Queue()
+    pool = [multiprocessing.Process(target=process_worker, args=(path, flights, rounds, start, queue))
+            for _ in range(processes)]
+    for process in pool:
+        process.start()
+    # Let every worker open its connection before the clock starts
+    time.sleep(0.5)
+    began = time.perf_counter()
+    start.set()
+    results = [queue.get() for _ in pool]
+    elapsed = time.perf_counter() - began
+    for process in pool:
+        process.join()
+    return results, elapsed
+
+
+def run(mode, workers, flights, rounds):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'seats.db')
+        runner = run_threads if mode == 'threads' else run_processes
+        results, elapsed = runner(path, workers, flights, rounds)
+        seats = [seat for assigned, _ in results for seat in assigned]
+        assert len(seats) == len(set(seats)), "a seat was assigned twice"
+        return len(seats), len(seats) + sum(refused for _, refused in results), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', default='1,4,16')
+    parser.add_argument('--processes', default='4')
+    parser.add_argument('--flights', default='1,50')
+    parser.add_argument('--rounds', type=int, default=20, help="passes over the flights per worker")
+    args = parser.parse_args()
+
+    print(f"{'flights':>8}{'mode':>11}{'workers':>9}{'seats':>9}{'ops':>9}{'ops/s':>12}")
+    for flights in (int(v) for v in args.flights.split(',')):
+        for mode in ('threads', 'processes'):
+            for workers in (int(v) for v in getattr(args, mode).split(',') if v):
+                seats, ops, elapsed = run(mode, workers, flights, args.rounds)
+                print(f"{flights:>8}{mode:>11}{workers:>9}{seats:>9}{ops:>9}{ops / elapsed:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Cold import time and memory of the apps' modules.
+
+Each target is imported in a fresh interpreter so nothing is cached:
+
+    python benchmarks/bench_startup.py --repeat 5
+    python benchmarks/bench_startup.py --importtime     # per-module breakdown
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CORE = ['backend_client', 'bootstrap', 'documents', 'doc_cache', 'image_cache', 'qr_render',
+        'tickets', 'bulk_issue']
+HEAVY = ['requests', 'qrcode', 'PIL.Image', 'pandas']
+
+TARGETS = {
+    'core modules (lazy)': CORE,
+    'heavy dependencies': HEAVY,
+    'core + heavy (eager equivalent)': CORE + HEAVY,
+}
+
+PROBE = """
+import resource, time
+start = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def probe(modules):
+    code = PROBE.format(imports='\n'.join(f"import {m}" for m in modules))
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    elapsed, maxrss = result.stdout.split()
+    return float(elapsed), int(maxrss)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--importtime', action='store_true', help="print the slowest imports of the core modules")
+    args = parser.parse_args()
+
+    print(f"{'target':<34}{'import ms':>12}{'max RSS MB':>12}")
+    for label, modules in TARGETS.items():
+        runs = [probe(modules) for _ in range(args.repeat)]
+        if None in runs:
+            print(f"{label:<34}{'unavailable (missing dependency)':>24}")
+            continue
+        elapsed = statistics.median(r[0] for r in runs) * 1000
+        # ru_maxrss is in KiB on Linux
+        rss = statistics.median(r[1] for r in runs) / 1024
+        print(f"{label:<34}{elapsed:>12.1f}{rss:>12.1f}")
+
+    if args.importtime:
+        code = '\n'.join(f"import {m}" for m in CORE)
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                                cwd=ROOT, capture_output=True, text=True)
+        rows = []
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, cumulative, name = (part.strip() for part in line.split(':', 1)[1].split('|'))
+            rows.append((int(cumulative), name))
+        print("\nSlowest cumulative imports (us):")
+        for cumulative, name in sorted(rows, reverse=True)[:15]:
+            print(f"{cumulative:>10}  {name}")
+
+
+if __name__ == '__main__':
+    main()
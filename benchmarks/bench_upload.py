@@ -0,0 +1,129 @@
+"""Peak memory of saving a document upload, for 1-20 MB camera photos.
+
+Compares the original inline path (getvalue(), base64 of the full image
+embedded in the session document and in the mint payload, then JSON for
+the request) with the streaming path: the upload is read in place, the
+JPEG is decoded at a reduced DCT scale, the normalized image goes to the
+blob store and the mint body is sent as encoded once. Each measurement
+runs in a fresh process and reports the peak RSS above the upload itself.
+
+    python benchmarks/bench_upload.py --sizes 1,5,10,20
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = ('inline', 'streaming')
+
+
+def camera_photo(path, megabytes):
+    """A noisy JPEG of roughly the given size, which compresses about as badly as a camera photo"""
+    from PIL import Image
+
+    # Noise at quality 95 comes to about 0.8 bytes per pixel
+    pixels = megabytes * 1024 * 1024 / 0.8
+    width = int((pixels * 4 / 3) ** 0.5)
+    img = Image.effect_noise((width, width * 3 // 4), 40).convert('RGB')
+    img.save(path, format='JPEG', quality=95)
+    return os.path.getsize(path), img.size
+
+
+def _status(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) * 1024
+    return None
+
+
+def reset_peak():
+    """Reset the peak RSS where Linux allows it; returns the current RSS to measure from"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return _status('VmRSS')
+    except OSError:
+        return peak_rss()
+
+
+def peak_rss():
+    try:
+        return _status('VmHWM')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_inline(upload):
+    # The original save_document: the whole image as base64, in the session and the payload
+    data = upload.getvalue()
+    image_b64 = base64.b64encode(data).decode()
+    document = {'id': 'doc', 'document_type': 1, 'image': image_b64, 'profile_type': 'Individual'}
+    payload = {'name': 'Transferable NFT', 'description': '', 'owner': 'bench', 'metadata': dict(document)}
+    body = json.dumps(payload).encode()
+    return len(body)
+
+
+def run_streaming(upload, blob_dir):
+    from backend_client import json_chunks
+    from blob_store import BlobStore
+    from documents import build_document_payload
+    from media import normalize_image
+
+    normalized = normalize_image(upload)
+    BlobStore(blob_dir).put(normalized.data)
+    payload = build_document_payload('bench', 1, 'Individual', base64.b64encode(normalized.thumbnail).decode(),
+                                     normalized.sha256)
+    # What the outbox stores, and then the chunks a dict payload is streamed as
+    stored = json.dumps(payload)
+    return len(stored) + sum(len(chunk) for chunk in json_chunks(payload))
+
+
+def child(mode, path):
+    """Run one mode in this process and print its peak memory above the loaded upload"""
+    from PIL import Image  # noqa: F401  (imported before the baseline is taken)
+    import documents  # noqa: F401
+
+    with open(path, 'rb') as f:
+        upload = io.BytesIO(f.read())
+    baseline = reset_peak()
+    with tempfile.TemporaryDirectory() as blob_dir:
+        start = time.perf_counter()
+        sent = run_inline(upload) if mode == 'inline' else run_streaming(upload, blob_dir)
+        elapsed = time.perf_counter() - start
+    print(json.dumps({'peak': peak_rss() - baseline, 'seconds': elapsed, 'sent': sent}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1,5,10,20', help="photo sizes in MB")
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    print(f"{'photo':>14}{'':>12}{'mode':>11}{'peak MB':>10}{'x photo':>9}{'ms':>9}{'body KB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for megabytes in (float(v) for v in args.sizes.split(',')):
+            path = os.path.join(tmp, f"{megabytes}.jpg")
+            size, (width, height) = camera_photo(path, megabytes)
+            for mode in MODES:
+                out = subprocess.run([sys.executable, __file__, '--child', mode, path],
+                                     capture_output=True, text=True, check=True, cwd=ROOT).stdout
+                result = json.loads(out)
+                print(f"{size / 2**20:>10.1f} MB{f'{width}x{height}':>12}{mode:>11}{result['peak'] / 2**20:>10.1f}"
+                      f"{result['peak'] / size:>9.1f}{result['seconds'] * 1000:>9.0f}{result['sent'] / 1024:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Tiny benchmark harness: registry, timing, JSON results and comparison.
+
+Cases register with @benchmark and return a zero-argument callable to
+time, so setup work stays out of the measurement.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+BENCHMARKS = []
+
+
+def benchmark(name, params=(None,)):
+    """Register a case; the decorated function takes a param and returns the callable to time"""
+    def register(fn):
+        for param in params:
+            BENCHMARKS.append((name if param is None else f"{name}[{param}]", fn, param))
+        return fn
+    return register
+
+
+def measure(fn, repeat=5, min_time=0.2):
+    """Per-call timings in seconds, timeit-style: autorange then repeat"""
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    runs = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'min': min(runs),
+        'median': statistics.median(runs),
+        'mean': statistics.fmean(runs),
+        'stdev': statistics.stdev(runs) if len(runs) > 1 else 0.0,
+        'number': number,
+        'repeat': repeat,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(pattern=None, repeat=5):
+    results = {}
+    for name, fn, param in BENCHMARKS:
+        if pattern and pattern not in name:
+            continue
+        target = fn(param)
+        stats = measure(target, repeat=repeat)
+        results[name] = stats
+        print(f"{name:<48} {format_time(stats['median']):>10}  (min {format_time(stats['min'])})")
+        teardown = getattr(target, 'teardown', None)
+        if teardown:
+            teardown()
+    return results
+
+
+def save(results, path=None):
+    commit = git_commit()
+    path = path or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({
+            'commit': commit,
+            'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'results': results,
+        }, f, indent=2)
+    return path
+
+
+def compare(results, baseline_path, threshold=0.10):
+    """Print median ratios against a saved run; returns the names that regressed"""
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline['commit']} ({baseline['timestamp']}):")
+    regressions = []
+    for name, stats in results.items():
+        old = baseline['results'].get(name)
+        if not old:
+            continue
+        ratio = stats['median'] / old['median']
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = '  faster'
+        print(f"{name:<48} {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def format_time(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
@@ -0,0 +1,257 @@
+"""Benchmark suite for the document and ticket hot paths.
+
+    python benchmarks/suite.py                      # run everything, save results/<commit>.json
+    python benchmarks/suite.py -k documents_list    # only matching cases
+    python benchmarks/suite.py --compare benchmarks/results/abc1234.json
+
+Backend round-trips run against the local_ledger stand-in.
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+import doc_cache
+import image_cache
+import qr_render
+from backend_client import BackendClient
+from booking_refs import BookingReferences
+from doc_cache import DocumentCache
+from documents import Document, DocumentStore, build_document_payload
+from harness import benchmark, compare, run, save
+from local_ledger import Ledger, in_process_client, serve_in_background
+from media import normalize_image
+from qr_payload import encode_document, encode_ticket
+from tickets import generate_qr_code, render_ticket_html
+
+IMAGE_SIZES = ('640x480', '1920x1080', '4032x3024')
+DOCUMENT_COUNTS = (10, 100, 1000)
+PAGE_SIZE = 10
+
+
+def synthetic_photo(size):
+    """JPEG bytes of a noisy image, which compresses about as badly as a camera photo"""
+    width, height = (int(v) for v in size.split('x'))
+    img = Image.effect_noise((width, height), 64).convert('RGB')
+    buf = io.BytesIO()
+    img.save(buf, format='JPEG', quality=90)
+    return buf.getvalue()
+
+
+def synthetic_documents(count):
+    thumbnail = base64.b64encode(normalize_image(synthetic_photo('640x480')).thumbnail).decode()
+    return [{
+        'id': str(uuid.uuid4()),
+        'name': 'Transferable NFT',
+        'owner': 'bench',
+        'metadata': {
+            'id': str(uuid.uuid4()),
+            'document_type': i % 3 + 1,
+            'date_added': f"2025-01-{i % 28 + 1:02d} {i % 24:02d}:00:00",
+            'image': thumbnail,
+            'profile_type': 'Individual',
+        },
+    } for i in range(count)]
+
+
+def cache_documents(documents, target):
+    """Serve documents from a temporary NFT cache, which shown images are read from, until teardown"""
+    tmp = tempfile.TemporaryDirectory()
+    doc_cache._cache = DocumentCache(os.path.join(tmp.name, 'documents.db'))
+    doc_cache._cache.sync(SimpleNamespace(get_account_nfts=lambda account: documents), 'bench')
+
+    def teardown():
+        doc_cache._cache = None
+        tmp.cleanup()
+    target.teardown = teardown
+    return target
+
+
+# app.py: save_document --------------------------------------------------------
+
+@benchmark('save_document.payload', params=IMAGE_SIZES)
+def save_document_payload(size):
+    data = synthetic_photo(size)
+
+    def target():
+        normalized = normalize_image(data)
+        thumbnail_b64 = base64.b64encode(normalized.thumbnail).decode()
+        payload = build_document_payload('bench', 1, 'Individual', thumbnail_b64, normalized.sha256)
+        return json.dumps(payload)
+    return target
+
+
+@benchmark('save_document.raw_base64', params=IMAGE_SIZES)
+def save_document_raw_base64(size):
+    data = synthetic_photo(size)
+
+    def target():
+        payload = build_document_payload('bench', 1, 'Individual', base64.b64encode(data).decode())
+        return json.dumps(payload)
+    return target
+
+
+# app.py: Documents List / Details tabs ----------------------------------------
+
+@benchmark('documents_list.rerun', params=DOCUMENT_COUNTS)
+def documents_list_rerun(count):
+    documents = synthetic_documents(count)
+
+    store = DocumentStore()
+    store.sync(documents)
+
+    def target():
+        return [image_cache.preview_image(doc.image_ref, doc.image_data) for doc in store.page(1, PAGE_SIZE)]
+    return cache_documents(documents, target)
+
+
+@benchmark('documents_list.cold', params=DOCUMENT_COUNTS)
+def documents_list_cold(count):
+    documents = synthetic_documents(count)
+
+    def target():
+        image_cache.clear_cache()
+        store = DocumentStore()
+        store.sync(documents)
+        return [image_cache.preview_image(doc.image_ref, doc.image_data) for doc in store.page(1, PAGE_SIZE)]
+    return cache_documents(documents, target)
+
+
+@benchmark('details_qr', params=('warm', 'cold', 'cold_json'))
+def details_qr(mode):
+    doc = Document.from_nft(synthetic_documents(1)[0])
+    key = b'bench'
+
+    def target():
+        if mode != 'warm':
+            qr_render.clear_cache()
+        if mode == 'cold_json':
+            # The verbose payload the Details tab used to encode
+            data = json.dumps({
+                'document_id': doc.id,
+                'document_type': doc.label,
+                'date_added': doc.date_added,
+            })
+        else:
+            data = encode_document(doc, key)
+        return qr_render.render_qr(data)
+    return target
+
+
+# ticketgiver.py -------------------------------------------------------------
+
+@benchmark('ticket_generation')
+def ticket_generation(_):
+    departure = datetime(2025, 6, 1, 14, 30)
+    # A throwaway store, so the runs do not use up production references
+    tmp = tempfile.TemporaryDirectory()
+    refs = BookingReferences(os.path.join(tmp.name, 'refs.db'))
+
+    def target():
+        booking_ref = refs.next()
+        booking_uuid = str(uuid.uuid4())
+        ticket = {
+            'booking_ref': booking_ref, 'user_id': 'bench1', 'flight': 'AN123',
+            'from': 'LHR', 'to': 'JFK', 'seat': '12A', 'class': 'Economy',
+            'departure': departure.strftime("%Y-%m-%d %H:%M"),
+        }
+        qr_code = generate_qr_code(encode_ticket(ticket, booking_uuid, b'bench'))
+        return render_ticket_html(ticket, booking_uuid, qr_code, departure, departure + timedelta(hours=7))
+
+    def teardown():
+        refs.close()
+        tmp.cleanup()
+    target.teardown = teardown
+    return target
+
+
+@benchmark('booking_refs.issue', params=(1, 100, 1000))
+def booking_refs_issue(batch):
+    tmp = tempfile.TemporaryDirectory()
+    service = BookingReferences(os.path.join(tmp.name, 'refs.db'))
+
+    def target():
+        return service.issue(batch)
+
+    def teardown():
+        service.close()
+        tmp.cleanup()
+    target.teardown = teardown
+    return target
+
+
+# backend round-trips --------------------------------------------------------
+
+def _mint_payload():
+    return build_document_payload('bench', 1, 'Individual', '')
+
+
+@benchmark('backend.mint', params=('in_process', 'http'))
+def backend_mint(transport):
+    ledger = Ledger()
+    ledger.create_account('bench')
+    if transport == 'in_process':
+        client = in_process_client(ledger)
+        server = None
+    else:
+        server, base = serve_in_background(ledger)
+        client = BackendClient(base)
+
+    def target():
+        return client.mint_nft(_mint_payload())
+
+    def teardown():
+        client.close()
+        if server:
+            server.shutdown()
+    target.teardown = teardown
+    return target
+
+
+@benchmark('backend.list_nfts', params=(10, 100))
+def backend_list_nfts(count):
+    ledger = Ledger()
+    ledger.create_account('bench')
+    for _ in range(count):
+        ledger.mint_nft(_mint_payload())
+    server, base = serve_in_background(ledger)
+    client = BackendClient(base)
+
+    def target():
+        return client.get_account_nfts('bench')
+
+    def teardown():
+        client.close()
+        server.shutdown()
+    target.teardown = teardown
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument('-k', dest='pattern', help="only run cases whose name contains this")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="results path (default: benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', help="previous results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="slowdown ratio flagged as a regression")
+    args = parser.parse_args()
+
+    results = run(args.pattern, repeat=args.repeat)
+    print(f"\nSaved {save(results, args.output)}")
+    if args.compare:
+        if compare(results, args.compare, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
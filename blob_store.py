@@ -0,0 +1,47 @@
+import hashlib
+import os
+
+DEFAULT_BLOB_DIR = os.getenv('BLOB_STORE_DIR', 'blobs')
+
+
+class BlobStore:
+    """Local content-addressed store: blobs are files named by their SHA-256"""
+
+    def __init__(self, root=DEFAULT_BLOB_DIR):
+        self.root = root
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put(self, data):
+        """Store bytes and return their hex digest; storing the same bytes twice is a no-op"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return digest
+
+    def get(self, digest):
+        """Return the stored bytes, or None if this store does not hold the blob"""
+        try:
+            with open(self.path(digest), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def __contains__(self, digest):
+        return os.path.exists(self.path(digest))
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = BlobStore()
+    return _store
@@ -45,6 +45,9 @@ struct NftDocument{
     image:String,
     date_added:String,
     profile_type:String,
+    // SHA-256 of the full-size image when `image` only carries a thumbnail
+    #[serde(default, skip_serializing_if = "Option::is_none")]
+    image_sha256:Option<String>,
 }
 
 #[derive(Debug, Deserialize)]
@@ -79,6 +82,8 @@ struct Blockchain {
     difficulty: u32,
     accounts: HashMap<String, Account>,
     nfts: HashMap<String, NFT>,
+    // metadata.id -> NFT id, so re-submitting the same document is idempotent
+    minted_documents: HashMap<String, String>,
 }
 
 // Application state
@@ -143,6 +148,7 @@ impl Blockchain {
             difficulty: 4,
             accounts: HashMap::new(),
             nfts: HashMap::new(),
+            minted_documents: HashMap::new(),
         }
     }
 
@@ -173,10 +179,18 @@ impl Blockchain {
             return Err("Account does not exist".to_string());
         }
 
+        // A retried submission of an already minted document returns the original NFT
+        if let Some(nft_id) = self.minted_documents.get(&request.metadata.id) {
+            if let Some(nft) = self.nfts.get(nft_id) {
+                return Ok(nft.clone());
+            }
+        }
+
         let _metadata = request.metadata;
         println!("Metadata: {:?}", _metadata);
 
-        let nft_id = format!("nft_{}", Utc::now().timestamp());
+        // The chain height makes ids unique even for many mints per second
+        let nft_id = format!("nft_{}_{}", Utc::now().timestamp(), self.chain.len());
         let nft = NFT {
             id: nft_id.clone(),
             name: request.name,
@@ -196,6 +210,7 @@ impl Blockchain {
             account.nfts.push(nft_id.clone());
         }
 
+        self.minted_documents.insert(nft.metadata.id.clone(), nft_id.clone());
         self.nfts.insert(nft_id, nft.clone());
         self.chain.push(block);
         Ok(nft)
@@ -214,6 +229,18 @@ impl Blockchain {
         }
     }
 
+    fn get_account_nft_ids(&self, account_id: &str) -> Result<Vec<String>, String> {
+        self.accounts.get(account_id)
+            .map(|account| account.nfts.clone())
+            .ok_or("Account not found".to_string())
+    }
+
+    fn get_nft(&self, nft_id: &str) -> Result<NFT, String> {
+        self.nfts.get(nft_id)
+            .cloned()
+            .ok_or("NFT not found".to_string())
+    }
+
     fn transfer_nft(&mut self, request: TransferNFTRequest) -> Result<NFT, String> {
         // Validate sender account exists
         let from_account = self.accounts.get(&request.from)
@@ -311,6 +338,28 @@ async fn get_account_nfts(
     }
 }
 
+async fn get_account_nft_ids(
+    data: web::Data<AppState>,
+    account_id: web::Path<String>,
+) -> impl Responder {
+    let blockchain = data.blockchain.lock().unwrap();
+    match blockchain.get_account_nft_ids(&account_id) {
+        Ok(nft_ids) => HttpResponse::Ok().json(nft_ids),
+        Err(e) => HttpResponse::NotFound().body(e),
+    }
+}
+
+async fn get_nft(
+    data: web::Data<AppState>,
+    nft_id: web::Path<String>,
+) -> impl Responder {
+    let blockchain = data.blockchain.lock().unwrap();
+    match blockchain.get_nft(&nft_id) {
+        Ok(nft) => HttpResponse::Ok().json(nft),
+        Err(e) => HttpResponse::NotFound().body(e),
+    }
+}
+
 async fn transfer_nft(
     data: web::Data<AppState>,
     request: web::Json<TransferNFTRequest>,
@@ -329,14 +378,24 @@ async fn main() -> std::io::Result<()> {
         blockchain: Mutex::new(Blockchain::new()),
     });
 
+    // Mint bodies carry base64 images and may arrive chunked; actix's 2 MB
+    // default would reject the larger ones
+    let json_limit = std::env::var("JSON_LIMIT_BYTES")
+        .ok()
+        .and_then(|value| value.parse::<usize>().ok())
+        .unwrap_or(32 * 1024 * 1024);
+
     println!("Server running at http://localhost:8080");
 
     HttpServer::new(move || {
         App::new()
             .app_data(app_state.clone())
+            .app_data(web::JsonConfig::default().limit(json_limit))
             .route("/accounts", web::post().to(create_account))
             .route("/nfts", web::post().to(mint_nft))
             .route("/accounts/{account_id}/nfts", web::get().to(get_account_nfts))
+            .route("/accounts/{account_id}/nft_ids", web::get().to(get_account_nft_ids))
+            .route("/nfts/{nft_id}", web::get().to(get_nft))
             .route("/nfts/transfer", web::post().to(transfer_nft))
     })
     .bind("127.0.0.1:8080")?
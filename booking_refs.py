@@ -0,0 +1,258 @@
+"""Unique booking references, issued in batches.
+
+References are 6 characters over A-Z0-9 (36**6, about 2.2 billion codes)
+drawn with the secrets module. Every issued code is kept as an integer in
+SQLite, which is the exact record and survives restarts. A Bloom filter in
+memory answers "never issued" for almost every fresh candidate, so only the
+rare filter hits cost a database lookup. At the default error rate the
+filter takes about 1.8 MB per million references.
+
+Several processes may share the database (the apps and bulk_issue.py):
+each batch is written inside an IMMEDIATE transaction, after folding in
+the rows other writers added since the last batch.
+"""
+import math
+import os
+import secrets
+import sqlite3
+import threading
+
+import perf
+
+ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+LENGTH = 6
+SPACE = len(ALPHABET) ** LENGTH
+
+DEFAULT_PATH = os.getenv('BOOKING_REFS_PATH', 'booking_refs.db')
+DEFAULT_CAPACITY = 1_000_000
+DEFAULT_ERROR_RATE = 0.001
+POOL_SIZE = 256
+# A batch that still falls short after this many draws means the space is nearly full
+MAX_DRAW_ROUNDS = 64
+_LOOKUP_CHUNK = 500
+_MASK = (1 << 64) - 1
+
+
+# Every 3-character half, so encoding a code is one divmod and a concatenation
+_HALF = len(ALPHABET) ** (LENGTH // 2)
+_HALVES = [a + b + c for a in ALPHABET for b in ALPHABET for c in ALPHABET]
+
+
+def encode(code):
+    """Booking reference string for an integer code"""
+    high, low = divmod(code, _HALF)
+    return _HALVES[high] + _HALVES[low]
+
+
+def decode(ref):
+    """Integer code for a booking reference; raises ValueError if malformed"""
+    ref = str(ref).strip().upper()
+    if len(ref) != LENGTH:
+        raise ValueError(f"Booking reference must be {LENGTH} characters: {ref!r}")
+    code = 0
+    for char in ref:
+        index = ALPHABET.find(char)
+        if index < 0:
+            raise ValueError(f"Invalid character in booking reference: {ref!r}")
+        code = code * len(ALPHABET) + index
+    return code
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over integer codes"""
+
+    def __init__(self, capacity, error_rate=DEFAULT_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, code):
+        # splitmix64 finalizer, then double hashing for the k positions
+        z = (code + 0x9E3779B97F4A7C15) & _MASK
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK
+        z ^= z >> 31
+        step = ((z * 0xD6E8FEB86659FD93) & _MASK) | 1
+        size = self.size
+        return [(z + i * step) % size for i in range(self.hashes)]
+
+    def add(self, code, positions=None):
+        bits = self.bits
+        for position in positions or self.positions(code):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def test(self, positions):
+        bits = self.bits
+        for position in positions:
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __contains__(self, code):
+        return self.test(self.positions(code))
+
+    @property
+    def nbytes(self):
+        return len(self.bits)
+
+
+class BookingReferences:
+    """Issues booking references that are unique across everything ever issued"""
+
+    def __init__(self, path=DEFAULT_PATH, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE,
+                 pool_size=POOL_SIZE):
+        self.path = path
+        self.error_rate = error_rate
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._pool = []
+        self._seen_seq = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS refs (
+                seq INTEGER PRIMARY KEY,
+                code INTEGER NOT NULL UNIQUE
+            )
+        ''')
+        stored = self._conn.execute('SELECT COUNT(*) FROM refs').fetchone()[0]
+        self._filter = BloomFilter(max(capacity, stored * 2), error_rate)
+        with self._lock:
+            self._catch_up()
+
+    def _catch_up(self):
+        """Fold rows written since the last batch (by any process) into the filter"""
+        rows = self._conn.execute('SELECT seq, code FROM refs WHERE seq > ? ORDER BY seq', (self._seen_seq,))
+        for seq, code in rows:
+            self._filter.add(code)
+            self._seen_seq = seq
+        if self._filter.count > self._filter.capacity:
+            self._grow()
+
+    def _grow(self):
+        grown = BloomFilter(self._filter.capacity * 2, self.error_rate)
+        for code, in self._conn.execute('SELECT code FROM refs WHERE seq <= ?', (self._seen_seq,)):
+            grown.add(code)
+        self._filter = grown
+        perf.count('booking_refs_filter_grown_total')
+
+    def _lookup(self, codes):
+        """The subset of codes already in the store"""
+        found = set()
+        codes = list(codes)
+        for start in range(0, len(codes), _LOOKUP_CHUNK):
+            chunk = codes[start:start + _LOOKUP_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            found.update(code for code, in self._conn.execute(
+                f'SELECT code FROM refs WHERE code IN ({placeholders})', chunk))
+        return found
+
+    def _draw(self, count):
+        """count unissued codes, each mapped to its filter positions"""
+        accepted = {}
+        bloom = self._filter
+        for _ in range(MAX_DRAW_ROUNDS):
+            need = count - len(accepted)
+            if not need:
+                return accepted
+            raw = secrets.token_bytes(8 * need)
+            maybe = {}
+            for i in range(0, len(raw), 8):
+                # 64 random bits reduced mod 36**6: the modulo bias is below 1e-9
+                code = int.from_bytes(raw[i:i + 8], 'big') % SPACE
+                if code in accepted:
+                    continue
+                positions = bloom.positions(code)
+                if bloom.test(positions):
+                    maybe[code] = positions
+                else:
+                    accepted[code] = positions
+            if maybe:
+                perf.count('booking_refs_filter_hits_total', len(maybe))
+                taken = self._lookup(maybe)
+                accepted.update((code, positions) for code, positions in maybe.items() if code not in taken)
+        if len(accepted) < count:
+            raise RuntimeError("Booking reference space is exhausted")
+        return accepted
+
+    def issue(self, count):
+        """Issue count new references and record them before returning"""
+        if count <= 0:
+            return []
+        with self._lock, perf.timed('booking_refs_issue'):
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._catch_up()
+                codes = self._draw(count)
+                self._conn.executemany('INSERT INTO refs (code) VALUES (?)', [(code,) for code in codes])
+                last_seq = self._conn.execute('SELECT MAX(seq) FROM refs').fetchone()[0]
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            for code, positions in codes.items():
+                self._filter.add(code, positions)
+            self._seen_seq = last_seq
+            if self._filter.count > self._filter.capacity:
+                self._grow()
+        perf.count('booking_refs_issued_total', count)
+        return [encode(code) for code in codes]
+
+    def next(self):
+        """One reference, taken from a pool refilled a batch at a time.
+
+        Pooled references are recorded as issued when the pool is filled, so
+        any left unused at shutdown are simply never handed out.
+        """
+        with self._lock:
+            if self._pool:
+                return self._pool.pop()
+        refs = self.issue(self.pool_size)
+        with self._lock:
+            self._pool.extend(refs[1:])
+        return refs[0]
+
+    def __contains__(self, ref):
+        try:
+            code = decode(ref)
+        except ValueError:
+            return False
+        with self._lock:
+            self._catch_up()
+            if code not in self._filter:
+                return False
+            return bool(self._lookup([code]))
+
+    def __len__(self):
+        return self._filter.count
+
+    def stats(self):
+        with self._lock:
+            return {
+                'issued': self._filter.count,
+                'pooled': len(self._pool),
+                'filter_capacity': self._filter.capacity,
+                'filter_bytes': self._filter.nbytes,
+                'filter_hashes': self._filter.hashes,
+            }
+
+    def close(self):
+        self._conn.close()
+
+
+_refs = None
+_refs_lock = threading.Lock()
+
+
+def get_booking_references():
+    """The process-wide booking reference service"""
+    global _refs
+    if _refs is None:
+        with _refs_lock:
+            if _refs is None:
+                _refs = BookingReferences()
+    return _refs
@@ -0,0 +1,50 @@
+"""One-time bootstrap of the app's ledger accounts.
+
+The .env file is loaded once, and each id file is read (or created and registered with the ledger) once per
+process and then served from memory, so Streamlit sessions and reruns do
+no file I/O or network calls for it.
+"""
+import functools
+import os
+import threading
+import uuid
+
+from backend_client import get_client
+
+USER_ID_FILE = 'user_id.txt'
+COMPANY_ID_FILE = 'company_id.txt'
+
+_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _load_account_id(path):
+    with _lock:
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                return f.read().strip()
+
+        account_id = str(uuid.uuid4())
+        # Register first so a failed registration is retried next time
+        # instead of leaving an id on disk that the ledger never saw
+        get_client().create_account(account_id)
+        with open(path, 'w') as f:
+            f.write(account_id)
+        return account_id
+
+
+@functools.lru_cache(maxsize=None)
+def load_environment():
+    """Load .env into the process environment once"""
+    import dotenv
+    dotenv.load_dotenv()
+
+
+def get_user_id():
+    """The dashboard's account id; raises BackendError if it cannot be registered"""
+    return _load_account_id(USER_ID_FILE)
+
+
+def get_company_id():
+    """The ticket issuer's account id; raises BackendError if it cannot be registered"""
+    return _load_account_id(COMPANY_ID_FILE)
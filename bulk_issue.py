@@ -0,0 +1,327 @@
+"""Bulk boarding-pass issuance from a flight manifest.
+
+Each manifest row (user_id, seat, class, route, time) is minted as an NFT
+owned by the company and then transferred to the passenger. Rows run
+through an asyncio pipeline with bounded concurrency, and every stage is
+appended to a journal so an interrupted batch can be resumed: a row's
+booking id, reference and seat are journaled before its mint is sent, so
+a retried mint carries the same metadata id and the ledger does not mint
+it twice.
+Seats come from the seat inventory: a row's seat is reserved before its
+mint (or the next free seat of its class if the seat column is blank)
+and is kept by the row when it is resumed.
+When a flight schedule is configured, each row is resolved against it by
+its optional flight column, or by route and departure time:
+
+    python bulk_issue.py manifest.csv --company-id <id> --concurrency 32
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+
+from backend_client import BackendClient, BackendError
+from flights import get_catalog
+from integrity import get_integrity_store
+from qr_payload import encode_ticket
+from seats import flight_key, get_seat_inventory
+from tickets import (build_ticket_payload, generate_booking_reference, generate_booking_references,
+                     generate_qr_code, generate_qr_codes)
+
+MANIFEST_COLUMNS = ['user_id', 'seat', 'class', 'route', 'time']
+DEFAULT_CONCURRENCY = 16
+
+
+def load_manifest(source):
+    """Load a manifest from a CSV path, file object or DataFrame"""
+    import pandas as pd
+
+    if isinstance(source, pd.DataFrame):
+        manifest = source.copy()
+    else:
+        manifest = pd.read_csv(source, dtype=str)
+    manifest.columns = [str(c).strip().lower() for c in manifest.columns]
+    missing = [c for c in MANIFEST_COLUMNS if c not in manifest.columns]
+    if missing:
+        raise ValueError(f"Manifest is missing columns: {', '.join(missing)}")
+    return manifest.fillna('')
+
+
+def row_key(row):
+    """Stable key identifying a manifest row across runs"""
+    raw = '|'.join(str(row[c]).strip() for c in MANIFEST_COLUMNS)
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def journal_path_for(manifest, directory='batches'):
+    """Journal file derived from the manifest contents, so re-running the same manifest resumes it"""
+    digest = hashlib.sha256(''.join(row_key(r) for _, r in manifest.iterrows()).encode()).hexdigest()[:16]
+    return os.path.join(directory, f"{digest}.jsonl")
+
+
+class Journal:
+    """Append-only JSONL record of completed mint/transfer stages"""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A torn last line from an interrupted run
+                        continue
+                    self.entries.setdefault(entry['key'], {}).update(entry)
+        self._file = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(path, 'a')
+
+    def get(self, key):
+        return self.entries.get(key, {})
+
+    def record(self, key, **fields):
+        entry = {'key': key, **fields}
+        self.entries.setdefault(key, {}).update(entry)
+        if self._file:
+            self._file.write(json.dumps(entry) + '\n')
+            self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+def resolve_flight(row, catalog):
+    """The scheduled flight for a row, or None without a catalog; ValueError if it is not scheduled"""
+    if catalog is None:
+        return None
+    if 'flight' in row and row['flight']:
+        scheduled = catalog.find(row['flight'], row['time'])
+    else:
+        scheduled = catalog.at(row['route'], row['time'])
+    if scheduled is None:
+        raise ValueError(f"No scheduled flight for {row['route']} at {row['time']}")
+    return scheduled
+
+
+def ticket_fields(row, booking_ref, seat=None, scheduled=None):
+    origin, _, destination = str(row['route']).partition('-')
+    ticket = {
+        'booking_ref': booking_ref,
+        'user_id': str(row['user_id']).strip(),
+        'route': str(row['route']).strip(),
+        'from': origin.strip(),
+        'to': destination.strip(),
+        'seat': seat or str(row['seat']).strip(),
+        'class': str(row['class']).strip(),
+        'departure': str(row['time']).strip(),
+    }
+    if 'flight' in row and row['flight']:
+        ticket['flight'] = str(row['flight']).strip()
+    if scheduled:
+        ticket.update({
+            'flight': scheduled.flight,
+            'route': scheduled.route,
+            'from': scheduled.origin,
+            'to': scheduled.destination,
+            'departure': scheduled.departure.strftime("%Y-%m-%d %H:%M"),
+            'arrival': scheduled.arrival.strftime("%Y-%m-%d %H:%M"),
+        })
+    return ticket
+
+
+def prepare_row(row, booking_ref, previous=None):
+    """Resolve a row's flight, reserve its seat and build its ticket and QR payload.
+
+    previous is the row's journaled 'prepared' state, whose booking id and
+    seat are reused: the seat is still held by that earlier attempt.
+    """
+    scheduled = resolve_flight(row, get_catalog())
+    if previous:
+        flight, seat, booking_uuid = previous['flight'], previous['seat'], previous['booking_uuid']
+    else:
+        if scheduled:
+            flight = flight_key(scheduled.route, scheduled.departure.strftime("%Y-%m-%d %H:%M"))
+        else:
+            flight = flight_key(row['route'], row['time'])
+        seat = get_seat_inventory().assign(flight, str(row['class']).strip(), str(row['seat']).strip() or None)
+        booking_uuid = str(uuid.uuid4())
+    ticket = ticket_fields(row, booking_ref, seat, scheduled)
+    return {
+        'booking_uuid': booking_uuid,
+        'booking_ref': booking_ref,
+        'flight': flight,
+        'seat': seat,
+        'ticket': ticket,
+        'qr_payload': encode_ticket(ticket, booking_uuid),
+    }
+
+
+def resume_or_prepare(index, row, journal, booking_ref=None):
+    """Prepare a row, reusing what a previous run journaled, and journal it before its mint"""
+    key = row_key(row)
+    state = journal.get(key)
+    previous = state if state.get('stage') == 'prepared' else None
+    if previous:
+        booking_ref = previous['booking_ref']
+    prepared = prepare_row(row, booking_ref or generate_booking_reference(), previous)
+    if not previous:
+        journal.record(key, row=index, stage='prepared', booking_uuid=prepared['booking_uuid'],
+                       booking_ref=prepared['booking_ref'], flight=prepared['flight'], seat=prepared['seat'])
+    return prepared
+
+
+async def issue_row(client, company_id, index, row, journal, prepared=None):
+    """Mint and transfer a single manifest row, skipping stages already journaled.
+
+    prepared optionally carries the prepare_row() result with its 'qr_code' rendered ahead of time.
+    """
+    key = row_key(row)
+    state = journal.get(key)
+    if state.get('stage') == 'transferred':
+        return state
+
+    if state.get('stage') != 'minted':
+        if prepared is None:
+            prepared = resume_or_prepare(index, row, journal)
+            prepared['qr_code'] = await asyncio.to_thread(generate_qr_code, prepared['qr_payload'])
+        booking_uuid, seat = prepared['booking_uuid'], prepared['seat']
+        user_id = str(row['user_id']).strip()
+        try:
+            # The transfer would fail on an unknown passenger after the mint,
+            # leaving the ticket stranded on the company account
+            await asyncio.to_thread(client.get_account_nft_ids, user_id)
+        except BackendError as e:
+            if e.status_code == 404:
+                get_seat_inventory().release(prepared['flight'], seat)
+                journal.record(key, row=index, stage='rejected')
+                raise ValueError(f"Unknown passenger account: {user_id}") from e
+            raise
+        payload = build_ticket_payload(company_id, booking_uuid, prepared['qr_code'], prepared['ticket'])
+        get_integrity_store().record(company_id, payload)
+        try:
+            nft = await asyncio.to_thread(client.mint_nft, payload)
+        except BackendError as e:
+            # A rejected mint issued nothing, so the seat can be taken again; after a
+            # timeout or 5xx the mint may still have landed, so the seat stays held
+            if e.status_code is not None and e.status_code < 500:
+                get_seat_inventory().release(prepared['flight'], seat)
+                journal.record(key, row=index, stage='rejected')
+            raise
+        journal.record(key, row=index, stage='minted', nft_id=nft['id'], booking_uuid=booking_uuid,
+                       booking_ref=prepared['booking_ref'], seat=seat)
+        state = journal.get(key)
+
+    await asyncio.to_thread(client.transfer_nft, company_id, str(row['user_id']).strip(), state['nft_id'])
+    journal.record(key, row=index, stage='transferred')
+    return journal.get(key)
+
+
+async def issue_batch(manifest, company_id, client=None, concurrency=DEFAULT_CONCURRENCY,
+                      journal_path=None, progress=None):
+    """Issue every row of a manifest.
+
+    Returns a dict with the issued tickets and the per-row failures. The
+    optional progress callback is called as progress(done, total, failed).
+    """
+    manifest = load_manifest(manifest)
+    client = client or BackendClient(pool_size=concurrency)
+    journal = Journal(journal_path)
+    semaphore = asyncio.Semaphore(concurrency)
+    total = len(manifest)
+    issued, failures = [], []
+
+    # Prepare every row still to be minted up front and render their QR
+    # codes on a process pool, instead of one at a time inside the
+    # network pipeline
+    # Identical lines share one journal key and would be issued once while
+    # counted twice, so every repeat is rejected instead
+    first_rows, duplicates = {}, {}
+    for index, row in manifest.iterrows():
+        first = first_rows.setdefault(row_key(row), index)
+        if first != index:
+            duplicates[index] = ValueError(f"Duplicate of manifest row {first}")
+
+    pending = [(index, row) for index, row in manifest.iterrows()
+               if index not in duplicates
+               and journal.get(row_key(row)).get('stage') not in ('minted', 'transferred')]
+    fresh = sum(journal.get(row_key(row)).get('stage') != 'prepared' for _, row in pending)
+    refs = iter(await asyncio.to_thread(generate_booking_references, fresh))
+    prepared, rejected = {}, {}
+    for index, row in pending:
+        key = row_key(row)
+        booking_ref = None if journal.get(key).get('stage') == 'prepared' else next(refs)
+        try:
+            prepared[key] = resume_or_prepare(index, row, journal, booking_ref)
+        except ValueError as e:
+            rejected[key] = e
+    payloads = [entry['qr_payload'] for entry in prepared.values()]
+    qr_codes = await asyncio.to_thread(generate_qr_codes, payloads) if payloads else []
+    for entry, qr_code in zip(prepared.values(), qr_codes):
+        entry['qr_code'] = qr_code
+
+    async def worker(index, row):
+        async with semaphore:
+            try:
+                if index in duplicates:
+                    raise duplicates[index]
+                if row_key(row) in rejected:
+                    raise rejected[row_key(row)]
+                issued.append(await issue_row(client, company_id, index, row, journal,
+                                              prepared.get(row_key(row))))
+            except (BackendError, ValueError, KeyError) as e:
+                failures.append({'row': index, 'user_id': row['user_id'], 'error': str(e)})
+            if progress:
+                progress(len(issued) + len(failures), total, len(failures))
+
+    try:
+        await asyncio.gather(*(worker(i, row) for i, row in manifest.iterrows()))
+    finally:
+        journal.close()
+    return {'issued': issued, 'failures': failures}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Issue boarding passes for a flight manifest")
+    parser.add_argument('manifest', help="CSV with columns: " + ', '.join(MANIFEST_COLUMNS))
+    parser.add_argument('--company-id', help="issuing account (defaults to company_id.txt)")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--journal', help="resume journal path (defaults to batches/<manifest digest>.jsonl)")
+    args = parser.parse_args()
+
+    company_id = args.company_id
+    if not company_id:
+        with open('company_id.txt', 'r') as f:
+            company_id = f.read().strip()
+
+    manifest = load_manifest(args.manifest)
+    journal = args.journal or journal_path_for(manifest)
+
+    def report(done, total, failed):
+        print(f"\r{done}/{total} processed, {failed} failed", end='', flush=True)
+
+    start = time.perf_counter()
+    result = asyncio.run(issue_batch(manifest, company_id, concurrency=args.concurrency,
+                                     journal_path=journal, progress=report))
+    elapsed = time.perf_counter() - start
+    print()
+    print(f"Issued {len(result['issued'])} tickets in {elapsed:.1f}s "
+          f"({len(result['issued']) / max(elapsed, 1e-9) * 60:.0f}/min), journal: {journal}")
+    for failure in result['failures']:
+        print(f"  row {failure['row']} ({failure['user_id']}): {failure['error']}")
+
+
+if __name__ == '__main__':
+    main()
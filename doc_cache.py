@@ -0,0 +1,174 @@
+"""Local SQLite cache of each account's NFTs.
+
+The first sync for an account downloads the full list once. Later syncs
+only ask the ledger for the account's NFT ids, fetch the ones not seen
+before and drop the ones transferred away. Syncs run in the background
+once the cached copy is older than the TTL, and newly minted NFTs are
+written straight into the cache.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from backend_client import BackendError
+
+DEFAULT_CACHE_PATH = os.getenv('DOCUMENT_CACHE_PATH', 'documents.db')
+DEFAULT_TTL = float(os.getenv('DOCUMENT_CACHE_TTL', '30'))
+
+# sync() fetches unseen NFTs one round trip after another while a page
+# waits; past this many, one full listing of the account returns sooner
+FULL_FETCH_THRESHOLD = 20
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentCache:
+    """Per-account NFT cache shared by every session in the process"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._revisions = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS nfts (
+                id TEXT PRIMARY KEY,
+                account TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS nfts_account ON nfts (account, position);
+            CREATE TABLE IF NOT EXISTS sync (
+                account TEXT PRIMARY KEY,
+                synced_at REAL NOT NULL
+            );
+        ''')
+        self._conn.commit()
+
+    def documents(self, account):
+        """Cached NFTs for an account, in ledger order"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT data FROM nfts WHERE account = ? ORDER BY position', (account,)
+            ).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def get(self, nft_id):
+        """One cached NFT by id, or None"""
+        with self._lock:
+            row = self._conn.execute('SELECT data FROM nfts WHERE id = ?', (nft_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def ids(self, account):
+        with self._lock:
+            rows = self._conn.execute('SELECT id FROM nfts WHERE account = ?', (account,)).fetchall()
+        return {nft_id for nft_id, in rows}
+
+    def synced_at(self, account):
+        with self._lock:
+            row = self._conn.execute('SELECT synced_at FROM sync WHERE account = ?', (account,)).fetchone()
+        return row[0] if row else None
+
+    def revision(self, account):
+        """Counter bumped whenever an account's cached NFTs change in this process"""
+        return self._revisions.get(account, 0)
+
+    def _bump(self, account):
+        self._revisions[account] = self._revisions.get(account, 0) + 1
+
+    def is_stale(self, account):
+        synced_at = self.synced_at(account)
+        return synced_at is None or time.time() - synced_at > self.ttl
+
+    def upsert(self, account, nft):
+        """Insert or replace a single NFT, e.g. right after minting it"""
+        with self._lock:
+            position = self._conn.execute(
+                'SELECT COALESCE(MAX(position) + 1, 0) FROM nfts WHERE account = ?', (account,)
+            ).fetchone()[0]
+            self._conn.execute(
+                'INSERT OR REPLACE INTO nfts (id, account, position, data) VALUES (?, ?, ?, ?)',
+                (nft['id'], account, position, json.dumps(nft)),
+            )
+            self._conn.commit()
+            self._bump(account)
+
+    def _replace(self, account, ids, fetched):
+        """Make the cache hold exactly ids (in order), adding the fetched NFTs"""
+        keep = set(ids)
+        with self._lock:
+            known = self._conn.execute('SELECT id FROM nfts WHERE account = ?', (account,)).fetchall()
+            removed = [(nft_id,) for nft_id, in known if nft_id not in keep]
+            self._conn.executemany('DELETE FROM nfts WHERE id = ?', removed)
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO nfts (id, account, position, data) VALUES (?, ?, ?, ?)',
+                [(nft['id'], account, 0, json.dumps(nft)) for nft in fetched],
+            )
+            self._conn.executemany(
+                'UPDATE nfts SET position = ? WHERE id = ?',
+                [(position, nft_id) for position, nft_id in enumerate(ids)],
+            )
+            self._conn.execute(
+                'INSERT OR REPLACE INTO sync (account, synced_at) VALUES (?, ?)', (account, time.time())
+            )
+            self._conn.commit()
+            if fetched or removed or account not in self._revisions:
+                self._bump(account)
+
+    def sync(self, client, account):
+        """Bring the cache up to date with the ledger, fetching only unseen NFTs"""
+        known = self.ids(account)
+        if not known:
+            nfts = client.get_account_nfts(account)
+            self._replace(account, [nft['id'] for nft in nfts], nfts)
+            return len(nfts)
+
+        ids = client.get_account_nft_ids(account)
+        unseen = [nft_id for nft_id in ids if nft_id not in known]
+        if len(unseen) > FULL_FETCH_THRESHOLD:
+            fetched = client.get_account_nfts(account)
+            ids = [nft['id'] for nft in fetched]
+        else:
+            fetched = [client.get_nft(nft_id) for nft_id in unseen]
+        self._replace(account, ids, fetched)
+        return len(fetched)
+
+    def refresh_in_background(self, client, account):
+        """Start a background sync if the cache is stale and none is running"""
+        if not self.is_stale(account):
+            return False
+        with self._lock:
+            if account in self._refreshing:
+                return False
+            self._refreshing.add(account)
+
+        def run():
+            try:
+                self.sync(client, account)
+            except BackendError as e:
+                logger.warning("Background document sync failed: %s", e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(account)
+
+        threading.Thread(target=run, name=f"doc-sync-{account}", daemon=True).start()
+        return True
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_document_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DocumentCache()
+    return _cache
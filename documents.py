@@ -0,0 +1,312 @@
+"""Document logic behind the dashboard, importable without Streamlit.
+
+Heavy dependencies (PIL, requests) are only imported by the functions that
+need them, so importing this module is cheap.
+"""
+import base64
+import bisect
+import uuid
+from datetime import datetime
+from enum import IntEnum
+
+import perf
+from backend_client import get_client
+from blob_store import get_store
+from doc_cache import get_document_cache
+from image_cache import get_shared_images
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+DOCUMENT_TYPES = {
+    'passport': 'International travel document',
+    'id_card': 'National identification card',
+    'pass': 'Access or membership pass'
+}
+
+class DocumentType(IntEnum):
+    """Document type as stored in NFT metadata"""
+    PASSPORT = 1
+    ID_CARD = 2
+    PASS = 3
+
+    @property
+    def key(self):
+        """Key used in DOCUMENT_TYPES and the sidebar form"""
+        return self.name.lower()
+
+    @property
+    def label(self):
+        return DOCUMENT_TYPE_LABELS[self]
+
+    @classmethod
+    def parse(cls, value):
+        """Accept the stored int, a DOCUMENT_TYPES key or a display label"""
+        if isinstance(value, int):
+            try:
+                return cls(value)
+            except ValueError:
+                return cls.PASS
+        value = str(value)
+        for member in cls:
+            if value in (member.key, member.label):
+                return member
+        return cls.PASS
+
+
+DOCUMENT_TYPE_LABELS = {
+    DocumentType.PASSPORT: 'Passport',
+    DocumentType.ID_CARD: 'ID Card',
+    DocumentType.PASS: 'Pass',
+}
+
+
+def document_type_label(document_type):
+    """Display label for a document type stored as int or as a key/label string"""
+    return DocumentType.parse(document_type).label
+
+
+def parse_date_added(value):
+    try:
+        return datetime.strptime(value, DATE_FORMAT)
+    except (TypeError, ValueError):
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            return datetime.min
+
+
+class Document:
+    """A document NFT's metadata, converted once from the ledger JSON"""
+    __slots__ = ('id', 'nft_id', 'owner', 'document_type', 'date_added', 'added_at',
+                 'profile_type', 'image_sha256', '_image_ref', '_image_b64', '_has_image')
+
+    def __init__(self, id, document_type, date_added, profile_type, image,
+                 image_sha256=None, nft_id=None, owner=None):
+        self.id = id
+        self.nft_id = nft_id
+        self.owner = owner
+        self.document_type = DocumentType.parse(document_type)
+        self.date_added = date_added
+        self.added_at = parse_date_added(date_added)
+        self.profile_type = profile_type
+        self.image_sha256 = image_sha256
+        # The image is decoded into the shared cache the first time it is shown; until then a
+        # document minted as an NFT keeps nothing, since the image can be read from the NFT cache
+        self._image_ref = None
+        self._has_image = bool(image)
+        self._image_b64 = image if image and not nft_id else None
+
+    @classmethod
+    def from_nft(cls, nft):
+        metadata = nft['metadata']
+        return cls(
+            metadata['id'],
+            metadata['document_type'],
+            metadata['date_added'],
+            metadata['profile_type'],
+            metadata['image'],
+            image_sha256=metadata.get('image_sha256'),
+            nft_id=nft.get('id'),
+            owner=nft.get('owner'),
+        )
+
+    @property
+    def label(self):
+        return self.document_type.label
+
+    @property
+    def image_ref(self):
+        """Content hash of the image in the shared cache, decoding it on first use"""
+        if self._image_ref is None and self._has_image:
+            data = self._load_image()
+            if data is not None:
+                self._image_ref = get_shared_images().put(data)
+        return self._image_ref
+
+    def image_data(self):
+        """Decoded inline image bytes, fetched again from the NFT cache if they were evicted"""
+        return get_shared_images().get(self.image_ref, self._load_image)
+
+    def _load_image(self):
+        if self._image_b64:
+            return base64.b64decode(self._image_b64)
+        nft = get_document_cache().get(self.nft_id) if self.nft_id else None
+        if nft is None or not nft['metadata'].get('image'):
+            return None
+        return base64.b64decode(nft['metadata']['image'])
+
+    def __repr__(self):
+        return f"Document(id={self.id!r}, type={self.document_type.name}, date_added={self.date_added!r})"
+
+
+class DocumentStore:
+    """Documents indexed by id and kept sorted by date added.
+
+    Lookups are O(1); inserts keep the order with bisect, and filtered or
+    reversed views are memoized until the next change.
+    """
+
+    def __init__(self):
+        self._by_id = {}
+        self._by_nft = {}
+        self._order = []  # (added_at, id), ascending
+        self._views = {}
+        self.revision = None
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __contains__(self, document_id):
+        return document_id in self._by_id
+
+    def get(self, document_id):
+        return self._by_id.get(document_id)
+
+    def add(self, document):
+        if document.id in self._by_id:
+            self.remove(document.id)
+        self._by_id[document.id] = document
+        if document.nft_id:
+            self._by_nft[document.nft_id] = document.id
+        bisect.insort(self._order, (document.added_at, document.id))
+        self._views.clear()
+
+    def remove(self, document_id):
+        document = self._by_id.pop(document_id, None)
+        if document is None:
+            return
+        self._by_nft.pop(document.nft_id, None)
+        index = bisect.bisect_left(self._order, (document.added_at, document_id))
+        del self._order[index]
+        self._views.clear()
+
+    def sync(self, nfts, revision=None):
+        """Make the store match a list of NFTs, converting only ones not seen before"""
+        seen = set()
+        for nft in nfts:
+            document_id = self._by_nft.get(nft['id'])
+            if document_id is None:
+                document = Document.from_nft(nft)
+                self.add(document)
+                document_id = document.id
+            seen.add(document_id)
+        for document_id in [d for d in self._by_id if d not in seen]:
+            self.remove(document_id)
+        self.revision = revision
+
+    def ordered(self, newest_first=True, document_type=None):
+        """Documents sorted by date added, optionally of one type"""
+        key = (newest_first, document_type)
+        view = self._views.get(key)
+        if view is None:
+            view = [self._by_id[document_id] for _, document_id in self._order]
+            if document_type is not None:
+                view = [doc for doc in view if doc.document_type == document_type]
+            if newest_first:
+                view.reverse()
+            self._views[key] = view
+        return view
+
+    def page(self, page, page_size, newest_first=True, document_type=None):
+        return paginate(self.ordered(newest_first, document_type), page, page_size)
+
+
+def build_document_payload(owner, document_type, profile_type, image_b64, image_sha256=None):
+    """Create the NFT mint payload for an uploaded document"""
+    metadata = {
+        'id': str(uuid.uuid4()),  # Generate UUID for document
+        'document_type': document_type,
+        'date_added': datetime.now().strftime(DATE_FORMAT),
+        'image': image_b64,
+        'profile_type': str(profile_type)
+    }
+    if image_sha256:
+        metadata['image_sha256'] = image_sha256
+    return {
+        "name": "Transferable NFT",
+        "description": "This NFT will be transferred",
+        "owner": owner,
+        "metadata": metadata
+    }
+
+
+def page_count(total, page_size):
+    return max(1, (total + page_size - 1) // page_size)
+
+
+def paginate(documents, page, page_size):
+    """Documents shown on a 1-based page"""
+    start = (page - 1) * page_size
+    return documents[start:start + page_size]
+
+
+def load_documents(owner, store):
+    """Refresh a DocumentStore from the local NFT cache, syncing with the ledger when needed.
+
+    Only the very first sync blocks (and may raise BackendError); later calls
+    use the cache and refresh it in the background once it is stale. The
+    store is only touched when the cache changed since its last refresh.
+    """
+    with perf.timed('fetch_documents'):
+        doc_cache = get_document_cache()
+        if doc_cache.synced_at(owner) is None:
+            doc_cache.sync(get_client(), owner)
+        else:
+            doc_cache.refresh_in_background(get_client(), owner)
+        revision = doc_cache.revision(owner)
+        if store.revision != revision:
+            store.sync(doc_cache.documents(owner), revision)
+        return store
+
+
+@perf.timed_function('save_document')
+def store_document(owner, document_type, profile_type, source):
+    """Normalize an upload, keep the full image locally and queue its mint.
+
+    source is the upload's bytes or a binary file object, which is read in
+    place rather than copied. Returns the document id; the outbox worker
+    mints it in the background.
+    """
+    from integrity import get_integrity_store
+    from media import normalize_image
+    from outbox import get_outbox
+
+    # Keep the full-size image in the local blob store and only send a
+    # thumbnail plus the content hash to the ledger
+    with perf.timed('normalize_image'):
+        normalized = normalize_image(source)
+    get_store().put(normalized.data)
+    thumbnail_b64 = base64.b64encode(normalized.thumbnail).decode()
+
+    payload = build_document_payload(owner, document_type, profile_type, thumbnail_b64, normalized.sha256)
+    get_integrity_store().record(owner, payload)
+    return get_outbox().enqueue(owner, payload)
+
+
+def verify_documents(owner, progress=None):
+    """Check every NFT the owner holds against the digests recorded when it was minted"""
+    from integrity import verify_account
+
+    return verify_account(owner, progress=progress)
+
+
+def unsent_documents(owner):
+    """Documents still waiting in (or rejected by) the outbox"""
+    from outbox import get_outbox
+
+    return get_outbox().entries(owner)
+
+
+def retry_document(key):
+    from outbox import get_outbox
+
+    get_outbox().retry(key)
+
+
+def load_full_image(doc):
+    """Full-size image bytes from the blob store, falling back to the inline image"""
+    if doc.image_sha256:
+        data = get_store().get(doc.image_sha256)
+        if data is not None:
+            return data
+    return doc.image_data()
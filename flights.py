@@ -0,0 +1,233 @@
+"""Flight schedule catalog.
+
+The schedule (CSV or Parquet, one row per scheduled departure) is loaded
+once into sorted NumPy columns with arrival times precomputed:
+
+    flight,origin,destination,departure,duration_minutes
+    AN101,LHR,JFK,2025-06-01 09:30,475
+
+An `arrival` column may be given instead of `duration_minutes`. Rows are
+sorted by route and departure, so a route is one contiguous slice and a
+day within it is a binary search; flight number + date is a dict lookup,
+and autocomplete is a bisect over the sorted flight numbers and airports.
+
+FLIGHT_SCHEDULE_PATH points the apps at a schedule; `python flights.py
+--generate season.csv` writes a synthetic full-season one.
+"""
+import argparse
+import bisect
+import os
+import threading
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+SCHEDULE_COLUMNS = ['flight', 'origin', 'destination', 'departure']
+DEFAULT_SCHEDULE_PATH = os.getenv('FLIGHT_SCHEDULE_PATH', 'flights.csv')
+
+
+class Flight(namedtuple('Flight', ['flight', 'origin', 'destination', 'departure', 'arrival'])):
+    __slots__ = ()
+
+    @property
+    def route(self):
+        return f"{self.origin}-{self.destination}"
+
+
+def read_schedule(source):
+    """Load a schedule from a CSV or Parquet path, file object or DataFrame"""
+    import pandas as pd
+
+    if isinstance(source, pd.DataFrame):
+        frame = source.copy()
+    elif str(getattr(source, 'name', source)).lower().endswith('.parquet'):
+        frame = pd.read_parquet(source)
+    else:
+        frame = pd.read_csv(source, dtype=str)
+    frame.columns = [str(c).strip().lower() for c in frame.columns]
+    missing = [c for c in SCHEDULE_COLUMNS if c not in frame.columns]
+    if 'arrival' not in frame.columns and 'duration_minutes' not in frame.columns:
+        missing.append('arrival or duration_minutes')
+    if missing:
+        raise ValueError(f"Schedule is missing columns: {', '.join(missing)}")
+    return frame
+
+
+def _day(value):
+    """'YYYY-MM-DD' for a date, datetime or date-like string"""
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m-%d')
+    return str(value).strip()[:10]
+
+
+class FlightCatalog:
+    """Columnar, indexed view of a flight schedule"""
+
+    def __init__(self, source):
+        import numpy as np
+        import pandas as pd
+
+        frame = read_schedule(source)
+        flight = frame['flight'].astype(str).str.strip().str.upper().to_numpy()
+        origin = frame['origin'].astype(str).str.strip().str.upper().to_numpy()
+        destination = frame['destination'].astype(str).str.strip().str.upper().to_numpy()
+        departure = pd.to_datetime(frame['departure']).to_numpy('datetime64[m]')
+        if 'arrival' in frame.columns:
+            arrival = pd.to_datetime(frame['arrival']).to_numpy('datetime64[m]')
+        else:
+            minutes = pd.to_numeric(frame['duration_minutes']).to_numpy('int64')
+            arrival = departure + minutes.astype('timedelta64[m]')
+
+        order = np.lexsort((departure, destination, origin))
+        self.flight = flight[order]
+        self.origin = origin[order]
+        self.destination = destination[order]
+        self.departure = departure[order]
+        self.arrival = arrival[order]
+        days = self.departure.astype('datetime64[D]').astype(str)
+
+        # route -> (start, stop) slice of the sorted columns
+        routes = np.char.add(np.char.add(self.origin.astype(str), '-'), self.destination.astype(str))
+        starts = np.flatnonzero(np.r_[True, routes[1:] != routes[:-1]])
+        stops = np.r_[starts[1:], len(routes)]
+        self._routes = {routes[s]: (int(s), int(e)) for s, e in zip(starts, stops)}
+        self._destinations = {}
+        for route in self._routes:
+            origin_code, _, destination_code = route.partition('-')
+            self._destinations.setdefault(origin_code, []).append(destination_code)
+
+        self._by_flight = dict(zip(zip(self.flight.tolist(), days.tolist()), range(len(self.flight))))
+        self._flight_numbers = sorted(set(self.flight.tolist()))
+        self._airports = sorted(set(self.origin.tolist()) | set(self.destination.tolist()))
+
+    def __len__(self):
+        return len(self.flight)
+
+    def get(self, index):
+        return Flight(
+            str(self.flight[index]),
+            str(self.origin[index]),
+            str(self.destination[index]),
+            self.departure[index].item(),
+            self.arrival[index].item(),
+        )
+
+    def find(self, flight_number, day):
+        """The flight with this number departing on this day, or None"""
+        index = self._by_flight.get((str(flight_number).strip().upper(), _day(day)))
+        return None if index is None else self.get(index)
+
+    def on_route(self, origin, destination, day=None):
+        """Flights on a route in departure order, optionally only those departing on one day"""
+        import numpy as np
+
+        span = self._routes.get(f"{str(origin).strip().upper()}-{str(destination).strip().upper()}")
+        if span is None:
+            return []
+        start, stop = span
+        if day is not None:
+            departures = self.departure[start:stop]
+            first = np.datetime64(_day(day), 'm')
+            lo = int(np.searchsorted(departures, first, 'left'))
+            hi = int(np.searchsorted(departures, first + np.timedelta64(1, 'D'), 'left'))
+            start, stop = start + lo, start + hi
+        return [self.get(i) for i in range(start, stop)]
+
+    def at(self, route, departure):
+        """The flight on route ('LHR-JFK') leaving at exactly this time, or None"""
+        import numpy as np
+
+        origin, _, destination = str(route).partition('-')
+        span = self._routes.get(f"{origin.strip().upper()}-{destination.strip().upper()}")
+        if span is None:
+            return None
+        start, stop = span
+        try:
+            when = np.datetime64(departure if isinstance(departure, datetime) else str(departure).strip(), 'm')
+        except ValueError:
+            return None
+        index = start + int(np.searchsorted(self.departure[start:stop], when, 'left'))
+        if index < stop and self.departure[index] == when:
+            return self.get(index)
+        return None
+
+    def airports(self):
+        return list(self._airports)
+
+    def destinations(self, origin):
+        return list(self._destinations.get(str(origin).strip().upper(), []))
+
+    def complete(self, prefix, limit=10):
+        """Flight numbers starting with prefix, for autocomplete"""
+        return _complete(self._flight_numbers, prefix, limit)
+
+    def complete_airport(self, prefix, limit=10):
+        return _complete(self._airports, prefix, limit)
+
+
+def _complete(values, prefix, limit):
+    prefix = str(prefix).strip().upper()
+    start = bisect.bisect_left(values, prefix)
+    matches = []
+    for value in values[start:start + limit]:
+        if not value.startswith(prefix):
+            break
+        matches.append(value)
+    return matches
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog(path=None):
+    """The process-wide catalog, or None when no schedule file exists"""
+    global _catalog
+    if _catalog is None:
+        path = path or DEFAULT_SCHEDULE_PATH
+        if not os.path.exists(path):
+            return None
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = FlightCatalog(path)
+    return _catalog
+
+
+AIRPORTS = ['LHR', 'JFK', 'CDG', 'DXB', 'FRA', 'SIN', 'AMS', 'LAX', 'OTP', 'MAD', 'IST', 'HND']
+
+
+def generate_schedule(start, days, departures_per_day=3, airports=AIRPORTS):
+    """Synthetic schedule: every airport pair, departures_per_day flights a day"""
+    import pandas as pd
+
+    rows = []
+    pairs = [(a, b) for a in airports for b in airports if a != b]
+    for number, (origin, destination) in enumerate(pairs):
+        duration = 60 + (number * 37) % 660
+        for slot in range(departures_per_day):
+            flight = f"AN{100 + number * departures_per_day + slot}"
+            hour, minute = 6 + slot * 16 // departures_per_day, (number * 5) % 60
+            for day in range(days):
+                departure = datetime.combine(start + timedelta(days=day), datetime.min.time())
+                departure += timedelta(hours=hour, minutes=minute)
+                rows.append((flight, origin, destination, departure.strftime('%Y-%m-%d %H:%M'), duration))
+    return pd.DataFrame(rows, columns=SCHEDULE_COLUMNS + ['duration_minutes'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic flight schedule")
+    parser.add_argument('--generate', required=True, metavar='PATH', help="output .csv or .parquet file")
+    parser.add_argument('--start', type=date.fromisoformat, default=date.today())
+    parser.add_argument('--days', type=int, default=180)
+    parser.add_argument('--per-day', type=int, default=3, help="departures per route per day")
+    args = parser.parse_args()
+
+    schedule = generate_schedule(args.start, args.days, args.per_day)
+    if args.generate.lower().endswith('.parquet'):
+        schedule.to_parquet(args.generate, index=False)
+    else:
+        schedule.to_csv(args.generate, index=False)
+    print(f"Wrote {len(schedule)} departures to {args.generate}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,404 @@
+"""Boarding gate verification service.
+
+The passes issued for a flight are held in memory, indexed by booking
+uuid and booking ref, so a scan is a signature check (for qr_payload
+boarding passes, done offline) plus a dict lookup. Each pass boards
+once; a second scan at any gate is rejected as a duplicate. Boardings
+are appended to a log and replayed on restart.
+
+Passes are loaded from a snapshot, from the NFTs of an account, and from
+bulk_issue journals, which are tailed so newly minted tickets are added
+while the gates are open; every pass added while serving is fetched from
+the ledger, never taken from a gate connection. Gates connect over TCP
+and send one scan per line, either as JSON ({"gate": "A1", "scan": "..."})
+or as "<gate> <scan>"; every line gets a JSON reply. Only signed QR
+payloads are accepted unless --allow-booking-refs is given, for passes
+printed before QR payloads, where the gate agent checks the passenger's
+ID against the reference.
+
+    python gate.py --flight AN214 --date 2025-06-01 --journal batches/*.jsonl --port 9300
+"""
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+
+import perf
+from backend_client import BackendError
+from qr_payload import InvalidPayload, decode
+from tickets import TICKET_DOCUMENT_TYPE
+
+BOARDED = 'boarded'
+DUPLICATE = 'duplicate'
+UNKNOWN = 'unknown'
+WRONG_FLIGHT = 'wrong_flight'
+INVALID = 'invalid'
+
+REFRESH_INTERVAL = 5.0
+FETCH_CONCURRENCY = 16
+# Unseen passes are fetched FETCH_CONCURRENCY at a time between scans; a
+# full listing re-sends the whole account, so it only pays off once the
+# per-id fetches would take several rounds
+FULL_FETCH_THRESHOLD = 4 * FETCH_CONCURRENCY
+BOOKING_REF_LENGTH = 6
+
+logger = logging.getLogger(__name__)
+
+
+class Pass:
+    """One issued boarding pass"""
+
+    __slots__ = ('booking_uuid', 'booking_ref', 'nft_id', 'flight', 'departure', 'seat', 'seat_class',
+                 'user_id', 'boarded_at', 'gate')
+
+    def __init__(self, booking_uuid, booking_ref, nft_id=None, flight='', departure='', seat='',
+                 seat_class='', user_id='', boarded_at=None, gate=None):
+        self.booking_uuid = booking_uuid
+        self.booking_ref = booking_ref
+        self.nft_id = nft_id
+        self.flight = flight
+        self.departure = departure
+        self.seat = seat
+        self.seat_class = seat_class
+        self.user_id = user_id
+        self.boarded_at = boarded_at
+        self.gate = gate
+
+    @classmethod
+    def from_nft(cls, nft):
+        """The pass minted as this NFT, or None if it is not a ticket"""
+        metadata = nft.get('metadata') or {}
+        if metadata.get('document_type') != TICKET_DOCUMENT_TYPE:
+            return None
+        try:
+            ticket = json.loads(nft.get('description') or '')
+        except ValueError:
+            return None
+        if not isinstance(ticket, dict) or not ticket.get('booking_ref'):
+            return None
+        return cls(
+            booking_uuid=metadata['id'],
+            booking_ref=str(ticket['booking_ref']).upper(),
+            nft_id=nft.get('id'),
+            flight=str(ticket.get('flight', '')).upper(),
+            departure=str(ticket.get('departure', '')),
+            seat=str(ticket.get('seat', '')),
+            seat_class=str(ticket.get('class', '')),
+            user_id=str(ticket.get('user_id', '')),
+        )
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class PassIndex:
+    """Passes for one flight (or all flights), indexed for constant-time scans"""
+
+    def __init__(self, flight=None, day=None, log_path=None, allow_booking_refs=False):
+        self.flight = flight.upper() if flight else None
+        self.day = str(day) if day else None
+        # A bare booking ref carries no signature, so anyone who has read one can board with it
+        self.allow_booking_refs = allow_booking_refs
+        self._by_uuid = {}
+        self._by_ref = {}
+        self._nft_ids = set()
+        # booking uuid -> (boarded_at, gate) from the boarding log
+        self._boarded = {}
+        self._log = None
+        if log_path:
+            self._replay(log_path)
+            self._log = open(log_path, 'a')
+
+    def __len__(self):
+        return len(self._by_uuid)
+
+    def __contains__(self, nft_id):
+        return nft_id in self._nft_ids
+
+    def _for_this_flight(self, flight, departure):
+        if self.flight and flight != self.flight:
+            return False
+        if self.day and not str(departure).startswith(self.day):
+            return False
+        return True
+
+    def add(self, boarding_pass):
+        """Add or update a pass; returns False if it is for another flight"""
+        if not self._for_this_flight(boarding_pass.flight, boarding_pass.departure):
+            return False
+        existing = self._by_uuid.get(boarding_pass.booking_uuid)
+        if existing is not None:
+            # Keep the boarding state when a pass is re-read
+            boarding_pass.boarded_at, boarding_pass.gate = existing.boarded_at, existing.gate
+        elif boarding_pass.boarded_at is None and boarding_pass.booking_uuid in self._boarded:
+            boarding_pass.boarded_at, boarding_pass.gate = self._boarded[boarding_pass.booking_uuid]
+        self._by_uuid[boarding_pass.booking_uuid] = boarding_pass
+        self._by_ref[boarding_pass.booking_ref] = boarding_pass.booking_uuid
+        if boarding_pass.nft_id:
+            self._nft_ids.add(boarding_pass.nft_id)
+        return True
+
+    def add_nft(self, nft):
+        boarding_pass = Pass.from_nft(nft)
+        return boarding_pass is not None and self.add(boarding_pass)
+
+    def remove(self, booking_uuid):
+        boarding_pass = self._by_uuid.pop(booking_uuid, None)
+        if boarding_pass is not None:
+            self._by_ref.pop(boarding_pass.booking_ref, None)
+            self._nft_ids.discard(boarding_pass.nft_id)
+
+    def scan(self, data, gate=None):
+        """Validate one scanned QR and board the passenger; returns a result dict"""
+        with perf.timed('gate_scan'):
+            result = self._scan(str(data).strip(), gate)
+        perf.count('gate_scans_total', status=result['status'])
+        return result
+
+    def _scan(self, data, gate):
+        if len(data) == BOOKING_REF_LENGTH:
+            if not self.allow_booking_refs:
+                return {'status': INVALID, 'detail': "Booking references are not accepted, scan the QR code"}
+            # Passes printed before QR payloads carried only the booking ref
+            booking_uuid = self._by_ref.get(data.upper())
+        else:
+            try:
+                decoded = decode(data)
+            except InvalidPayload as e:
+                return {'status': INVALID, 'detail': str(e)}
+            if decoded['kind'] != 'ticket':
+                return {'status': INVALID, 'detail': "Not a boarding pass"}
+            departure = decoded['departure'].strftime('%Y-%m-%d %H:%M') if decoded['departure'] else ''
+            if not self._for_this_flight(decoded['flight'].upper(), departure):
+                return {'status': WRONG_FLIGHT, 'booking_ref': decoded['booking_ref'],
+                        'detail': f"Pass is for {decoded['flight']} {departure}"}
+            booking_uuid = decoded['booking_uuid']
+
+        boarding_pass = self._by_uuid.get(booking_uuid)
+        if boarding_pass is None:
+            return {'status': UNKNOWN, 'detail': "No pass was issued for this code"}
+        result = {'booking_ref': boarding_pass.booking_ref, 'seat': boarding_pass.seat,
+                  'class': boarding_pass.seat_class}
+        if boarding_pass.boarded_at is not None:
+            return dict(result, status=DUPLICATE,
+                        detail=f"Already boarded at gate {boarding_pass.gate} "
+                               f"{time.strftime('%H:%M:%S', time.localtime(boarding_pass.boarded_at))}")
+        # No await between the check and the update, so concurrent scans cannot both board
+        boarding_pass.boarded_at, boarding_pass.gate = time.time(), gate
+        if self._log:
+            self._log.write(json.dumps({'booking_uuid': booking_uuid, 'boarded_at': boarding_pass.boarded_at,
+                                        'gate': gate}) + '\n')
+            self._log.flush()
+        return dict(result, status=BOARDED)
+
+    def _replay(self, path):
+        if not os.path.exists(path):
+            return
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._boarded[entry['booking_uuid']] = (entry['boarded_at'], entry.get('gate'))
+
+    def stats(self):
+        boarded = sum(1 for p in self._by_uuid.values() if p.boarded_at is not None)
+        return {'passes': len(self._by_uuid), 'boarded': boarded}
+
+    def save(self, path):
+        """Snapshot the passes (and their boarding state) as JSON lines"""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            for boarding_pass in self._by_uuid.values():
+                f.write(json.dumps(boarding_pass.to_dict()) + '\n')
+        os.replace(tmp, path)
+
+    def load(self, path):
+        with open(path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    self.add(Pass(**json.loads(line)))
+
+    def close(self):
+        if self._log:
+            self._log.close()
+            self._log = None
+
+
+class JournalFollower:
+    """Tails bulk_issue journals and yields the NFT ids of newly minted tickets"""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._offsets = {}
+
+    def new_nft_ids(self):
+        ids = []
+        for pattern in self.patterns:
+            for path in glob.glob(pattern):
+                offset = self._offsets.get(path, 0)
+                with open(path, 'r') as f:
+                    f.seek(offset)
+                    for line in iter(f.readline, ''):
+                        if not line.endswith('\n'):
+                            # A line still being written; read it next time
+                            break
+                        offset += len(line.encode())
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue
+                        if entry.get('stage') == 'minted' and entry.get('nft_id'):
+                            ids.append(entry['nft_id'])
+                self._offsets[path] = offset
+        return ids
+
+
+class GateServer:
+    """asyncio TCP front end for a PassIndex, with incremental index updates"""
+
+    def __init__(self, index, client=None, journals=(), accounts=(), refresh_interval=REFRESH_INTERVAL):
+        self.index = index
+        self.client = client
+        self.follower = JournalFollower(journals) if journals else None
+        self.accounts = list(accounts)
+        self.refresh_interval = refresh_interval
+        # account -> NFT ids already looked at, tickets or not
+        self._seen = {}
+
+    def _client(self):
+        if self.client is None:
+            from backend_client import get_client
+            self.client = get_client()
+        return self.client
+
+    async def _fetch(self, nft_ids):
+        semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+        async def fetch(nft_id):
+            async with semaphore:
+                try:
+                    return await asyncio.to_thread(self._client().get_nft, nft_id)
+                except BackendError as e:
+                    logger.warning("Could not fetch %s: %s", nft_id, e)
+                    return None
+
+        return await asyncio.gather(*(fetch(nft_id) for nft_id in nft_ids))
+
+    async def refresh(self):
+        """Add passes minted since the last refresh; returns how many were added"""
+        added = 0
+        for account in self.accounts:
+            try:
+                added += await self._refresh_account(account)
+            except BackendError as e:
+                logger.warning("Could not list %s: %s", account, e)
+        if self.follower:
+            new_ids = [nft_id for nft_id in self.follower.new_nft_ids() if nft_id not in self.index]
+            for nft in await self._fetch(new_ids):
+                if nft is not None:
+                    added += self.index.add_nft(nft)
+        if added:
+            perf.count('gate_passes_added_total', added)
+        return added
+
+    async def _refresh_account(self, account):
+        """Add the account's tickets not looked at yet, listing only ids when little changed"""
+        client = self._client()
+        seen = self._seen.get(account)
+        if seen is not None:
+            ids = await asyncio.to_thread(client.get_account_nft_ids, account)
+            unseen = [nft_id for nft_id in ids if nft_id not in seen]
+            if not unseen:
+                return 0
+        if seen is None or len(unseen) > FULL_FETCH_THRESHOLD:
+            nfts = await asyncio.to_thread(client.get_account_nfts, account)
+            nfts = [nft for nft in nfts if nft['id'] not in (seen or ())]
+        else:
+            nfts = [nft for nft in await self._fetch(unseen) if nft is not None]
+        self._seen.setdefault(account, set()).update(nft['id'] for nft in nfts)
+        return sum(self.index.add_nft(nft) for nft in nfts if nft['id'] not in self.index)
+
+    async def _refresh_forever(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Gate index refresh failed")
+
+    def handle_line(self, line):
+        line = line.strip()
+        if not line:
+            return None
+        if line.startswith('{'):
+            try:
+                request = json.loads(line)
+            except ValueError:
+                return {'status': INVALID, 'detail': "Malformed request"}
+            op = request.get('op', 'scan')
+            if op == 'stats':
+                return self.index.stats()
+            return self.index.scan(request.get('scan', ''), request.get('gate'))
+        gate, _, data = line.partition(' ')
+        return self.index.scan(data, gate)
+
+    async def _handle(self, reader, writer):
+        try:
+            async for line in reader:
+                response = self.handle_line(line.decode('utf-8', 'replace'))
+                if response is not None:
+                    writer.write(json.dumps(response).encode() + b'\n')
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='0.0.0.0', port=9300):
+        await self.refresh()
+        server = await asyncio.start_server(self._handle, host, port)
+        refresher = asyncio.create_task(self._refresh_forever())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            refresher.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate boarding passes at the gates")
+    parser.add_argument('--flight', help="only accept passes for this flight number")
+    parser.add_argument('--date', help="only accept passes departing on this day (YYYY-MM-DD)")
+    parser.add_argument('--snapshot', help="JSONL pass snapshot to preload (and write on exit)")
+    parser.add_argument('--journal', action='append', default=[], help="bulk_issue journal glob to follow")
+    parser.add_argument('--account', action='append', default=[], help="account whose ticket NFTs to load")
+    parser.add_argument('--boarding-log', default='boarding.jsonl')
+    parser.add_argument('--allow-booking-refs', action='store_true',
+                        help="also accept bare booking references (unsigned; check the passenger's ID)")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=9300)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    index = PassIndex(args.flight, args.date, args.boarding_log, args.allow_booking_refs)
+    if args.snapshot and os.path.exists(args.snapshot):
+        index.load(args.snapshot)
+    server = GateServer(index, journals=args.journal, accounts=args.account)
+    print(f"Gate service listening on {args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.snapshot:
+            index.save(args.snapshot)
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""Decoded document and profile images, shared by every session in the process.
+
+Sessions keep only the SHA-256 of an image's bytes; the bytes live once
+per process in a SharedImageCache under a global memory budget, evicted
+least recently used and, when IMAGE_CACHE_SPILL_DIR is set, spilled to
+disk and read back on the next request. A request for an image that was
+evicted without spilling calls the caller's loader to fetch it again.
+
+The Documents List only needs small previews, so each image is also
+downscaled once and served from a bounded LRU on later reruns.
+"""
+import base64
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import perf
+from blob_store import BlobStore
+from lru import LRUCache
+
+PREVIEW_SIDE = 512
+DEFAULT_CACHE_SIZE = int(os.getenv('IMAGE_CACHE_SIZE', '512'))
+DEFAULT_BUDGET = int(float(os.getenv('IMAGE_CACHE_BUDGET_MB', '128')) * 1024 * 1024)
+DEFAULT_SPILL_DIR = os.getenv('IMAGE_CACHE_SPILL_DIR') or None
+
+_previews = LRUCache(DEFAULT_CACHE_SIZE)
+
+
+class SharedImageCache:
+    """Image bytes keyed by content hash, under a memory budget with LRU eviction"""
+
+    def __init__(self, budget=DEFAULT_BUDGET, spill_dir=DEFAULT_SPILL_DIR):
+        self.budget = budget
+        self._spill = BlobStore(spill_dir) if spill_dir else None
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.resident = 0
+        self.hits = 0
+        self.spill_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def put(self, data):
+        """Hold data and return its key; the same bytes are only held once"""
+        key = hashlib.sha256(data).hexdigest()
+        self._admit(key, data)
+        return key
+
+    def put_b64(self, image_b64):
+        """Decode a base64 image and hold it; returns its key, or None for an empty image"""
+        if not image_b64:
+            return None
+        return self.put(base64.b64decode(image_b64))
+
+    def get(self, key, load=None):
+        """The bytes for key, read back from the spill directory or from load() if evicted.
+
+        Returns None if the image is gone and there is no loader (or it returns None).
+        """
+        if key is None:
+            return None
+        with self._lock:
+            data = self._data.get(key)
+            if data is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+        if data is not None:
+            perf.count('shared_image_requests_total', result='hit')
+            return data
+
+        data = self._spill.get(key) if self._spill else None
+        result = 'miss' if data is None else 'spill'
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.spill_hits += 1
+        perf.count('shared_image_requests_total', result=result)
+        if data is None and load:
+            data = load()
+        if data is not None:
+            self._admit(key, data)
+        return data
+
+    def _admit(self, key, data):
+        evicted = []
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                return
+            self._data[key] = data
+            self.resident += len(data)
+            # The newest entry always stays, even if it alone is over budget
+            while self.resident > self.budget and len(self._data) > 1:
+                old_key, old_data = self._data.popitem(last=False)
+                self.resident -= len(old_data)
+                evicted.append(old_data)
+            self.evictions += len(evicted)
+            resident, entries = self.resident, len(self._data)
+        if self._spill:
+            # The spill store names files by the same SHA-256, so these land under their keys
+            for old_data in evicted:
+                self._spill.put(old_data)
+        if evicted:
+            perf.count('shared_image_evictions_total', len(evicted))
+        perf.gauge('shared_image_resident_bytes', resident)
+        perf.gauge('shared_image_entries', entries)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def info(self):
+        requests = self.hits + self.spill_hits + self.misses
+        return {
+            'hits': self.hits, 'spill_hits': self.spill_hits, 'misses': self.misses,
+            'hit_rate': self.hits / requests if requests else 0.0,
+            'evictions': self.evictions, 'entries': len(self._data),
+            'resident_bytes': self.resident, 'budget_bytes': self.budget,
+            'spill_dir': self._spill.root if self._spill else None,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.resident = 0
+            self.hits = self.spill_hits = self.misses = self.evictions = 0
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_images():
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = SharedImageCache()
+    return _shared
+
+
+def _downscale(data, side):
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        if max(img.size) <= side:
+            return data
+        img = img.convert('RGB')
+        img.thumbnail((side, side), Image.LANCZOS)
+        buf = io.BytesIO()
+        img.save(buf, format='JPEG', quality=85)
+        return buf.getvalue()
+
+
+def preview_image(image_ref, load, side=PREVIEW_SIDE):
+    """Preview bytes for an image, cached by its content hash.
+
+    load() returns the full bytes on a miss; None if it returns None.
+    """
+    key = (image_ref, side)
+    data = _previews.get(key)
+    if data is None:
+        perf.count('image_cache_requests_total', result='miss')
+        full = load()
+        if full is None:
+            return None
+        with perf.timed('decode_image'):
+            data = _downscale(full, side)
+        _previews.put(key, data)
+    else:
+        perf.count('image_cache_requests_total', result='hit')
+    return data
+
+
+def cache_info():
+    return {'hits': _previews.hits, 'misses': _previews.misses,
+            'size': len(_previews), 'maxsize': _previews.maxsize}
+
+
+def clear_cache():
+    _previews.clear()
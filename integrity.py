@@ -0,0 +1,199 @@
+"""Client-side integrity checks for minted documents and tickets.
+
+At mint time the SHA-256 of each NFT's canonical content (name,
+description and document metadata, but not the owner, which changes on
+transfer) is recorded locally, keyed by the document id. Verifying an
+account recomputes that digest for every NFT the ledger returns and
+compares; when the full-size image of a document is in the blob store its
+hash is checked against the minted image_sha256 too.
+
+NFTs are fetched one id at a time on a thread pool with a bounded window
+of in-flight records, so an account of any size is checked without ever
+holding all of its images in memory. Hashing runs outside the GIL.
+
+    python integrity.py <account id> --workers 16
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import perf
+from backend_client import BackendError, get_client
+from blob_store import get_store
+
+DEFAULT_INTEGRITY_PATH = os.getenv('INTEGRITY_DB_PATH', 'integrity.db')
+DEFAULT_WORKERS = 8
+METADATA_FIELDS = ('id', 'document_type', 'image', 'date_added', 'profile_type', 'image_sha256')
+CHUNK_SIZE = 1 << 20
+
+OK = 'ok'
+MISMATCH = 'mismatch'
+IMAGE_MISMATCH = 'image_mismatch'
+UNRECORDED = 'unrecorded'
+ERROR = 'error'
+
+
+def content_digest(nft):
+    """SHA-256 of the parts of an NFT (or mint payload) that never change after minting"""
+    metadata = nft['metadata']
+    content = {
+        'name': nft['name'],
+        'description': nft['description'],
+        'metadata': {field: metadata[field] for field in METADATA_FIELDS if metadata.get(field) is not None},
+    }
+    canonical = json.dumps(content, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=int)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def file_digest(path):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class IntegrityStore:
+    """Digests recorded at mint time, in SQLite"""
+
+    def __init__(self, path=DEFAULT_INTEGRITY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS digests (
+                document_id TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                recorded_at REAL NOT NULL
+            )
+        ''')
+        self._conn.commit()
+
+    def record(self, owner, payload):
+        """Record the digest of a mint payload; returns it"""
+        digest = content_digest(payload)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO digests (document_id, owner, digest, recorded_at) VALUES (?, ?, ?, ?)',
+                (payload['metadata']['id'], owner, digest, time.time()),
+            )
+            self._conn.commit()
+        return digest
+
+    def digest(self, document_id):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT digest FROM digests WHERE document_id = ?', (document_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+
+def verify_nft(nft, store, blobs=None):
+    """(status, detail) for one NFT as returned by the ledger"""
+    recorded = store.digest(nft['metadata']['id'])
+    if recorded is None:
+        return UNRECORDED, "No digest was recorded when this was minted"
+    if content_digest(nft) != recorded:
+        return MISMATCH, "Content differs from what was minted"
+    image_sha256 = nft['metadata'].get('image_sha256')
+    if blobs is not None and image_sha256 and image_sha256 in blobs:
+        if file_digest(blobs.path(image_sha256)) != image_sha256:
+            return IMAGE_MISMATCH, "Stored full-size image does not match its minted hash"
+    return OK, ""
+
+
+def verify_account(account, client=None, store=None, workers=DEFAULT_WORKERS, progress=None):
+    """Verify every NFT an account owns.
+
+    Returns {'checked', 'counts', 'problems'}, where problems lists every
+    result other than OK. progress(done, total) is called as results arrive.
+    """
+    client = client or get_client()
+    store = store or get_integrity_store()
+    blobs = get_store()
+    ids = client.get_account_nft_ids(account)
+    counts = {}
+    problems = []
+
+    def check(nft_id):
+        try:
+            nft = client.get_nft(nft_id)
+        except BackendError as e:
+            return nft_id, None, ERROR, str(e)
+        return (nft_id, nft['metadata']['id']) + verify_nft(nft, store, blobs)
+
+    with perf.timed('verify_account'), ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        remaining = iter(ids)
+        done = 0
+        while True:
+            # Keep a bounded window of records in flight
+            for nft_id in remaining:
+                pending.add(pool.submit(check, nft_id))
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                nft_id, document_id, status, detail = future.result()
+                counts[status] = counts.get(status, 0) + 1
+                if status != OK:
+                    problems.append({'nft_id': nft_id, 'document_id': document_id,
+                                     'status': status, 'detail': detail})
+                done += 1
+            if progress:
+                progress(done, len(ids))
+
+    for status, value in counts.items():
+        perf.count('integrity_checks_total', value, status=status)
+    return {'checked': len(ids), 'counts': counts, 'problems': problems}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_integrity_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = IntegrityStore()
+    return _store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify an account's NFTs against the digests recorded at mint time")
+    parser.add_argument('account', help="account id, e.g. the contents of company_id.txt")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--json', help="write the full report to this file")
+    args = parser.parse_args()
+
+    def report(done, total):
+        print(f"\r{done}/{total} checked", end='', flush=True)
+
+    start = time.perf_counter()
+    result = verify_account(args.account, workers=args.workers, progress=report)
+    elapsed = time.perf_counter() - start
+    print()
+    print(f"Checked {result['checked']} NFTs in {elapsed:.1f}s: "
+          + ', '.join(f"{count} {status}" for status, count in sorted(result['counts'].items())))
+    for problem in result['problems']:
+        print(f"  {problem['nft_id']} ({problem['document_id']}): {problem['status']} - {problem['detail']}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+    raise SystemExit(1 if any(p['status'] in (MISMATCH, IMAGE_MISMATCH) for p in result['problems']) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""Load generator simulating passengers and airline desks against the ledger.
+
+Each simulated passenger creates an account, then performs a mix of
+document uploads (the app.save_document payload), ticket receipts (the
+ticketgiver mint + transfer from an airline desk account) and NFT
+listings. Passengers arrive as a Poisson process and at most
+--concurrency of them are active at once. Throughput and p50/p95/p99
+latency are reported per endpoint; --sweep repeats the run at several
+concurrency levels to show how latency degrades behind the backend's
+single Mutex. Booking references come from a temporary store unless
+--booking-refs names one, so runs never use up production references.
+
+    python loadgen.py --users 200 --concurrency 16 --arrival-rate 50
+    python loadgen.py --sweep 1,4,16,64 --mix upload=2,ticket=3,list=5
+    python loadgen.py --target inprocess      # no backend needed
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from backend_client import BackendClient, BackendError
+from booking_refs import BookingReferences
+from documents import build_document_payload
+from tickets import build_ticket_payload
+
+DEFAULT_MIX = 'upload=3,ticket=2,list=5'
+CLASSES = ["Economy", "Business", "First Class"]
+ROUTES = ['LHR-JFK', 'CDG-DXB', 'FRA-SIN', 'AMS-LAX', 'OTP-MAD']
+
+
+class Recorder:
+    """Latency samples and error counts per endpoint"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def call(self, endpoint, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        except BackendError:
+            self.errors[endpoint] += 1
+            raise
+        finally:
+            self.latencies[endpoint].append(time.perf_counter() - start)
+
+    def summary(self, elapsed):
+        rows = []
+        for endpoint in sorted(self.latencies):
+            samples = sorted(self.latencies[endpoint])
+            if len(samples) > 1:
+                cuts = statistics.quantiles(samples, n=100, method='inclusive')
+                p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+            else:
+                p50 = p95 = p99 = samples[0]
+            rows.append({
+                'endpoint': endpoint,
+                'requests': len(samples),
+                'errors': self.errors[endpoint],
+                'throughput': len(samples) / elapsed,
+                'p50_ms': p50 * 1000,
+                'p95_ms': p95 * 1000,
+                'p99_ms': p99 * 1000,
+            })
+        return rows
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ('upload', 'ticket', 'list'):
+            raise argparse.ArgumentTypeError(f"unknown action in mix: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def fake_image(size_kb, rng):
+    return base64.b64encode(rng.randbytes(size_kb * 1024)).decode()
+
+
+def simulated_user(client, company_id, refs, recorder, mix, actions, image_kb, seed):
+    """One passenger session; runs on a worker thread"""
+    rng = random.Random(seed)
+    user_id = str(uuid.uuid4())
+    try:
+        recorder.call('POST /accounts', client.create_account, user_id)
+    except BackendError:
+        return
+
+    names, weights = list(mix), list(mix.values())
+    for _ in range(actions):
+        action = rng.choices(names, weights)[0]
+        try:
+            if action == 'upload':
+                payload = build_document_payload(user_id, rng.randint(1, 3), 'Individual',
+                                                 fake_image(image_kb, rng))
+                recorder.call('POST /nfts', client.mint_nft, payload)
+            elif action == 'ticket':
+                booking_ref = refs.next()
+                payload = build_ticket_payload(company_id, str(uuid.uuid4()), fake_image(1, rng), {
+                    'booking_ref': booking_ref,
+                    'user_id': user_id,
+                    'route': rng.choice(ROUTES),
+                    'seat': f"{rng.randint(1, 40)}{rng.choice('ABCDEF')}",
+                    'class': rng.choice(CLASSES),
+                })
+                nft = recorder.call('POST /nfts (ticket)', client.mint_nft, payload)
+                recorder.call('POST /nfts/transfer', client.transfer_nft, company_id, user_id, nft['id'])
+            else:
+                recorder.call('GET /accounts/{id}/nfts', client.get_account_nfts, user_id)
+        except BackendError:
+            continue
+
+
+async def run_stage(client, company_id, refs, args, concurrency):
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    rng = random.Random(args.seed)
+    tasks = []
+
+    async def passenger(seed):
+        async with semaphore:
+            await loop.run_in_executor(None, simulated_user, client, company_id, refs, recorder,
+                                       args.mix, args.actions, args.image_kb, seed)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        loop.set_default_executor(executor)
+        start = time.perf_counter()
+        for i in range(args.users):
+            tasks.append(asyncio.create_task(passenger(rng.random())))
+            if args.arrival_rate:
+                await asyncio.sleep(rng.expovariate(args.arrival_rate))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+    return recorder.summary(elapsed), elapsed
+
+
+def make_client(target, concurrency):
+    if target == 'inprocess':
+        from local_ledger import in_process_client
+        return in_process_client()
+    # No retries, so the latency we report is what the backend delivered
+    return BackendClient(target, retries=0, pool_size=concurrency)
+
+
+def print_table(rows, elapsed, concurrency):
+    total = sum(row['requests'] for row in rows)
+    print(f"\nconcurrency={concurrency}  {total} requests in {elapsed:.2f}s ({total / elapsed:.1f} req/s)")
+    print(f"{'endpoint':<26}{'reqs':>8}{'errs':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for row in rows:
+        print(f"{row['endpoint']:<26}{row['requests']:>8}{row['errors']:>6}{row['throughput']:>9.1f}"
+              f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate passengers and airline desks against the ledger")
+    parser.add_argument('--target', default=os.getenv('BACKEND_LINK', 'localhost:8080'),
+                        help="backend address, or 'inprocess' for the local_ledger stand-in")
+    parser.add_argument('--users', type=int, default=100, help="passengers per stage")
+    parser.add_argument('--concurrency', type=int, default=8, help="passengers active at once")
+    parser.add_argument('--sweep', help="comma-separated concurrency levels to run in turn")
+    parser.add_argument('--arrival-rate', type=float, default=0.0,
+                        help="passenger arrivals per second (0 = all at once)")
+    parser.add_argument('--actions', type=int, default=10, help="actions per passenger")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"action weights (default: {DEFAULT_MIX})")
+    parser.add_argument('--image-kb', type=int, default=32, help="size of uploaded document images")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="write the per-stage results to this file")
+    parser.add_argument('--booking-refs', help="booking reference store to issue from (default: a temporary one)")
+    args = parser.parse_args()
+
+    levels = [int(v) for v in args.sweep.split(',')] if args.sweep else [args.concurrency]
+    stages = []
+    with tempfile.TemporaryDirectory() as tmp:
+        refs = BookingReferences(args.booking_refs or os.path.join(tmp, 'booking_refs.db'))
+        for concurrency in levels:
+            client = make_client(args.target, concurrency)
+            company_id = str(uuid.uuid4())
+            client.create_account(company_id)
+            rows, elapsed = asyncio.run(run_stage(client, company_id, refs, args, concurrency))
+            client.close()
+            print_table(rows, elapsed, concurrency)
+            stages.append({'concurrency': concurrency, 'elapsed': elapsed, 'endpoints': rows})
+        refs.close()
+
+    if len(stages) > 1:
+        print("\nLatency vs concurrency (worst endpoint p95, ms):")
+        for stage in stages:
+            worst = max((row['p95_ms'] for row in stage['endpoints']), default=0.0)
+            print(f"  {stage['concurrency']:>5}  {worst:9.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(stages, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
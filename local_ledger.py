@@ -0,0 +1,346 @@
+"""Pure-Python stand-in for the Rust ledger backend.
+
+Implements the same endpoints and semantics as blockchain-backend (account
+existence checks, minting into the owner's list, owner validation on
+transfer) without cargo. It can be used three ways:
+
+* in process, as the transport of a BackendClient (see in_process_client),
+  or for the apps by setting BACKEND_LINK=inprocess
+* as an ASGI app:            uvicorn local_ledger:app --port 8080
+* as a standalone server:    python local_ledger.py --port 8080
+
+Latency and failures can be injected to exercise timeouts and retries.
+"""
+import argparse
+import io
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DOCUMENT_FIELDS = ('id', 'document_type', 'image', 'date_added', 'profile_type')
+OPTIONAL_DOCUMENT_FIELDS = ('image_sha256',)
+
+_ACCOUNT_NFTS = re.compile(r'^/accounts/([^/]+)/nfts$')
+_ACCOUNT_NFT_IDS = re.compile(r'^/accounts/([^/]+)/nft_ids$')
+_NFT = re.compile(r'^/nfts/([^/]+)$')
+
+
+class LedgerError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Ledger:
+    """In-memory accounts and NFTs guarded by one lock, like the backend's Mutex"""
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.accounts = {}
+        self.nfts = {}
+        # metadata.id -> NFT id, so re-submitting the same document is idempotent
+        self.minted_documents = {}
+        # The backend starts with a genesis block
+        self.height = 1
+
+    def _now(self):
+        return int(time.time())
+
+    def create_account(self, account_id):
+        with self._lock:
+            if account_id in self.accounts:
+                raise LedgerError(400, "Account already exists")
+            account = {'id': account_id, 'nfts': [], 'created_at': self._now()}
+            self.accounts[account_id] = account
+            self.height += 1
+            return dict(account, nfts=list(account['nfts']))
+
+    def mint_nft(self, request):
+        try:
+            metadata = request['metadata']
+            document = {field: metadata[field] for field in DOCUMENT_FIELDS}
+            nft = {
+                'name': str(request['name']),
+                'description': str(request['description']),
+                'owner': str(request['owner']),
+            }
+        except (KeyError, TypeError) as e:
+            raise LedgerError(400, f"Json deserialize error: missing field {e}")
+        for field in OPTIONAL_DOCUMENT_FIELDS:
+            if metadata.get(field) is not None:
+                document[field] = metadata[field]
+
+        with self._lock:
+            account = self.accounts.get(nft['owner'])
+            if account is None:
+                raise LedgerError(400, "Account does not exist")
+            existing = self.minted_documents.get(document['id'])
+            if existing in self.nfts:
+                return self.nfts[existing]
+            nft_id = f"nft_{self._now()}_{self.height}"
+            nft = {'id': nft_id, **nft, 'metadata': document, 'created_at': self._now()}
+            account['nfts'].append(nft_id)
+            self.minted_documents[document['id']] = nft_id
+            self.nfts[nft_id] = nft
+            self.height += 1
+            return nft
+
+    def get_account_nfts(self, account_id):
+        with self._lock:
+            account = self.accounts.get(account_id)
+            if account is None:
+                raise LedgerError(404, "Account not found")
+            return [self.nfts[nft_id] for nft_id in account['nfts'] if nft_id in self.nfts]
+
+    def get_account_nft_ids(self, account_id):
+        with self._lock:
+            account = self.accounts.get(account_id)
+            if account is None:
+                raise LedgerError(404, "Account not found")
+            return list(account['nfts'])
+
+    def get_nft(self, nft_id):
+        with self._lock:
+            nft = self.nfts.get(nft_id)
+            if nft is None:
+                raise LedgerError(404, "NFT not found")
+            return nft
+
+    def transfer_nft(self, request):
+        try:
+            sender, receiver, nft_id = request['from'], request['to'], request['nft_id']
+        except (KeyError, TypeError) as e:
+            raise LedgerError(400, f"Json deserialize error: missing field {e}")
+        with self._lock:
+            if sender not in self.accounts:
+                raise LedgerError(400, "Sender account not found")
+            if receiver not in self.accounts:
+                raise LedgerError(400, "Receiver account not found")
+            nft = self.nfts.get(nft_id)
+            if nft is None:
+                raise LedgerError(400, "NFT not found")
+            if nft['owner'] != sender:
+                raise LedgerError(400, "NFT does not belong to sender")
+            nft['owner'] = receiver
+            self.accounts[sender]['nfts'].remove(nft_id)
+            self.accounts[receiver]['nfts'].append(nft_id)
+            self.height += 1
+            return nft
+
+    def handle(self, method, path, body=None):
+        """Route one request; returns (status, JSON-serializable body or error string)"""
+        if self.latency:
+            time.sleep(self.latency() if callable(self.latency) else self.latency)
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            return 503, "Injected failure"
+
+        path = path.split('?', 1)[0].rstrip('/') or '/'
+        try:
+            if body:
+                body = json.loads(body)
+        except ValueError as e:
+            return 400, f"Json deserialize error: {e}"
+
+        try:
+            if method == 'POST' and path == '/accounts':
+                if not isinstance(body, dict) or 'id' not in body:
+                    raise LedgerError(400, "Json deserialize error: missing field `id`")
+                return 200, self.create_account(body['id'])
+            if method == 'POST' and path == '/nfts':
+                return 200, self.mint_nft(body)
+            if method == 'POST' and path == '/nfts/transfer':
+                return 200, self.transfer_nft(body)
+            if method == 'GET':
+                match = _ACCOUNT_NFTS.match(path)
+                if match:
+                    return 200, self.get_account_nfts(match.group(1))
+                match = _ACCOUNT_NFT_IDS.match(path)
+                if match:
+                    return 200, self.get_account_nft_ids(match.group(1))
+                match = _NFT.match(path)
+                if match:
+                    return 200, self.get_nft(match.group(1))
+        except LedgerError as e:
+            return e.status, str(e)
+        return 404, ""
+
+
+def _encode(status, body):
+    if status == 200:
+        return b'application/json', json.dumps(body).encode()
+    return b'text/plain; charset=utf-8', str(body).encode()
+
+
+# requests transport ---------------------------------------------------------
+
+def _make_adapter_class():
+    from requests.adapters import BaseAdapter
+    from requests.models import Response
+    from requests.structures import CaseInsensitiveDict
+
+    class LedgerAdapter(BaseAdapter):
+        """requests transport that answers from an in-process Ledger"""
+
+        def __init__(self, ledger):
+            super().__init__()
+            self.ledger = ledger
+
+        def send(self, request, **kwargs):
+            from urllib.parse import urlsplit
+            path = urlsplit(request.url).path
+            body = request.body
+            if body is not None and not isinstance(body, (bytes, str)):
+                # A streamed (chunked) body arrives as an iterable of chunks
+                body = b''.join(body)
+            status, body = self.ledger.handle(request.method, path, body)
+            content_type, data = _encode(status, body)
+
+            response = Response()
+            response.status_code = status
+            response.reason = 'OK' if status == 200 else 'Error'
+            response.headers = CaseInsensitiveDict({'Content-Type': content_type.decode()})
+            response.raw = io.BytesIO(data)
+            response.url = request.url
+            response.request = request
+            response.encoding = 'utf-8'
+            return response
+
+        def close(self):
+            pass
+
+    return LedgerAdapter
+
+
+def in_process_client(ledger=None):
+    """A BackendClient whose calls are served by an in-process Ledger"""
+    from backend_client import BackendClient
+
+    ledger = ledger or Ledger()
+    client = BackendClient('http://ledger.local')
+    client.session.mount('http://', _make_adapter_class()(ledger))
+    client.ledger = ledger
+    return client
+
+
+# ASGI -----------------------------------------------------------------------
+
+def asgi_app(ledger):
+    """Minimal ASGI application serving a Ledger"""
+
+    async def application(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        body = b''
+        more = True
+        while more:
+            message = await receive()
+            body += message.get('body', b'')
+            more = message.get('more_body', False)
+        # Ledger calls are short and hold a lock, same as the actix handlers
+        status, payload = ledger.handle(scope['method'], scope['path'], body)
+        content_type, data = _encode(status, payload)
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', content_type), (b'content-length', str(len(data)).encode())],
+        })
+        await send({'type': 'http.response.body', 'body': data})
+
+    return application
+
+
+app = asgi_app(Ledger())
+
+
+# stdlib server --------------------------------------------------------------
+
+def serve(ledger, host='127.0.0.1', port=8080):
+    """Serve a Ledger over HTTP/1.1 with the standard library; returns the server"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out as separate writes; with Nagle on, each
+        # keep-alive response waits out the client's delayed ACK
+        disable_nagle_algorithm = True
+
+        def _read_chunked(self):
+            # BackendClient streams mint bodies with Transfer-Encoding: chunked
+            parts = []
+            while True:
+                size = int(self.rfile.readline().split(b';', 1)[0], 16)
+                if not size:
+                    # Skip any trailers up to the blank line that ends the body
+                    while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    return b''.join(parts)
+                parts.append(self.rfile.read(size))
+                self.rfile.readline()
+
+        def _dispatch(self):
+            if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+                body = self._read_chunked() or None
+            else:
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length) if length else None
+            status, payload = ledger.handle(self.command, self.path, body)
+            content_type, data = _encode(status, payload)
+            self.send_response(status)
+            self.send_header('Content-Type', content_type.decode())
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = _dispatch
+        do_POST = _dispatch
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve_in_background(ledger=None, host='127.0.0.1', port=0):
+    """Start a stdlib server on a daemon thread; returns (server, base_url)"""
+    server = serve(ledger or Ledger(), host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Python ledger stand-in")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument('--stdlib', action='store_true', help="use http.server instead of uvicorn")
+    args = parser.parse_args()
+
+    ledger = Ledger(latency=args.latency, failure_rate=args.failure_rate)
+    print(f"Server running at http://{args.host}:{args.port}")
+    if not args.stdlib:
+        try:
+            import uvicorn
+        except ImportError:
+            print("uvicorn is not installed, falling back to http.server")
+        else:
+            uvicorn.run(asgi_app(ledger), host=args.host, port=args.port, log_level='warning')
+            return
+    serve(ledger, args.host, args.port).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
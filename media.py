@@ -0,0 +1,73 @@
+"""Normalization of uploaded document images.
+
+Camera and upload bytes are decoded once, rotated upright, stripped of
+EXIF/ICC metadata, bounded in resolution and recompressed as JPEG, and a
+small thumbnail is produced for list views and NFT metadata.
+"""
+import hashlib
+import io
+from collections import namedtuple
+
+MAX_SIDE = 1600
+MAX_BYTES = 600 * 1024
+THUMBNAIL_SIDE = 256
+QUALITY = 85
+MIN_QUALITY = 50
+
+NormalizedImage = namedtuple('NormalizedImage', ['data', 'thumbnail', 'sha256', 'size'])
+
+
+def _to_rgb(img):
+    from PIL import Image
+
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, 'white')
+        background.paste(img, mask=img.split()[-1])
+        return background
+    if img.mode != 'RGB':
+        return img.convert('RGB')
+    return img
+
+
+def _encode_jpeg(img, quality):
+    buf = io.BytesIO()
+    # No exif/icc_profile arguments, so no metadata is written
+    img.save(buf, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return buf.getvalue()
+
+
+def normalize_image(source, max_side=MAX_SIDE, max_bytes=MAX_BYTES, thumbnail_side=THUMBNAIL_SIDE):
+    """Return a NormalizedImage for raw upload bytes or a binary file object (read in place, not copied)"""
+    from PIL import Image, ImageOps
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    with Image.open(source) as img:
+        # JPEGs are decoded at the smallest DCT scale (1/2 to 1/8) that still
+        # covers max_side, so a 20 MB camera photo never becomes a full-size bitmap
+        scale = max_side / max(img.size)
+        if scale < 1:
+            img.draft('RGB', (round(img.width * scale), round(img.height * scale)))
+        # Apply the EXIF orientation before the metadata is dropped, without
+        # the full-size copy exif_transpose() otherwise returns
+        ImageOps.exif_transpose(img, in_place=True)
+        img = _to_rgb(img)
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+        quality = QUALITY
+        encoded = _encode_jpeg(img, quality)
+        while len(encoded) > max_bytes and quality > MIN_QUALITY:
+            quality = max(quality - 10, MIN_QUALITY)
+            encoded = _encode_jpeg(img, quality)
+
+        thumb = img.copy()
+        thumb.thumbnail((thumbnail_side, thumbnail_side), Image.LANCZOS)
+        thumbnail = _encode_jpeg(thumb, QUALITY)
+
+    return NormalizedImage(
+        data=encoded,
+        thumbnail=thumbnail,
+        sha256=hashlib.sha256(encoded).hexdigest(),
+        size=len(encoded),
+    )
@@ -0,0 +1,210 @@
+"""Durable write-behind outbox for NFT mints.
+
+Submissions are written to SQLite and return immediately. A background
+worker flushes them to the ledger in submission order, a batch at a time.
+Each entry's idempotency key is the document UUID (metadata.id), and the
+ledger returns the existing NFT when a document is minted twice, so an
+entry can safely be retried after a timeout.
+
+Connection errors and 5xx responses are retried with exponential backoff
+and block later entries so ordering is kept; other rejections mark the
+entry failed so it can be inspected and re-queued.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import perf
+from backend_client import BackendError, get_client
+from doc_cache import get_document_cache
+
+DEFAULT_OUTBOX_PATH = os.getenv('OUTBOX_PATH', 'outbox.db')
+BATCH_SIZE = 20
+MAX_ATTEMPTS = 8
+BASE_BACKOFF = 0.5
+MAX_BACKOFF = 60.0
+
+PENDING = 'pending'
+SENT = 'sent'
+FAILED = 'failed'
+
+logger = logging.getLogger(__name__)
+
+
+def _retryable(error):
+    return error.status_code is None or error.status_code >= 500
+
+
+class Outbox:
+    """SQLite-backed queue of mint payloads with a single flushing worker"""
+
+    def __init__(self, path=DEFAULT_OUTBOX_PATH, client=None, batch_size=BATCH_SIZE):
+        self.path = path
+        self.client = client
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker = None
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS outbox (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL UNIQUE,
+                owner TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                last_error TEXT,
+                nft_id TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS outbox_status ON outbox (status, seq);
+        ''')
+        self._conn.commit()
+
+    def enqueue(self, owner, payload):
+        """Queue a mint; re-enqueueing the same document is a no-op. Returns the key."""
+        key = payload['metadata']['id']
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR IGNORE INTO outbox (key, owner, payload, status, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, owner, json.dumps(payload), PENDING, now, now),
+            )
+            self._conn.commit()
+        perf.count('outbox_enqueued_total')
+        self._wake.set()
+        return key
+
+    def entries(self, owner, statuses=(PENDING, FAILED)):
+        """Unsent entries for an owner, oldest first, with their document metadata"""
+        placeholders = ','.join('?' * len(statuses))
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT key, status, attempts, last_error, payload, created_at FROM outbox '
+                f'WHERE owner = ? AND status IN ({placeholders}) ORDER BY seq',
+                (owner, *statuses),
+            ).fetchall()
+        entries = []
+        for key, status, attempts, last_error, payload, created_at in rows:
+            metadata = json.loads(payload)['metadata']
+            entries.append({
+                'key': key,
+                'status': status,
+                'attempts': attempts,
+                'last_error': last_error,
+                'metadata': metadata,
+                'created_at': created_at,
+            })
+        return entries
+
+    def retry(self, key):
+        """Re-queue a failed entry"""
+        with self._lock:
+            self._conn.execute(
+                'UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = 0, updated_at = ? '
+                'WHERE key = ? AND status = ?',
+                (PENDING, time.time(), key, FAILED),
+            )
+            self._conn.commit()
+        self._wake.set()
+
+    def _next_batch(self):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT key, owner, payload, attempts, next_attempt_at FROM outbox '
+                'WHERE status = ? ORDER BY seq LIMIT ?',
+                (PENDING, self.batch_size),
+            ).fetchall()
+
+    def flush(self):
+        """Send due entries in order; returns the seconds until the next retry, or None"""
+        client = self.client or get_client()
+        batch = self._next_batch()
+        updates = []
+        wait = None
+        for key, owner, payload, attempts, next_attempt_at in batch:
+            now = time.time()
+            if next_attempt_at > now:
+                # Keep submission order: nothing after a backing-off entry is sent
+                wait = next_attempt_at - now
+                break
+            try:
+                with perf.timed('outbox_send'):
+                    # The payload was encoded once when it was queued and is sent as stored
+                    nft = client.mint_nft(payload)
+            except BackendError as e:
+                attempts += 1
+                if _retryable(e) and attempts < MAX_ATTEMPTS:
+                    delay = min(MAX_BACKOFF, BASE_BACKOFF * 2 ** (attempts - 1))
+                    updates.append((PENDING, attempts, now + delay, str(e), None, now, key))
+                    wait = delay
+                    break
+                perf.count('outbox_failed_total')
+                updates.append((FAILED, attempts, 0, str(e), None, now, key))
+                continue
+            get_document_cache().upsert(owner, nft)
+            perf.count('outbox_sent_total')
+            updates.append((SENT, attempts + 1, 0, None, nft['id'], now, key))
+
+        if updates:
+            with self._lock:
+                self._conn.executemany(
+                    'UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, '
+                    'nft_id = ?, updated_at = ? WHERE key = ?',
+                    updates,
+                )
+                self._conn.commit()
+        if wait is None and len(batch) == self.batch_size:
+            return 0
+        return wait
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Cleared before flushing so an enqueue during the flush is not missed
+            self._wake.clear()
+            try:
+                wait = self.flush()
+            except Exception:
+                logger.exception("Outbox flush failed")
+                wait = MAX_BACKOFF
+            if wait == 0:
+                continue
+            self._wake.wait(timeout=wait if wait is not None else MAX_BACKOFF)
+
+    def start(self):
+        """Start the background worker once"""
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._stop.clear()
+                self._worker = threading.Thread(target=self._run, name='outbox-worker', daemon=True)
+                self._worker.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._worker:
+            self._worker.join(timeout)
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox():
+    """The process-wide outbox, with its worker running"""
+    global _outbox
+    if _outbox is None:
+        with _outbox_lock:
+            if _outbox is None:
+                _outbox = Outbox().start()
+    return _outbox
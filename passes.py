@@ -0,0 +1,430 @@
+"""Printable boarding passes, rendered in bulk to PNG or PDF.
+
+Each pass is drawn onto a copy of a pre-rendered card template (border,
+heading and field labels) with fonts loaded once per process, so a pass
+costs one QR matrix, a handful of text draws and an encode. Passes are
+rendered on a process pool with a bounded window of passes in flight;
+per-passenger files are written by the workers themselves, and a
+combined flight PDF is appended to page by page, so memory stays flat
+however large the flight is.
+
+Ticket records are the dicts minted as a ticket NFT's description, plus
+'booking_uuid'. They can be read from a JSONL file, fetched by the NFT
+ids in bulk_issue journals, or fetched from the ticket NFTs that
+passenger accounts own. Issued tickets are transferred to their
+passengers, so the company account itself no longer holds them:
+
+    python passes.py --journal 'batches/*.jsonl' --flight AN214 --date 2025-06-01 --format pdf --combined
+    python passes.py --accounts-file passengers.txt --flight AN214 --date 2025-06-01
+"""
+import argparse
+import functools
+import glob
+import io
+import json
+import os
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+import perf
+from qr_payload import encode_ticket
+from tickets import TICKET_DOCUMENT_TYPE
+
+FORMATS = ('png', 'pdf')
+CARD_SIZE = (1200, 500)
+DPI = 200
+QR_SIZE = 360
+BORDER_COLOR = (31, 119, 180)
+TEXT_COLOR = (20, 20, 20)
+LABEL_COLOR = (110, 110, 110)
+FONT_PATH = os.getenv('PASS_FONT_PATH', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
+BOLD_FONT_PATH = os.getenv('PASS_BOLD_FONT_PATH', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf')
+COMPRESS_LEVEL = 3
+# Any of the eight masks gives a valid code; choosing one skips qrcode's
+# trial of all eight, which is most of the cost of encoding
+QR_MASK_PATTERN = 2
+FETCH_WORKERS = 16
+
+# (label, ticket field, x, y); values are drawn below their labels
+FIELDS = (
+    ("PASSENGER", 'user_id', 50, 110),
+    ("FROM", 'from', 50, 200),
+    ("TO", 'to', 290, 200),
+    ("DATE", 'date', 50, 290),
+    ("DEPARTS", 'departs', 290, 290),
+    ("ARRIVES", 'arrives', 470, 290),
+    ("FLIGHT", 'flight', 50, 380),
+    ("SEAT", 'seat', 290, 380),
+    ("CLASS", 'class', 470, 380),
+    ("BOOKING REF", 'booking_ref', 560, 110),
+)
+
+
+def _font(path, size):
+    from PIL import ImageFont
+
+    try:
+        return ImageFont.truetype(path, size)
+    except OSError:
+        return ImageFont.load_default(size)
+
+
+@functools.lru_cache(maxsize=None)
+def _layout():
+    """The card template and fonts, built once per process"""
+    from PIL import Image, ImageDraw
+
+    fonts = {
+        'title': _font(BOLD_FONT_PATH, 40),
+        'label': _font(FONT_PATH, 18),
+        'value': _font(BOLD_FONT_PATH, 30),
+        'small': _font(FONT_PATH, 16),
+    }
+    template = Image.new('RGB', CARD_SIZE, 'white')
+    draw = ImageDraw.Draw(template)
+    width, height = CARD_SIZE
+    draw.rounded_rectangle((8, 8, width - 8, height - 8), radius=24, outline=BORDER_COLOR, width=6)
+    draw.text((50, 30), "BOARDING PASS", font=fonts['title'], fill=BORDER_COLOR)
+    for label, _, x, y in FIELDS:
+        draw.text((x, y), label, font=fonts['label'], fill=LABEL_COLOR)
+    return template, fonts
+
+
+def _parse_time(value):
+    try:
+        return datetime.strptime(str(value).strip()[:16], "%Y-%m-%d %H:%M")
+    except ValueError:
+        return None
+
+
+def _values(ticket):
+    departure = _parse_time(ticket.get('departure', ''))
+    arrival = _parse_time(ticket.get('arrival', ''))
+    return {
+        **{field: str(ticket.get(field, '')) for _, field, _, _ in FIELDS},
+        'date': departure.strftime('%d %b %Y') if departure else str(ticket.get('departure', '')),
+        'departs': departure.strftime('%H:%M') if departure else '',
+        'arrives': arrival.strftime('%H:%M') if arrival else '',
+    }
+
+
+def _qr_image(data, size):
+    """The QR code for data as a size x size greyscale image, drawn straight from the module matrix"""
+    import qrcode
+    from PIL import Image
+
+    qr = qrcode.QRCode(border=2, mask_pattern=QR_MASK_PATTERN)
+    qr.add_data(data)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+    modules = len(matrix)
+    img = Image.frombytes('L', (modules, modules), bytes(0 if cell else 255 for row in matrix for cell in row))
+    return img.resize((size, size), Image.NEAREST)
+
+
+def draw_pass(ticket, qr_payload):
+    """Render one boarding pass as a PIL image"""
+    from PIL import ImageDraw
+
+    template, fonts = _layout()
+    img = template.copy()
+    draw = ImageDraw.Draw(img)
+    values = _values(ticket)
+    for _, field, x, y in FIELDS:
+        draw.text((x, y + 24), values[field], font=fonts['value'], fill=TEXT_COLOR)
+    width, height = CARD_SIZE
+    img.paste(_qr_image(qr_payload, QR_SIZE), (width - QR_SIZE - 50, 50))
+    draw.text((width - QR_SIZE - 50, 50 + QR_SIZE + 16), str(ticket.get('booking_uuid', '')),
+              font=fonts['small'], fill=LABEL_COLOR)
+    return img
+
+
+def _pdf_page(img):
+    """(width, height, Flate-compressed RGB pixels) for one PDF page image"""
+    return img.width, img.height, zlib.compress(img.tobytes(), COMPRESS_LEVEL)
+
+
+class PdfWriter:
+    """Writes a PDF of full-page images one page at a time.
+
+    Every page is flushed to disk as it is added; only the object offsets
+    are kept until close() writes the page tree and cross-reference table.
+    """
+
+    def __init__(self, target, dpi=DPI):
+        """target is a path (written atomically) or a binary file object"""
+        self.dpi = dpi
+        if isinstance(target, str):
+            self.path = target
+            self._tmp = f"{target}.{os.getpid()}.tmp"
+            self._file = open(self._tmp, 'wb')
+        else:
+            self.path = self._tmp = None
+            self._file = target
+        self._offsets = {}
+        self._pages = []
+        # 1 and 2 are the catalog and page tree, written last
+        self._next = 3
+        self._file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def _object(self, body, stream=None):
+        number = self._next
+        self._next += 1
+        self._write(number, body, stream)
+        return number
+
+    def _write(self, number, body, stream=None):
+        self._offsets[number] = self._file.tell()
+        self._file.write(f"{number} 0 obj\n".encode() + body)
+        if stream is not None:
+            self._file.write(b'\nstream\n' + stream + b'\nendstream')
+        self._file.write(b'\nendobj\n')
+
+    def add_page(self, width, height, pixels):
+        """Append a page showing width x height RGB pixels, Flate-compressed"""
+        w, h = width * 72 / self.dpi, height * 72 / self.dpi
+        image = self._object(
+            f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} /ColorSpace /DeviceRGB "
+            f"/BitsPerComponent 8 /Filter /FlateDecode /Length {len(pixels)} >>".encode(), pixels)
+        content = f"q {w:.2f} 0 0 {h:.2f} 0 0 cm /Im0 Do Q".encode()
+        contents = self._object(f"<< /Length {len(content)} >>".encode(), content)
+        self._pages.append(self._object(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {w:.2f} {h:.2f}] "
+            f"/Resources << /XObject << /Im0 {image} 0 R >> >> /Contents {contents} 0 R >>".encode()))
+
+    def close(self):
+        kids = ' '.join(f"{page} 0 R" for page in self._pages)
+        self._write(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        self._write(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._pages)} >>".encode())
+        xref = self._file.tell()
+        self._file.write(f"xref\n0 {self._next}\n0000000000 65535 f \n".encode())
+        for number in range(1, self._next):
+            self._file.write(f"{self._offsets[number]:010d} 00000 n \n".encode())
+        self._file.write(f"trailer\n<< /Size {self._next} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+        if self._tmp:
+            self._file.close()
+            os.replace(self._tmp, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._tmp:
+            self._file.close()
+            os.remove(self._tmp)
+
+
+def render_pass(ticket, qr_payload, fmt='png'):
+    """One boarding pass as PNG or single-page PDF bytes"""
+    img = draw_pass(ticket, qr_payload)
+    buf = io.BytesIO()
+    if fmt == 'png':
+        img.save(buf, format='PNG', compress_level=COMPRESS_LEVEL)
+    else:
+        with PdfWriter(buf) as pdf:
+            pdf.add_page(*_pdf_page(img))
+    return buf.getvalue()
+
+
+def _render_to_file(task):
+    """Worker: render one pass and write it to its own file; returns the bytes written"""
+    ticket, qr_payload, path, fmt = task
+    img = draw_pass(ticket, qr_payload)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if fmt == 'png':
+        img.save(tmp, format='PNG', compress_level=COMPRESS_LEVEL)
+        os.replace(tmp, path)
+    else:
+        with PdfWriter(path) as pdf:
+            pdf.add_page(*_pdf_page(img))
+    return os.path.getsize(path)
+
+
+def _render_page(task):
+    """Worker: render one pass as a PDF page for the combined flight document"""
+    ticket, qr_payload = task
+    return _pdf_page(draw_pass(ticket, qr_payload))
+
+
+def _ordered(pool, fn, tasks, window):
+    """pool.map with at most window tasks in flight, results in order"""
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.submit(fn, task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _slug(value):
+    return ''.join(c if c.isalnum() or c in '-_' else '_' for c in str(value)) or 'unknown'
+
+
+def flight_group(ticket):
+    """(flight, departure day) a ticket belongs to"""
+    return str(ticket.get('flight', '')).upper(), str(ticket.get('departure', ''))[:10]
+
+
+def render_passes(tickets, directory, fmt='png', combined=False, workers=None, progress=None):
+    """Render boarding passes for ticket records into directory.
+
+    Writes one file per passenger, or with combined=True (PDF only) one
+    PDF per flight and day with a page per passenger in seat order.
+    Returns {'passes', 'files', 'bytes', 'seconds', 'rate'}; progress(done, total)
+    is called as passes are written.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    if combined and fmt != 'pdf':
+        raise ValueError("Combined output is only available as PDF")
+    os.makedirs(directory, exist_ok=True)
+    tickets = sorted(tickets, key=lambda t: flight_group(t) + (str(t.get('seat', '')),))
+    # Payloads are signed here so the workers never need the signing key
+    tasks = [(ticket, encode_ticket(ticket, ticket['booking_uuid'])) for ticket in tickets]
+    workers = workers or os.cpu_count() or 1
+    window = workers * 4
+    files = []
+    written = 0
+    start = time.perf_counter()
+
+    with perf.timed('render_passes', format=fmt), ProcessPoolExecutor(max_workers=workers) as pool:
+        if combined:
+            groups = {}
+            for ticket, payload in tasks:
+                groups.setdefault(flight_group(ticket), []).append((ticket, payload))
+            done = 0
+            for (flight, day), group in groups.items():
+                path = os.path.join(directory, f"{_slug(flight)}_{_slug(day)}.pdf")
+                with PdfWriter(path) as pdf:
+                    for page in _ordered(pool, _render_page, group, window):
+                        pdf.add_page(*page)
+                        done += 1
+                        if progress:
+                            progress(done, len(tasks))
+                files.append(path)
+                written += os.path.getsize(path)
+        else:
+            paths = [os.path.join(directory, f"{_slug(flight_group(t)[0])}_{_slug(t.get('booking_ref'))}.{fmt}")
+                     for t, _ in tasks]
+            jobs = ((ticket, payload, path, fmt) for (ticket, payload), path in zip(tasks, paths))
+            for done, size in enumerate(_ordered(pool, _render_to_file, jobs, window), 1):
+                written += size
+                if progress:
+                    progress(done, len(tasks))
+            files = paths
+
+    seconds = time.perf_counter() - start
+    perf.count('passes_rendered_total', len(tasks), format=fmt)
+    return {'passes': len(tasks), 'files': files, 'bytes': written, 'seconds': seconds,
+            'rate': len(tasks) / max(seconds, 1e-9)}
+
+
+def ticket_from_nft(nft):
+    """The ticket record minted as an NFT, or None if it is not a ticket"""
+    metadata = nft.get('metadata') or {}
+    if metadata.get('document_type') != TICKET_DOCUMENT_TYPE:
+        return None
+    try:
+        ticket = json.loads(nft.get('description') or '')
+    except ValueError:
+        return None
+    if not isinstance(ticket, dict) or not ticket.get('booking_ref'):
+        return None
+    return {**ticket, 'booking_uuid': metadata['id']}
+
+
+def _for_flight(ticket, flight=None, day=None):
+    return (not flight or flight_group(ticket)[0] == flight.upper()) and (not day or flight_group(ticket)[1] == str(day))
+
+
+def load_nft_tickets(nft_ids, client=None, flight=None, day=None):
+    """Ticket records for the given NFT ids, whoever owns them now, optionally for one flight and day"""
+    from backend_client import get_client
+
+    client = client or get_client()
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        tickets = [ticket_from_nft(nft) for nft in pool.map(client.get_nft, list(dict.fromkeys(nft_ids)))]
+    return [t for t in tickets if t and _for_flight(t, flight, day)]
+
+
+def load_account_tickets(accounts, client=None, flight=None, day=None):
+    """Ticket records for the ticket NFTs some (passenger) accounts own"""
+    from backend_client import get_client
+
+    client = client or get_client()
+    ids = [nft_id for account in accounts for nft_id in client.get_account_nft_ids(account)]
+    return load_nft_tickets(ids, client, flight, day)
+
+
+def journal_nft_ids(patterns):
+    """The NFT ids minted by the bulk_issue journals matching some glob patterns"""
+    ids = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get('stage') == 'minted' and entry.get('nft_id'):
+                        ids.append(entry['nft_id'])
+    return ids
+
+
+def load_tickets(path):
+    """Ticket records from a JSONL file"""
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render printable boarding passes for a flight")
+    source = parser.add_argument_group('ticket source (at least one)')
+    source.add_argument('--journal', action='append', default=[],
+                        help="bulk_issue journal glob; renders the tickets it minted")
+    source.add_argument('--account', action='append', default=[], help="render the ticket NFTs this account owns")
+    source.add_argument('--accounts-file', help="file with one (passenger) account id per line")
+    source.add_argument('--input', help="JSONL file of ticket records (each with a booking_uuid)")
+    parser.add_argument('--flight', help="only this flight number")
+    parser.add_argument('--date', help="only this departure day (YYYY-MM-DD)")
+    parser.add_argument('--format', choices=FORMATS, default='png')
+    parser.add_argument('--combined', action='store_true', help="one PDF per flight instead of a file per passenger")
+    parser.add_argument('--out', default='passes')
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+
+    accounts = list(args.account)
+    if args.accounts_file:
+        with open(args.accounts_file, 'r') as f:
+            accounts += [line.strip() for line in f if line.strip()]
+    if not (args.journal or accounts or args.input):
+        parser.error("one of --journal, --account, --accounts-file or --input is required")
+
+    tickets = []
+    if args.journal:
+        tickets += load_nft_tickets(journal_nft_ids(args.journal), flight=args.flight, day=args.date)
+    if accounts:
+        tickets += load_account_tickets(accounts, flight=args.flight, day=args.date)
+    if args.input:
+        tickets += [t for t in load_tickets(args.input) if _for_flight(t, args.flight, args.date)]
+    # The same ticket may come from a journal and its passenger's account
+    tickets = list({t['booking_uuid']: t for t in tickets}.values())
+
+    def report(done, total):
+        print(f"\r{done}/{total} rendered", end='', flush=True)
+
+    result = render_passes(tickets, args.out, args.format, args.combined, args.workers, report)
+    print()
+    print(f"Rendered {result['passes']} passes into {len(result['files'])} files "
+          f"({result['bytes'] / 1e6:.1f} MB) in {result['seconds']:.1f}s, {result['rate']:.0f} passes/s")
+
+
+if __name__ == '__main__':
+    main()
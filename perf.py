@@ -0,0 +1,229 @@
+"""Lightweight timers, counters and gauges for the apps' hot paths.
+
+    with perf.timed('render_qr'):
+        ...
+    perf.count('backend_errors_total', endpoint='/nfts')
+    perf.gauge('shared_image_resident_bytes', 123456)
+
+Metrics are process-wide and can be read as a snapshot (for the in-app
+panel), exported in the Prometheus text format, or served over HTTP when
+PERF_METRICS_PORT is set. PERF_PROFILE=1 additionally captures a cProfile
+dump for every rerun.
+"""
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PROFILE_DIR = os.getenv('PERF_PROFILE_DIR', 'profiles')
+
+_lock = threading.Lock()
+_timers = {}
+_counters = {}
+_gauges = {}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name, seconds, **labels):
+    """Record one duration for a timer"""
+    key = _key(name, labels)
+    with _lock:
+        stats = _timers.get(key)
+        if stats is None:
+            stats = _timers[key] = {'count': 0, 'sum': 0.0, 'max': 0.0}
+        stats['count'] += 1
+        stats['sum'] += seconds
+        if seconds > stats['max']:
+            stats['max'] = seconds
+
+
+def count(name, value=1, **labels):
+    """Increment a counter"""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def gauge(name, value, **labels):
+    """Set a gauge to its current value"""
+    key = _key(name, labels)
+    with _lock:
+        _gauges[key] = value
+
+
+@contextmanager
+def timed(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def timed_function(name=None, **labels):
+    """Decorator form of timed()"""
+    def decorate(fn):
+        metric = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(metric, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def snapshot():
+    """Current timers and counters as plain rows"""
+    with _lock:
+        timers = [
+            {'name': name, 'labels': dict(labels), 'count': s['count'],
+             'mean_ms': s['sum'] / s['count'] * 1000, 'max_ms': s['max'] * 1000,
+             'total_ms': s['sum'] * 1000}
+            for (name, labels), s in sorted(_timers.items())
+        ]
+        counters = [
+            {'name': name, 'labels': dict(labels), 'value': value}
+            for (name, labels), value in sorted(_counters.items())
+        ]
+        gauges = [
+            {'name': name, 'labels': dict(labels), 'value': value}
+            for (name, labels), value in sorted(_gauges.items())
+        ]
+    return {'timers': timers, 'counters': counters, 'gauges': gauges}
+
+
+def reset():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _gauges.clear()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+def prometheus_text():
+    """Export all metrics in the Prometheus text exposition format"""
+    with _lock:
+        timers = sorted(_timers.items())
+        counters = sorted(_counters.items())
+        gauges = sorted(_gauges.items())
+
+    lines = []
+    seen = set()
+    for (name, labels), stats in timers:
+        metric = f"{name}_seconds"
+        if metric not in seen:
+            lines.append(f"# TYPE {metric} summary")
+            seen.add(metric)
+        lines.append(f"{metric}_count{_format_labels(labels)} {stats['count']}")
+        lines.append(f"{metric}_sum{_format_labels(labels)} {stats['sum']:.6f}")
+    for (name, labels), value in counters:
+        if name not in seen:
+            lines.append(f"# TYPE {name} counter")
+            seen.add(name)
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    for (name, labels), value in gauges:
+        if name not in seen:
+            lines.append(f"# TYPE {name} gauge")
+            seen.add(name)
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    return '\n'.join(lines) + '\n'
+
+
+_metrics_server = None
+
+
+def serve_metrics(port=None):
+    """Serve /metrics on a daemon thread (once per process); PERF_METRICS_PORT sets the port"""
+    global _metrics_server
+    port = port or os.getenv('PERF_METRICS_PORT')
+    if not port or _metrics_server is not None:
+        return _metrics_server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            data = prometheus_text().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    with _lock:
+        if _metrics_server is None:
+            _metrics_server = ThreadingHTTPServer(('0.0.0.0', int(port)), Handler)
+            _metrics_server.daemon_threads = True
+            threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+    return _metrics_server
+
+
+def profiling_enabled():
+    return os.getenv('PERF_PROFILE') == '1'
+
+
+class RerunProfile:
+    """Times one script rerun and, in profiling mode, captures it with cProfile.
+
+    A rerun cut short by st.rerun() or st.stop() never reaches finish();
+    the next rerun calls abandon() on it so its profiler stops and nothing
+    from it is recorded.
+    """
+
+    def __init__(self, name='rerun'):
+        self.name = name
+        self.path = None
+        self.profiler = None
+        self.finished = False
+        if profiling_enabled():
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.start = time.perf_counter()
+
+    def finish(self):
+        if self.finished:
+            return self.path
+        self.finished = True
+        observe(self.name, time.perf_counter() - self.start)
+        if self.profiler is None:
+            return None
+        self.profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        self.path = os.path.join(PROFILE_DIR, f"{self.name}-{time.strftime('%Y%m%d-%H%M%S')}-{id(self):x}.prof")
+        self.profiler.dump_stats(self.path)
+        return self.path
+
+    def abandon(self):
+        """Stop an unfinished profile without recording it"""
+        if self.finished:
+            return
+        self.finished = True
+        if self.profiler is not None:
+            self.profiler.disable()
+
+    def top(self, limit=15):
+        """Text of the most expensive functions by cumulative time"""
+        if self.profiler is None:
+            return ''
+        import io
+        import pstats
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
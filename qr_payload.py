@@ -0,0 +1,244 @@
+"""Compact, signed QR payloads for boarding passes and documents.
+
+A payload is a packed binary record, truncated HMAC-SHA256 appended, then
+base45-encoded (RFC 9285) so the QR code can use alphanumeric mode:
+
+    version (1) | kind (1) | fields ... | signature (8)
+
+ticket fields:    booking uuid (16), booking ref (4, as its integer code),
+                  departure (4, minutes since the epoch, 0 if unknown),
+                  class (1), then flight, origin, destination and seat as
+                  length-prefixed ASCII
+document fields:  document id (16), document type (1),
+                  date added (4, seconds since the epoch)
+named document:   document type (1), date added (4), then the document
+                  id as length-prefixed UTF-8, for ids that are not UUIDs
+
+A boarding pass comes to about 80 characters instead of 200+ of JSON,
+and a gate holding the signing key can validate it offline. The key is
+QR_SIGNING_KEY or, failing that, a random key kept in QR_SIGNING_KEY_FILE.
+"""
+import functools
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import struct
+import uuid
+from datetime import datetime, timezone
+
+from booking_refs import decode as decode_booking_ref
+from booking_refs import encode as encode_booking_ref
+from seats import CLASSES
+
+VERSION = 1
+TICKET = 1
+DOCUMENT = 2
+NAMED_DOCUMENT = 3
+SIGNATURE_SIZE = 8
+
+DATE_FORMATS = ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S")
+
+SIGNING_KEY_FILE = os.getenv('QR_SIGNING_KEY_FILE', 'qr_signing.key')
+
+_HEADER = struct.Struct('>BB')
+_TICKET = struct.Struct('>16sIIB')
+_DOCUMENT = struct.Struct('>16sBI')
+_NAMED_DOCUMENT = struct.Struct('>BI')
+
+BASE45_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+_BASE45_INDEX = {char: i for i, char in enumerate(BASE45_ALPHABET)}
+
+
+class InvalidPayload(ValueError):
+    """A scanned payload is malformed, of an unknown version, or its signature does not match"""
+
+
+def b45encode(data):
+    chars = []
+    for i in range(0, len(data) - 1, 2):
+        value = data[i] * 256 + data[i + 1]
+        value, c = divmod(value, 45)
+        e, d = divmod(value, 45)
+        chars += (BASE45_ALPHABET[c], BASE45_ALPHABET[d], BASE45_ALPHABET[e])
+    if len(data) % 2:
+        d, c = divmod(data[-1], 45)
+        chars += (BASE45_ALPHABET[c], BASE45_ALPHABET[d])
+    return ''.join(chars)
+
+
+def b45decode(text):
+    try:
+        values = [_BASE45_INDEX[char] for char in text]
+    except KeyError:
+        raise InvalidPayload("Not base45")
+    if len(values) % 3 == 1:
+        raise InvalidPayload("Truncated base45")
+    out = bytearray()
+    for i in range(0, len(values), 3):
+        chunk = values[i:i + 3]
+        if len(chunk) == 3:
+            value = chunk[0] + chunk[1] * 45 + chunk[2] * 45 * 45
+            if value > 0xFFFF:
+                raise InvalidPayload("Invalid base45")
+            out += value.to_bytes(2, 'big')
+        else:
+            value = chunk[0] + chunk[1] * 45
+            if value > 0xFF:
+                raise InvalidPayload("Invalid base45")
+            out.append(value)
+    return bytes(out)
+
+
+@functools.lru_cache(maxsize=None)
+def get_signing_key():
+    """The HMAC key shared by the issuers and the gates"""
+    key = os.getenv('QR_SIGNING_KEY')
+    if key:
+        return key.encode()
+    if not os.path.exists(SIGNING_KEY_FILE):
+        # Written in full to a private file first and then linked into place,
+        # so another process never reads a partly written key; the first to
+        # link wins and everyone reads that key
+        tmp = f"{SIGNING_KEY_FILE}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(secrets.token_hex(32))
+        try:
+            os.link(tmp, SIGNING_KEY_FILE)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp)
+    with open(SIGNING_KEY_FILE, 'r') as f:
+        return f.read().strip().encode()
+
+
+def _sign(body, key):
+    return hmac.new(key, body, hashlib.sha256).digest()[:SIGNATURE_SIZE]
+
+
+def _pack_text(value):
+    data = str(value or '').encode('ascii', 'replace')[:255]
+    return bytes([len(data)]) + data
+
+
+def _unpack_text(data, offset):
+    length = data[offset]
+    end = offset + 1 + length
+    if end > len(data):
+        raise InvalidPayload("Truncated field")
+    return data[offset + 1:end].decode('ascii'), end
+
+
+def _timestamp(value, unit):
+    if not value:
+        return 0
+    if not isinstance(value, datetime):
+        for fmt in DATE_FORMATS:
+            try:
+                value = datetime.strptime(str(value).strip(), fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            return 0
+    # Naive times are packed as if UTC so they unpack to the same wall-clock time
+    packed = int(value.replace(tzinfo=timezone.utc).timestamp()) // unit
+    # The field is an unsigned 32-bit int; a time outside it is packed as unknown
+    return packed if 0 <= packed <= 0xFFFFFFFF else 0
+
+
+def _datetime(value, unit):
+    if not value:
+        return None
+    return datetime.fromtimestamp(value * unit, timezone.utc).replace(tzinfo=None)
+
+
+def encode_ticket(ticket, booking_uuid, key=None):
+    """Compact payload for a ticket dict (the fields build_ticket_payload mints)"""
+    seat_class = ticket.get('class')
+    body = _HEADER.pack(VERSION, TICKET) + _TICKET.pack(
+        uuid.UUID(str(booking_uuid)).bytes,
+        decode_booking_ref(ticket['booking_ref']),
+        _timestamp(ticket.get('departure'), 60),
+        CLASSES.index(seat_class) if seat_class in CLASSES else 0xFF,
+    ) + b''.join(_pack_text(ticket.get(field)) for field in ('flight', 'from', 'to', 'seat'))
+    return b45encode(body + _sign(body, key or get_signing_key()))
+
+
+def encode_document(doc, key=None):
+    """Compact payload for a documents.Document.
+
+    Ids that are not UUIDs (e.g. minted by other clients) are packed as
+    text; one too long for that gets the plain JSON QR instead.
+    """
+    try:
+        body = _HEADER.pack(VERSION, DOCUMENT) + _DOCUMENT.pack(
+            uuid.UUID(str(doc.id)).bytes,
+            int(doc.document_type),
+            _timestamp(doc.date_added, 1),
+        )
+    except ValueError:
+        name = str(doc.id).encode()
+        if len(name) > 255:
+            return json.dumps({'document_id': str(doc.id), 'document_type': doc.label,
+                               'date_added': doc.date_added})
+        body = _HEADER.pack(VERSION, NAMED_DOCUMENT) + _NAMED_DOCUMENT.pack(
+            int(doc.document_type),
+            _timestamp(doc.date_added, 1),
+        ) + bytes([len(name)]) + name
+    return b45encode(body + _sign(body, key or get_signing_key()))
+
+
+def decode(text, key=None):
+    """Verify and unpack a payload into a dict with a 'kind' of 'ticket' or 'document'"""
+    data = b45decode(str(text).strip())
+    if len(data) < _HEADER.size + SIGNATURE_SIZE:
+        raise InvalidPayload("Payload too short")
+    body, signature = data[:-SIGNATURE_SIZE], data[-SIGNATURE_SIZE:]
+    if not hmac.compare_digest(_sign(body, key or get_signing_key()), signature):
+        raise InvalidPayload("Signature does not match")
+    version, kind = _HEADER.unpack_from(body)
+    if version != VERSION:
+        raise InvalidPayload(f"Unsupported payload version {version}")
+    offset = _HEADER.size
+    try:
+        if kind == TICKET:
+            booking_uuid, ref, departure, seat_class = _TICKET.unpack_from(body, offset)
+            offset += _TICKET.size
+            fields = {}
+            for field in ('flight', 'from', 'to', 'seat'):
+                fields[field], offset = _unpack_text(body, offset)
+            return {
+                'kind': 'ticket',
+                'booking_uuid': str(uuid.UUID(bytes=booking_uuid)),
+                'booking_ref': encode_booking_ref(ref),
+                'departure': _datetime(departure, 60),
+                'class': CLASSES[seat_class] if seat_class < len(CLASSES) else None,
+                **fields,
+            }
+        if kind == DOCUMENT:
+            document_id, document_type, date_added = _DOCUMENT.unpack_from(body, offset)
+            return {
+                'kind': 'document',
+                'document_id': str(uuid.UUID(bytes=document_id)),
+                'document_type': document_type,
+                'date_added': _datetime(date_added, 1),
+            }
+        if kind == NAMED_DOCUMENT:
+            document_type, date_added = _NAMED_DOCUMENT.unpack_from(body, offset)
+            offset += _NAMED_DOCUMENT.size
+            end = offset + 1 + body[offset]
+            if end != len(body):
+                raise InvalidPayload("Malformed payload")
+            return {
+                'kind': 'document',
+                'document_id': body[offset + 1:end].decode(),
+                'document_type': document_type,
+                'date_added': _datetime(date_added, 1),
+            }
+    except (struct.error, IndexError, UnicodeDecodeError):
+        raise InvalidPayload("Malformed payload")
+    raise InvalidPayload(f"Unknown payload kind {kind}")
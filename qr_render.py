@@ -0,0 +1,141 @@
+"""Shared QR rendering with a bounded in-memory LRU and an optional disk cache.
+
+render_qr() serves repeated payloads (the Details tab on every rerun) from
+memory; render_many() fans cache misses out to a process pool for bulk
+boarding-pass issuance, where PIL/qrcode work is CPU-bound.
+"""
+import hashlib
+import io
+import os
+
+import perf
+from lru import LRUCache
+
+DEFAULT_CACHE_SIZE = int(os.getenv('QR_CACHE_SIZE', '256'))
+
+_memory_cache = LRUCache(DEFAULT_CACHE_SIZE)
+_disk_cache_dir = os.getenv('QR_CACHE_DIR') or None
+
+
+def configure(cache_size=None, cache_dir=None):
+    """Resize the memory cache and/or enable the disk cache ('' disables it)"""
+    global _memory_cache, _disk_cache_dir
+    if cache_size is not None:
+        _memory_cache = LRUCache(cache_size)
+    if cache_dir is not None:
+        _disk_cache_dir = cache_dir or None
+
+
+def cache_info():
+    return {
+        'hits': _memory_cache.hits,
+        'misses': _memory_cache.misses,
+        'size': len(_memory_cache),
+        'maxsize': _memory_cache.maxsize,
+        'disk_dir': _disk_cache_dir,
+    }
+
+
+def clear_cache():
+    _memory_cache.clear()
+
+
+def _cache_key(data, box_size, border):
+    return hashlib.sha256(f"{box_size}:{border}:{data}".encode()).hexdigest()
+
+
+def _disk_path(key):
+    return os.path.join(_disk_cache_dir, key[:2], f"{key}.png")
+
+
+def _read_disk(key):
+    if not _disk_cache_dir:
+        return None
+    try:
+        with open(_disk_path(key), 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_disk(key, png):
+    if not _disk_cache_dir:
+        return
+    path = _disk_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(png)
+    os.replace(tmp, path)
+
+
+def _render(data, box_size=10, border=5):
+    """Render a QR code to PNG bytes without touching any cache"""
+    import qrcode
+
+    qr = qrcode.QRCode(version=1, box_size=box_size, border=border)
+    qr.add_data(data)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+
+    buf = io.BytesIO()
+    img.save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def _render_args(args):
+    return _render(*args)
+
+
+def render_qr(data, box_size=10, border=5):
+    """Return the QR code for data as PNG bytes, served from cache when possible"""
+    key = _cache_key(data, box_size, border)
+    png = _memory_cache.get(key)
+    if png is not None:
+        perf.count('qr_cache_requests_total', result='hit')
+        return png
+    perf.count('qr_cache_requests_total', result='miss')
+    png = _read_disk(key)
+    if png is None:
+        with perf.timed('generate_qr_code'):
+            png = _render(data, box_size, border)
+        _write_disk(key, png)
+    _memory_cache.put(key, png)
+    return png
+
+
+def render_many(payloads, box_size=10, border=5, workers=None, chunksize=16):
+    """Render many QR codes, fanning cache misses out to a process pool.
+
+    Results are returned in the same order as payloads.
+    """
+    payloads = list(payloads)
+    keys = [_cache_key(data, box_size, border) for data in payloads]
+    results = [None] * len(payloads)
+    missing = {}
+    for i, key in enumerate(keys):
+        png = _memory_cache.get(key)
+        if png is None:
+            png = _read_disk(key)
+            if png is not None:
+                _memory_cache.put(key, png)
+        if png is None:
+            missing.setdefault(key, []).append(i)
+        else:
+            results[i] = png
+
+    if missing:
+        todo = [(payloads[indexes[0]], box_size, border) for indexes in missing.values()]
+        if len(todo) == 1 or workers == 1:
+            pngs = [_render_args(args) for args in todo]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pngs = list(pool.map(_render_args, todo, chunksize=chunksize))
+        for (key, indexes), png in zip(missing.items(), pngs):
+            _write_disk(key, png)
+            _memory_cache.put(key, png)
+            for i in indexes:
+                results[i] = png
+    return results
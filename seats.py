@@ -0,0 +1,161 @@
+"""Per-flight seat inventory kept as bitsets, shared through SQLite.
+
+Each flight's cabin is a fixed layout of seats per travel class. The free
+seats of a class are the set bits of one integer, stored as one row per
+(flight, class), so every process using the same database (the ticket
+generator, bulk_issue runs) sees the same reservations. Taking the next
+available seat (lowest set bit, i.e. the front-most row), a specific
+seat, or releasing one reads and rewrites that single row inside one
+IMMEDIATE transaction, so the same seat is never handed out twice,
+across threads or processes.
+"""
+import os
+import sqlite3
+import threading
+
+import perf
+
+CLASSES = ("Economy", "Business", "First Class")
+
+# class -> (first row, last row, seat letters)
+DEFAULT_LAYOUT = {
+    "First Class": (1, 2, "ACDF"),
+    "Business": (3, 7, "ACDF"),
+    "Economy": (8, 40, "ABCDEF"),
+}
+
+DEFAULT_SEATS_PATH = os.getenv('SEATS_PATH', 'seats.db')
+
+
+class SeatUnavailable(ValueError):
+    """The requested seat is taken, unknown, or its class is full"""
+
+
+def flight_key(route, departure):
+    """Inventory key for a flight: its route and scheduled departure"""
+    return f"{str(route).strip().upper()} {str(departure).strip()}"
+
+
+class Cabin:
+    """Seat layout of a flight: which bit of its class's bitset each seat is"""
+
+    def __init__(self, layout=DEFAULT_LAYOUT):
+        self.layout = {cls: tuple(spec) for cls, spec in layout.items()}
+        self.seats = {}
+        self.index = {}
+        for cls, (first, last, letters) in self.layout.items():
+            seats = [f"{row}{letter}" for row in range(first, last + 1) for letter in letters]
+            self.seats[cls] = seats
+            for bit, seat in enumerate(seats):
+                self.index[seat] = (cls, bit)
+
+    def all_free(self, seat_class):
+        """Bitset of a class with every seat free"""
+        if seat_class not in self.seats:
+            raise SeatUnavailable(f"Unknown travel class: {seat_class}")
+        return (1 << len(self.seats[seat_class])) - 1
+
+    def locate(self, seat, seat_class=None):
+        """(seat, class, bit) of a seat on this layout"""
+        seat = str(seat).strip().upper()
+        if seat not in self.index:
+            raise SeatUnavailable(f"No seat {seat} on this flight")
+        cls, bit = self.index[seat]
+        if seat_class and seat_class != cls:
+            raise SeatUnavailable(f"Seat {seat} is in {cls}, not {seat_class}")
+        return seat, cls, bit
+
+
+class SeatInventory:
+    """Free-seat bitsets of every flight, one SQLite row per (flight, class)"""
+
+    def __init__(self, path=DEFAULT_SEATS_PATH, layout=DEFAULT_LAYOUT):
+        self.path = path
+        self.cabin = Cabin(layout)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS free_seats (
+                flight TEXT NOT NULL,
+                seat_class TEXT NOT NULL,
+                free TEXT NOT NULL,
+                PRIMARY KEY (flight, seat_class)
+            ) WITHOUT ROWID
+        ''')
+
+    def _free(self, flight, seat_class):
+        row = self._conn.execute('SELECT free FROM free_seats WHERE flight = ? AND seat_class = ?',
+                                 (flight, seat_class)).fetchone()
+        # Classes of a flight nobody has booked yet have no row: every seat is free
+        return int(row[0], 16) if row else self.cabin.all_free(seat_class)
+
+    def _update(self, flight, seat_class, change):
+        """Apply change(free bitset) -> (new bitset, result) to one row in an IMMEDIATE transaction"""
+        with self._lock:
+            # IMMEDIATE takes the write lock before reading, so no other
+            # process can change the bitset in between
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                free, result = change(self._free(flight, seat_class))
+                self._conn.execute('INSERT OR REPLACE INTO free_seats (flight, seat_class, free) VALUES (?, ?, ?)',
+                                   (flight, seat_class, format(free, 'x')))
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return result
+
+    def assign(self, flight, seat_class, seat=None):
+        """Reserve seat, or the next available seat of the class; returns the seat"""
+        if seat:
+            seat, seat_class, bit = self.cabin.locate(seat, seat_class)
+
+            def take(free):
+                if not free >> bit & 1:
+                    raise SeatUnavailable(f"Seat {seat} is already taken")
+                return free & ~(1 << bit), seat
+        else:
+            self.cabin.all_free(seat_class)
+
+            def take(free):
+                if not free:
+                    raise SeatUnavailable(f"No {seat_class} seats left")
+                lowest = free & -free
+                return free ^ lowest, self.cabin.seats[seat_class][lowest.bit_length() - 1]
+
+        with perf.timed('seat_assign'):
+            return self._update(flight, seat_class, take)
+
+    def release(self, flight, seat):
+        try:
+            _, seat_class, bit = self.cabin.locate(seat)
+        except SeatUnavailable:
+            return
+        self._update(flight, seat_class, lambda free: (free | 1 << bit, None))
+
+    def available(self, flight, seat_class):
+        try:
+            with self._lock:
+                free = self._free(flight, seat_class)
+        except SeatUnavailable:
+            return 0
+        return bin(free).count('1')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_inventory = None
+_inventory_lock = threading.Lock()
+
+
+def get_seat_inventory():
+    """The process-wide seat inventory"""
+    global _inventory
+    if _inventory is None:
+        with _inventory_lock:
+            if _inventory is None:
+                _inventory = SeatInventory()
+    return _inventory
@@ -1,59 +1,34 @@
 import streamlit as st
-import pandas as pd
+import asyncio
 from datetime import datetime, timedelta
 import random
-import qrcode
-from io import BytesIO
-import base64
 import uuid
-import os
-import requests
 
-def generate_booking_reference():
-    """Generate a 6-character booking reference"""
-    chars = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
-    return ''.join(random.choices(chars, k=6))
-
-def generate_qr_code(booking_ref):
-    """Generate QR code for the booking reference"""
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(booking_ref)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    # Convert PIL image to bytes
-    buffered = BytesIO()
-    img.save(buffered, format="PNG")
-    return base64.b64encode(buffered.getvalue()).decode()
-
-def validate_user_id(user_id):
-    """Validate if user ID matches required format"""
-    if len(user_id) >= 5 and user_id.isalnum():
-        return True
-    return False
+from backend_client import BackendError
+from bootstrap import get_company_id, load_environment
+from bulk_issue import DEFAULT_CONCURRENCY, issue_batch, journal_path_for, load_manifest
+from flights import get_catalog
+from qr_payload import encode_ticket
+from seats import CLASSES, SeatUnavailable, flight_key, get_seat_inventory
+from tickets import (build_ticket_payload, generate_booking_reference, generate_qr_code,
+                     render_ticket_html, validate_user_id)
 
 def initialize_company_id():
     """Initialize or retrieve company ID"""
-    if not os.path.exists('company_id.txt'):
-        company_id = str(uuid.uuid4())
-        with open('company_id.txt', 'w') as f:
-            f.write(company_id)
-        
-        # Register company ID with the API
-        try:
-            response = requests.post(
-                "http://localhost:8080/accounts",
-                json={"id": company_id},
-                headers={'Content-Type': 'application/json'}
-            )
-            response.raise_for_status()
-        except requests.exceptions.RequestException as e:
-            st.error(f"Failed to register company ID: {e}")
-            return None
-    
-    # Read the company ID from file
-    with open('company_id.txt', 'r') as f:
-        return f.read().strip()
+    # Created and registered with the API once per process
+    try:
+        return get_company_id()
+    except BackendError as e:
+        st.error(f"Failed to register company ID: {e}")
+        return None
+
+def assign_seat(flight, flight_class, seat):
+    """Reserve the requested seat, or the next free one; None (with an error shown) if unavailable"""
+    try:
+        return get_seat_inventory().assign(flight, flight_class, seat or None)
+    except SeatUnavailable as e:
+        st.error(str(e))
+        return None
 
 def create_ticket():
     st.title("✈️ Flight Ticket Generator")
@@ -70,17 +45,47 @@ def create_ticket():
     # Create two columns for input details
     col1, col2 = st.columns(2)
     
+    catalog = get_catalog()
+    scheduled = None
     with col1:
         user_id = st.text_input("User ID", help="Enter your unique user ID (minimum 5 alphanumeric characters)")
-        departure = st.text_input("Departure City")
+        if catalog:
+            departure = st.selectbox("Departure City", catalog.airports())
+        else:
+            departure = st.text_input("Departure City")
         departure_date = st.date_input("Departure Date", min_value=datetime.now())
-        departure_time = st.time_input("Departure Time")
+        if not catalog:
+            departure_time = st.time_input("Departure Time")
 
     with col2:
-        seat = st.text_input("Seat Number", max_chars=3)
-        destination = st.text_input("Destination City")
-        flight_duration = st.number_input("Flight Duration (hours)", min_value=0.5, max_value=24.0, value=2.0, step=0.5)
-        flight_class = st.selectbox("Travel Class", ["Economy", "Business", "First Class"])
+        seat = st.text_input("Seat Number", max_chars=3, help="Leave blank to assign the next available seat")
+        if catalog:
+            destination = st.selectbox("Destination City", catalog.destinations(departure))
+            # Departure and arrival come from the schedule instead of being typed in
+            scheduled = st.selectbox(
+                "Flight",
+                catalog.on_route(departure, destination, departure_date),
+                format_func=lambda f: f"{f.flight}  {f.departure:%H:%M} → {f.arrival:%H:%M}",
+            )
+        else:
+            destination = st.text_input("Destination City")
+            flight_duration = st.number_input("Flight Duration (hours)", min_value=0.5, max_value=24.0, value=2.0, step=0.5)
+        flight_class = st.selectbox("Travel Class", list(CLASSES))
+
+    if scheduled:
+        departure_datetime, arrival_datetime = scheduled.departure, scheduled.arrival
+        flight_number = scheduled.flight
+    elif catalog:
+        st.warning("No scheduled flights on this route and date")
+        return
+    else:
+        departure_datetime = datetime.combine(departure_date, departure_time)
+        arrival_datetime = departure_datetime + timedelta(hours=flight_duration)
+        flight_number = f"AN{random.randint(100, 999)}"
+    flight = flight_key(f"{departure}-{destination}", departure_datetime.strftime("%Y-%m-%d %H:%M"))
+    if departure and destination:
+        seats_left = get_seat_inventory().available(flight, flight_class)
+        col2.caption(f"{seats_left} {flight_class} seats left on this flight")
     
     # Create columns for buttons
     button_col1, button_col2, button_col3 = st.columns([1, 1, 2])
@@ -95,69 +100,51 @@ def create_ticket():
     if generate_pressed:
         if user_id and departure and destination:
             if validate_user_id(user_id):
-                st.session_state['ticket_generated'] = True
-                booking_ref = generate_booking_reference()
-                qr_code = generate_qr_code(booking_ref)
-                
-                # Calculate arrival time
-                departure_datetime = datetime.combine(departure_date, departure_time)
-                arrival_datetime = departure_datetime + timedelta(hours=flight_duration)
-                
-                # Create NFT payload
-                payload = {
-                    "name": "Transferable NFT",
-                    "description": "This NFT will be transferred",
-                    "owner": company_id,
-                    "metadata": {
-                        'id': booking_uuid,
-                        'document_type': 3,
-                        'date_added': str(datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
-                        'image': qr_code,
-                        'profile_type': 'Individual'
+                seat = assign_seat(flight, flight_class, seat)
+                if seat:
+                    st.session_state['ticket_generated'] = True
+                    booking_ref = generate_booking_reference()
+
+                    # Create NFT payload
+                    ticket = {
+                        'booking_ref': booking_ref,
+                        'user_id': user_id,
+                        'flight': flight_number,
+                        'route': f"{departure}-{destination}",
+                        'from': departure,
+                        'to': destination,
+                        'seat': seat,
+                        'class': flight_class,
+                        'departure': departure_datetime.strftime("%Y-%m-%d %H:%M"),
+                        'arrival': arrival_datetime.strftime("%Y-%m-%d %H:%M"),
                     }
-                }
+                    # The QR carries the signed ticket itself, so a gate can check it offline
+                    qr_payload = encode_ticket(ticket, booking_uuid)
+                    qr_code = generate_qr_code(qr_payload)
+                    payload = build_ticket_payload(company_id, booking_uuid, qr_code, ticket)
                 
-                # Store payload in session state for download button
-                st.session_state['transfer_payload'] = {
-                    'from': company_id,
-                    'to': user_id,
-                    'nft_id': booking_uuid
-                }
+                    # Store payload in session state for download button
+                    st.session_state['transfer_payload'] = {
+                        'from': company_id,
+                        'to': user_id,
+                        'nft_id': booking_uuid
+                    }
                 
-                # Create ticket display
-                st.markdown("---")
-                st.subheader("🎫 Your Flight Ticket")
+                    # Create ticket display
+                    st.markdown("---")
+                    st.subheader("🎫 Your Flight Ticket")
                 
-                # Ticket container with custom styling
-                ticket_html = f"""
-                <div style="border: 2px solid #1f77b4; border-radius: 10px; padding: 20px; background-color: white;">
-                    <h2 style="color: #1f77b4; text-align: center;">BOARDING PASS</h2>
-                    <div style="display: flex; justify-content: space-between;">
-                        <div>
-                            <p><strong>User ID:</strong> {user_id}</p>
-                            <p><strong>From:</strong> {departure}</p>
-                            <p><strong>To:</strong> {destination}</p>
-                            <p><strong>Date:</strong> {departure_date.strftime('%B %d, %Y')}</p>
-                        </div>
-                        <div>
-                            <p><strong>Flight:</strong> AN{random.randint(100, 999)}</p>
-                            <p><strong>Seat:</strong> {seat}</p>
-                            <p><strong>Class:</strong> {flight_class}</p>
-                            <p><strong>Booking Ref:</strong> {booking_ref}</p>
-                            <p><strong>Booking UUID:</strong> {booking_uuid}</p>
-                        </div>
-                    </div>
-                    <div style="text-align: center; margin-top: 10px;">
-                        <p><strong>Departure:</strong> {departure_time.strftime('%H:%M')}</p>
-                        <p><strong>Arrival:</strong> {arrival_datetime.strftime('%H:%M')}</p>
-                    </div>
-                    <div style="text-align: center; margin-top: 10px;">
-                        <img src="data:image/png;base64,{qr_code}" 
-                             style="width: 150px; height: 150px;"/>
-                    </div>
-                </div>
-                """
-                st.markdown(ticket_html, unsafe_allow_html=True)
+                    # Ticket container with custom styling
+                    ticket_html = render_ticket_html(ticket, booking_uuid, qr_code, departure_datetime, arrival_datetime)
+                    st.markdown(ticket_html, unsafe_allow_html=True)
+                    # Imported here: passes pulls in the process pool machinery, not needed on every rerun
+                    from passes import render_pass
+                    st.download_button(
+                        label="Download Printable Pass (PDF)",
+                        data=render_pass({**ticket, 'booking_uuid': booking_uuid}, qr_payload, 'pdf'),
+                        file_name=f"boarding_pass_{booking_ref}.pdf",
+                        mime="application/pdf"
+                    )
             else:
                 st.error("Invalid User ID format. Please use at least 5 alphanumeric characters.")
         else:
@@ -177,6 +164,44 @@ def create_ticket():
             except Exception as e:
                 st.error(f"Failed to initiate transfer: {e}")
 
+def bulk_issue_tickets(company_id):
+    """Issue boarding passes for a whole flight manifest"""
+    st.markdown("---")
+    st.subheader("📋 Bulk Issue from Manifest")
+    manifest_file = st.file_uploader("Flight manifest (CSV: user_id, seat, class, route, time)", type=['csv'])
+    concurrency = st.number_input("Concurrent requests", min_value=1, max_value=128, value=DEFAULT_CONCURRENCY)
+
+    if manifest_file and st.button("Issue Tickets"):
+        try:
+            manifest = load_manifest(manifest_file)
+        except ValueError as e:
+            st.error(str(e))
+            return
+
+        # The journal is keyed by manifest contents, so re-uploading the
+        # same manifest resumes a partially finished batch
+        progress_bar = st.progress(0.0)
+        status = st.empty()
+
+        def report(done, total, failed):
+            progress_bar.progress(done / total)
+            status.write(f"{done}/{total} processed, {failed} failed")
+
+        result = asyncio.run(issue_batch(
+            manifest, company_id,
+            concurrency=int(concurrency),
+            journal_path=journal_path_for(manifest),
+            progress=report,
+        ))
+        st.success(f"Issued {len(result['issued'])} of {len(manifest)} tickets")
+        if result['failures']:
+            st.error(f"{len(result['failures'])} rows failed")
+            st.dataframe(result['failures'])
+
 if __name__ == "__main__":
     st.set_page_config(page_title="Flight Ticket Generator", page_icon="✈️")
-    create_ticket()
\ No newline at end of file
+    load_environment()
+    create_ticket()
+    company_id = initialize_company_id()
+    if company_id:
+        bulk_issue_tickets(company_id)
\ No newline at end of file
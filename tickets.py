@@ -0,0 +1,87 @@
+import base64
+import json
+from datetime import datetime
+
+from booking_refs import get_booking_references
+from qr_render import render_many, render_qr
+
+TICKET_DOCUMENT_TYPE = 3
+
+
+def generate_booking_reference():
+    """Issue a unique 6-character booking reference"""
+    return get_booking_references().next()
+
+
+def generate_booking_references(count):
+    """Issue count unique booking references in one batch"""
+    return get_booking_references().issue(count)
+
+
+def generate_qr_code(data):
+    """Generate a base64 PNG QR code, e.g. for a qr_payload.encode_ticket() payload"""
+    return base64.b64encode(render_qr(data)).decode()
+
+
+def generate_qr_codes(payloads, workers=None):
+    """Generate QR codes for many payloads on a process pool"""
+    return [base64.b64encode(png).decode() for png in render_many(payloads, workers=workers)]
+
+
+def validate_user_id(user_id):
+    """Validate if user ID matches required format"""
+    if len(user_id) >= 5 and user_id.isalnum():
+        return True
+    return False
+
+
+def build_ticket_payload(company_id, booking_uuid, qr_code, ticket):
+    """Create the NFT mint payload for a boarding pass.
+
+    The ledger only stores the fixed metadata fields, so the ticket details
+    (booking ref, seat, class, route, ...) travel as JSON in the description.
+    """
+    return {
+        "name": f"Boarding Pass {ticket.get('booking_ref', '')}".strip(),
+        "description": json.dumps(ticket, default=str),
+        "owner": company_id,
+        "metadata": {
+            'id': booking_uuid,
+            'document_type': TICKET_DOCUMENT_TYPE,
+            'date_added': str(datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+            'image': qr_code,
+            'profile_type': 'Individual'
+        }
+    }
+
+
+def render_ticket_html(ticket, booking_uuid, qr_code, departure_datetime, arrival_datetime):
+    """Boarding pass markup with the QR code embedded as a data URI"""
+    return f"""
+                <div style="border: 2px solid #1f77b4; border-radius: 10px; padding: 20px; background-color: white;">
+                    <h2 style="color: #1f77b4; text-align: center;">BOARDING PASS</h2>
+                    <div style="display: flex; justify-content: space-between;">
+                        <div>
+                            <p><strong>User ID:</strong> {ticket['user_id']}</p>
+                            <p><strong>From:</strong> {ticket['from']}</p>
+                            <p><strong>To:</strong> {ticket['to']}</p>
+                            <p><strong>Date:</strong> {departure_datetime.strftime('%B %d, %Y')}</p>
+                        </div>
+                        <div>
+                            <p><strong>Flight:</strong> {ticket.get('flight', '')}</p>
+                            <p><strong>Seat:</strong> {ticket['seat']}</p>
+                            <p><strong>Class:</strong> {ticket['class']}</p>
+                            <p><strong>Booking Ref:</strong> {ticket['booking_ref']}</p>
+                            <p><strong>Booking UUID:</strong> {booking_uuid}</p>
+                        </div>
+                    </div>
+                    <div style="text-align: center; margin-top: 10px;">
+                        <p><strong>Departure:</strong> {departure_datetime.strftime('%H:%M')}</p>
+                        <p><strong>Arrival:</strong> {arrival_datetime.strftime('%H:%M')}</p>
+                    </div>
+                    <div style="text-align: center; margin-top: 10px;">
+                        <img src="data:image/png;base64,{qr_code}" 
+                             style="width: 150px; height: 150px;"/>
+                    </div>
+                </div>
+                """